@@ -0,0 +1,104 @@
+"""
+Page assembly latency of the API client: the reads one rerun of main.py needs, issued one after
+another (as the front end did before) and concurrently through client.fetch_many, against the
+local stub backend from benchmark_rerun.py. The client cache is cleared before every page,
+so each one hits the network. Usage:
+
+    python benchmark_fanout.py --latency 20 --pages 20 --errors 0.05 --sessions 8
+
+--sessions: that many sessions assembling the same page at once share the requests in flight.
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+from benchmark_rerun import Stub
+
+
+def page_calls(client):
+    # the same reads load_page() issues when a filter is applied and a history is shown
+    return {
+        'tasks': lambda: client.tasks_since(None),
+        'users': client.users,
+        'task': lambda: client.task(1),
+        'filtered': lambda: client.filtered_tasks((('status', 'NEW'),)),
+        'history': lambda: client.task_history(1),
+        'user_tasks': lambda: client.user_tasks(1, 'token'),
+    }
+
+
+def sequential(client, calls):
+    results = {}
+    for name, call in calls.items():
+        try:
+            results[name] = client.run(call())
+        except Exception as exc:
+            results[name] = exc
+    return results
+
+
+def concurrent(client, calls):
+    return client.fetch_many(**{name: call() for name, call in calls.items()})
+
+
+def measure(client, label, assemble, calls, pages):
+    latencies, failed = [], 0
+    for _ in range(pages):
+        client.api().clear()
+        started = time.perf_counter()
+        results = assemble(client, calls)
+        latencies.append(time.perf_counter() - started)
+        failed += any(isinstance(result, Exception) for result in results.values())
+    print(
+        f'{label:<12} median {statistics.median(latencies) * 1000:8.1f} ms  '
+        f'max {max(latencies) * 1000:8.1f} ms  pages with a failed call {failed}/{pages}'
+    )
+    return statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--tasks', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=20, help='Stub latency per request (ms).')
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--sessions', type=int, default=8, help='Sessions assembling a page at the same time.')
+    parser.add_argument('--errors', type=float, default=0.0, help='Share of GETs the stub answers with 503.')
+    args = parser.parse_args()
+
+    stub = Stub(args.users, args.tasks, args.latency / 1000, args.errors)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), stub.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # read by client.py at import time
+    os.environ['API_URL'] = f'http://127.0.0.1:{server.server_port}'
+
+    import client
+
+    calls = page_calls(client)
+    for name, call in calls.items():
+        client.api().clear()
+        started = time.perf_counter()
+        client.run(call())
+        print(f'{name:<12} {(time.perf_counter() - started) * 1000:8.1f} ms')
+    before = measure(client, 'sequential', sequential, calls, args.pages)
+    after = measure(client, 'concurrent', concurrent, calls, args.pages)
+    print(f'speedup x{before / after:.1f}')
+
+    client.api().clear()
+    stub.requests.clear()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        list(pool.map(lambda _: concurrent(client, calls), range(args.sessions)))
+    print(
+        f'{args.sessions} sessions at once {(time.perf_counter() - started) * 1000:8.1f} ms  '
+        f'requests {sum(stub.requests.values())}  {dict(stub.requests)}'
+    )
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
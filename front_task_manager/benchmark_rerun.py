@@ -0,0 +1,167 @@
+"""
+Rerun latency of the Streamlit front end with the backend replaced by a local stub.
+
+The stub answers every endpoint main.py uses with a fixed delay (simulating the network
+and the backend), counts requests and the script is executed headless with
+streamlit.testing (sessions rendering at the same time are measured by benchmark_fanout.py,
+AppTest instances cannot run in parallel). Usage:
+
+    python benchmark_rerun.py --users 200 --tasks 500 --latency 20 --reruns 10
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+class Stub:
+    def __init__(self, users, tasks, latency, errors=0.0):
+        self.latency = latency
+        # share of GETs answered with 503 (exercises client retries)
+        self.errors = errors
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.users = [{'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com'} for i in range(1, users + 1)]
+        self.tasks = [
+            {
+                'id': i, 'name': f'task {i}', 'description': f'description {i}',
+                'status': ('NEW', 'IN_PROGRESS', 'SOLVED')[i % 3], 'assigned_user': i % users + 1,
+                'created_at': '2026-01-01T10:00:00Z', 'updated_at': '2026-01-02T10:00:00Z',
+            }
+            for i in range(1, tasks + 1)
+        ]
+
+    def page(self, results):
+        return {'next': None, 'previous': None, 'results': results}
+
+    def route(self, method, path):
+        if method != 'GET':
+            return 200, {'access': 'token'}
+        if path == '/api/user/all/':
+            return 200, self.users
+        if path in ('/api/task/all/', '/api/task/filter/') or path.startswith('/api/user/tasks/'):
+            return 200, self.page(self.tasks)
+        if path in ('/api/ui/bootstrap/', '/api/ui/edit/'):
+            return 200, {
+                'seq': 0,
+                'tasks': [{key: task[key] for key in ('id', 'name', 'status', 'assigned_user')} for task in self.tasks],
+                'tasks_next': None,
+                'users': {user['id']: user['username'] for user in self.users},
+                'task_id': self.tasks[0]['id'],
+                'task': self.tasks[0],
+            }
+        if path == '/api/task/feed/':
+            return 200, {'events': [], 'seq': 0}
+        match = re.fullmatch(r'/api/task/history/(\d+)/', path)
+        if match:
+            entries = [
+                {**task, 'assigned_user': 'user1', 'deleted_at': None, 'version': 2}
+                for task in self.tasks[:1]
+            ]
+            return 200, self.page(entries)
+        match = re.fullmatch(r'/api/task/(\d+)/?', path)
+        if match:
+            return 200, self.tasks[int(match.group(1)) - 1]
+        return 404, {'detail': 'Not found.'}
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def respond(self, method):
+                path = urlsplit(self.path).path
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                with stub.lock:
+                    stub.requests[re.sub(r'\d+', '<id>', path)] += 1
+                time.sleep(stub.latency)
+                if method == 'GET' and random.random() < stub.errors:
+                    status, data = 503, {'detail': 'Service unavailable.'}
+                else:
+                    status, data = stub.route(method, path)
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self.respond('GET')
+
+            def do_POST(self):
+                self.respond('POST')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def click(label):
+    def action(app):
+        next(button for button in app.button if button.label == label).click()
+    return action
+
+
+def run(app, label, action=None):
+    started = time.perf_counter()
+    if action:
+        action(app)
+    app.run()
+    if app.exception:
+        raise RuntimeError(f'{label}: {app.exception[0].message}')
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--script', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py'))
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--tasks', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=20, help='Stub latency per request (ms).')
+    parser.add_argument('--reruns', type=int, default=10)
+    args = parser.parse_args()
+
+    stub = Stub(args.users, args.tasks, args.latency / 1000)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), stub.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # read by client.py (and main.py) at import time
+    os.environ['API_URL'] = f'http://127.0.0.1:{server.server_port}'
+
+    from streamlit.testing.v1 import AppTest
+
+    def measure(label, runs, action=None):
+        stub.requests.clear()
+        app = AppTest.from_file(args.script, default_timeout=120)
+        run(app, 'first render')
+        stub.requests.clear()
+        latencies = [run(app, label, action) for _ in range(runs)]
+        total = sum(stub.requests.values())
+        print(
+            f'{label:<18} median {statistics.median(latencies) * 1000:8.1f} ms  '
+            f'max {max(latencies) * 1000:8.1f} ms  requests/rerun {total / runs:6.1f}  {dict(stub.requests)}'
+        )
+
+    stub.requests.clear()
+    app = AppTest.from_file(args.script, default_timeout=120)
+    print(f'first render       {run(app, "first render") * 1000:8.1f} ms  requests {sum(stub.requests.values())}')
+    measure('rerun', args.reruns)
+    measure('apply filters', args.reruns, click('Apply Filters'))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
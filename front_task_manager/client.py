@@ -0,0 +1,284 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+import httpx
+import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+#api links
+#BASE_API_URL = "http://django_api:8000"
+#BASE_API_URL = "http://localhost:8000"
+BASE_API_URL = os.getenv("API_URL", "http://backend:8000")
+
+login_url = f"{BASE_API_URL}/api/token/"
+register_url = f"{BASE_API_URL}/api/user/register/"
+get_user_tasks_url = f"{BASE_API_URL}/api/user/tasks/"
+add_task_url = f"{BASE_API_URL}/api/task/create/"
+get_users_url = f"{BASE_API_URL}/api/user/all/"
+get_tasks_url = f"{BASE_API_URL}/api/task/all/"
+get_task_url = f"{BASE_API_URL}/api/task/"
+edit_task_url = f"{BASE_API_URL}/api/task/edit/"
+task_history_url = f"{BASE_API_URL}/api/task/history/"
+get_task_filter_url = f"{BASE_API_URL}/api/task/filter/"
+task_feed_url = f"{BASE_API_URL}/api/task/feed/"
+ui_bundle_url = f"{BASE_API_URL}/api/ui/"
+
+# read endpoints negotiate MessagePack (smaller and faster to decode than JSON) when msgpack is installed;
+# gzip/brotli compression is negotiated by httpx itself
+ACCEPT = "application/msgpack, application/json;q=0.9" if msgpack else "application/json"
+
+# how long read results are reused between reruns and sessions (seconds); own writes clear them at once
+CACHE_TTL = float(os.getenv("API_CACHE_TTL", 10))
+# requests in flight at once per Streamlit process, the rest wait for a free slot
+CONCURRENCY = int(os.getenv("API_CONCURRENCY", 8))
+# per request timeout (seconds) and retries after connection errors, timeouts and 502/503/504
+TIMEOUT = float(os.getenv("API_TIMEOUT", 5))
+RETRIES = int(os.getenv("API_RETRIES", 2))
+RETRY_BACKOFF = 0.1
+RETRY_STATUS = {502, 503, 504}
+CACHE_MAX_ENTRIES = 1024
+
+# body of a GET shared by all callers waiting for the same request
+Reply = namedtuple("Reply", ["status_code", "headers", "content"])
+
+
+class ApiError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"API returned status code {status_code}")
+        self.status_code = status_code
+
+
+def decode(response):
+    if msgpack and response.headers.get("Content-Type", "").startswith("application/msgpack"):
+        return msgpack.unpackb(response.content)
+    return json.loads(response.content)
+
+
+class AsyncApi:
+    # All requests of the process run on one event loop in a background thread with one httpx connection pool.
+    # Streamlit scripts are synchronous, so they submit coroutines with run() and block until the result is ready.
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.client = httpx.AsyncClient(
+            timeout=TIMEOUT,
+            limits=httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY),
+        )
+        self.semaphore = asyncio.Semaphore(CONCURRENCY)
+        # (url, params, headers) -> (task, expires, started); identical GETs in flight share one task
+        self.cache = {}
+        threading.Thread(target=self.loop.run_forever, name="api-loop", daemon=True).start()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def request(self, method, url, **kwargs):
+        # reads are retried after any transport error or 502/503/504, writes only when the connection
+        # could not be opened (the request certainly did not reach the backend)
+        for attempt in range(RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+            last = attempt == RETRIES
+            try:
+                async with self.semaphore:
+                    response = await self.client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if last:
+                    raise
+                continue
+            except httpx.TransportError:
+                if last or method != "GET":
+                    raise
+                continue
+            if last or method != "GET" or response.status_code not in RETRY_STATUS:
+                return response
+
+    async def fetch(self, url, params, headers):
+        response = await self.request("GET", url, params=params, headers=headers)
+        return Reply(response.status_code, response.headers, response.content)
+
+    async def get(self, url, params=None, headers=None, ttl=0):
+        headers = {"Accept": ACCEPT, **(headers or {})}
+        key = (url, tuple(sorted((params or {}).items())), tuple(sorted(headers.items())))
+        entry = self.cache.get(key)
+        if entry is None or (entry[0].done() and entry[1] <= time.monotonic()):
+            task = self.loop.create_task(self.fetch(url, params, headers))
+            self.cache[key] = (task, float("inf"), time.monotonic())
+            task.add_done_callback(lambda task: self.settle(key, task, ttl))
+            entry = self.cache[key]
+        # a caller giving up (timeout, rerun) must not cancel the request for the others
+        return await asyncio.shield(entry[0])
+
+    def settle(self, key, task, ttl):
+        # successful replies are kept for ttl seconds, errors and invalidated entries are dropped
+        entry = self.cache.get(key)
+        if entry is None or entry[0] is not task:
+            return
+        if ttl > 0 and not task.cancelled() and task.exception() is None and task.result().status_code == 200:
+            self.cache[key] = (task, time.monotonic() + ttl, entry[2])
+        else:
+            del self.cache[key]
+        if len(self.cache) > CACHE_MAX_ENTRIES:
+            now = time.monotonic()
+            for stale in [k for k, (t, expires, _) in self.cache.items() if t.done() and expires <= now]:
+                del self.cache[stale]
+
+    async def get_json(self, url, params=None, headers=None, ttl=0):
+        response = await self.get(url, params=params, headers=headers, ttl=ttl)
+        if response.status_code != 200:
+            raise ApiError(response.status_code)
+        return decode(response)
+
+    async def get_pages(self, url, params=None, headers=None, ttl=0):
+        # task list and history endpoints are cursor paginated - follow "next" until exhausted
+        results = []
+        while url:
+            page = await self.get_json(url, params=params, headers=headers, ttl=ttl)
+            results.extend(page['results'])
+            url, params = page['next'], None
+        return results
+
+    def invalidate(self, *prefixes, before=None):
+        # drops cached reads of the given urls (started before `before`, when given); scheduled on the loop,
+        # so it is applied before any request submitted afterwards
+        def drop():
+            for key in [k for k, (_, _, started) in self.cache.items()
+                        if k[0].startswith(prefixes) and (before is None or started < before)]:
+                del self.cache[key]
+        self.loop.call_soon_threadsafe(drop)
+
+    def clear(self):
+        self.loop.call_soon_threadsafe(self.cache.clear)
+
+
+@st.cache_resource
+def api():
+    # one loop, connection pool and cache for the whole Streamlit process
+    return AsyncApi()
+
+
+def run(coro):
+    return api().run(coro)
+
+
+def browser_ip():
+    # peer address of the session's websocket connection - Streamlit's tornado server runs without xheaders,
+    # so this is the socket address, never a value taken from request headers a browser could set
+    ip = getattr(st.context, "ip_address", None)  # Streamlit 1.45+
+    if ip:
+        return ip
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None or not runtime.exists():
+        return None
+    request = getattr(runtime.get_instance().get_client(ctx.session_id), "request", None)
+    ip = getattr(request, "remote_ip", None)
+    return ip if isinstance(ip, str) else None
+
+
+def forwarded_for():
+    # address of the browser, forwarded as X-Real-IP: the backend trusts it from this container (API_TRUSTED_PROXIES),
+    # so users of the UI do not share one login rate limit
+    ip = browser_ip()
+    return {"X-Real-IP": ip} if ip else {}
+
+
+def api_send(method, url, **kwargs):
+    # writes and logins run in the script thread, where the session context (st.context) is available
+    headers = {**forwarded_for(), **kwargs.pop("headers", {})}
+    return run(api().request(method, url, headers=headers, **kwargs))
+
+
+def fetch_many(**calls):
+    # independent calls run concurrently, so assembling a page takes about as long as the slowest call
+    # instead of their sum; a failed call yields its exception instead of failing the others
+    async def gather():
+        results = await asyncio.gather(*calls.values(), return_exceptions=True)
+        return dict(zip(calls, results))
+    return run(gather())
+
+
+###############################
+##reads (coroutines, errors are not cached)##
+###############################
+
+def users():
+    return api().get_json(get_users_url, ttl=CACHE_TTL)
+
+
+def task(task_id):
+    return api().get_json(get_task_url + str(task_id), ttl=CACHE_TTL)
+
+
+def task_history(task_id):
+    return api().get_pages(task_history_url + str(task_id) + "/", ttl=CACHE_TTL)
+
+
+def filtered_tasks(params):
+    return api().get_pages(get_task_filter_url, params=dict(params), ttl=CACHE_TTL)
+
+
+def user_tasks(usr_id, token):
+    return api().get_pages(get_user_tasks_url + str(usr_id), headers={"Authorization": f"Bearer {token}"}, ttl=CACHE_TTL)
+
+
+async def bundle(tab, task_id=None):
+    # data of a whole screen in one request (/api/ui/<tab>/); not cached, it starts the change feed sync
+    params = {'task_id': task_id} if task_id is not None else None
+    data = await api().get_json(f"{ui_bundle_url}{tab}/", params=params)
+    if data.get('tasks_next'):
+        # the bundle embeds only the first page of the task list, the rest comes from /api/task/all/
+        data['tasks'] = data['tasks'] + await api().get_pages(data['tasks_next'])
+    return data
+
+
+async def tasks_since(seq):
+    # without a sequence number: the current one and then the full task list (in this order, so no change is missed);
+    # afterwards only the change feed events after it -> (seq, tasks or None, events)
+    if seq is None:
+        head = await api().get_json(task_feed_url)
+        return head['seq'], await api().get_pages(get_tasks_url), []
+    events = []
+    while True:
+        page = await api().get_json(task_feed_url, params={'after': seq, 'timeout': 0})
+        events.extend(page['events'])
+        seq = page['seq']
+        if not page['events']:
+            return seq, None, events
+
+
+###############################
+##sync facade##
+###############################
+
+def fetch_users():
+    return run(users())
+
+
+def fetch_task(task_id):
+    return run(task(task_id))
+
+
+def fetch_task_history(task_id):
+    return run(task_history(task_id))
+
+
+def fetch_filtered_tasks(params):
+    return run(filtered_tasks(params))
+
+
+def fetch_user_tasks(usr_id, token):
+    return run(user_tasks(usr_id, token))
+
+
+def invalidate_tasks(before=None):
+    # after a write (own or seen in the change feed) cached task reads are stale
+    api().invalidate(get_task_url, get_user_tasks_url, before=before)
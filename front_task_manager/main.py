@@ -1,22 +1,30 @@
-import streamlit as st
-import requests
-
-#api links
-#BASE_API_URL = "http://django_api:8000"
-#BASE_API_URL = "http://localhost:8000"
-BASE_API_URL = "http://backend:8000"
+import time
 
+import httpx
+import streamlit as st
 
-login_url = f"{BASE_API_URL}/api/token/"
-register_url = f"{BASE_API_URL}/api/user/register/"
-get_user_tasks_url = f"{BASE_API_URL}/api/user/tasks/"
-add_task_url = f"{BASE_API_URL}/api/task/create/"
-get_users_url = f"{BASE_API_URL}/api/user/all/"
-get_tasks_url = f"{BASE_API_URL}/api/task/all/"
-get_task_url = f"{BASE_API_URL}/api/task/"
-edit_task_url = f"{BASE_API_URL}/api/task/edit/"
-task_history_url = f"{BASE_API_URL}/api/task/history/"
-get_task_filter_url = f"{BASE_API_URL}/api/task/filter/"
+from client import (
+    CACHE_TTL,
+    ApiError,
+    add_task_url,
+    api_send,
+    bundle,
+    edit_task_url,
+    fetch_filtered_tasks,
+    fetch_many,
+    fetch_task,
+    fetch_task_history,
+    fetch_user_tasks,
+    fetch_users,
+    invalidate_tasks,
+    login_url,
+    register_url,
+    tasks_since,
+)
+from client import filtered_tasks as read_filtered_tasks
+from client import task as read_task
+from client import task_history as read_task_history
+from client import users as read_users
 
 
 if 'token' not in st.session_state:
@@ -44,14 +52,14 @@ def task_serializer(task):
 ###################
 
 def login(name, password):
-    response = requests.post(login_url, json={"username": name, "password": password})
+    response = api_send("POST", login_url, json={"username": name, "password": password})
     if response.status_code == 200:
         return response.json()['access']  
     return None
 
 
 def register(username, email, password):
-    response = requests.post(register_url, json={"username": username, "email": email, "password": password})
+    response = api_send("POST", register_url, json={"username": username, "email": email, "password": password})
     if response.status_code == 201:
         return response.json()['access'] 
     return None
@@ -84,54 +92,71 @@ def login_screen():
 ##get info functions##
 ######################
 
-def get_user_id(name):
-    response = requests.get(get_users_url)
-    users = response.json()
-    for user in users:
-        if user['username'] == name:
-            return user['id']
-    return None
-
-
-def get_user_name(usr_id):
-    response = requests.get(get_users_url)
-    users = response.json()
-    for user in users:
-        if user['id'] == usr_id:
-            return user['username']
-    return None
+def get_user_name(usr_id, users):
+    return users.get(usr_id)
 
 
 def get_task_history(task_id):
-    response = requests.get(task_history_url+str(task_id))
-    for entry in response.json():
-        entry['created_at'] = entry['created_at'].replace("T", " ").replace("Z", "")
+    try:
+        history = fetch_task_history(task_id)
+    except (ApiError, httpx.HTTPError):
+        return []
+    for entry in history:
         entry['created_at'] = entry['created_at'].replace("T", " ").replace("Z", "")
         entry['updated_at'] = entry['updated_at'].replace("T", " ").replace("Z", "")
         if entry['deleted_at']:
             entry['deleted_at'] = entry['deleted_at'].replace("T", " ").replace("Z", "")
-    if response.status_code == 200:
-        return response.json()
-    return []
+    return history
+
+
+def apply_task_event(tasks, event):
+    # create/snapshot events carry the whole task, update events only the changed fields
+    task_id = event['task_id']
+    if event['kind'] == 'delete':
+        tasks.pop(task_id, None)
+        return
+    task = tasks.get(task_id)
+    if task is not None and task.get('version', 0) >= event['version']:
+        return
+    if task is None or event['snapshot']:
+        task = tasks[task_id] = {'id': task_id}
+    task.update(event['changes'])
+    task['version'] = event['version']
+    task['updated_at'] = event['created_at']
+
+
+def sync_tasks(result, started):
+    # full task list once per session, afterwards only the changes from the feed since the last sequence number
+    # (result of client.tasks_since fetched by load_page)
+    if isinstance(result, Exception):
+        raise result
+    seq, tasks, events = result
+    if tasks is not None:
+        st.session_state.tasks = {task['id']: task for task in tasks}
+    for event in events:
+        apply_task_event(st.session_state.tasks, event)
+    if events:
+        # reads fetched together with the feed already include these changes
+        invalidate_tasks(before=started)
+    st.session_state.feed_seq = seq
+    return st.session_state.tasks
 
 
 def get_user_tasks(usr_id):
-    headers = {"Authorization": f"Bearer {st.session_state.token}"}
-    response = requests.get(get_user_tasks_url + str(usr_id), headers=headers)
-    tasks = response.json()
+    tasks = fetch_user_tasks(usr_id, st.session_state.token)
     task_list = []
     for task in tasks:
         task_list.append(task_serializer(task))
     return task_list
 
 
-def get_task(task_id):
-    response = requests.get(get_task_url + str(task_id))
-    task = response.json()
-    return task_serializer(task)
+def get_task(task_id, prefetched=None):
+    if not isinstance(prefetched, dict) or prefetched.get('id') != task_id:
+        prefetched = fetch_task(task_id)
+    return task_serializer(prefetched)
 
 
-def api_filter_tasks(status=None, keyword=None, assigned_user=None):
+def filter_params(status=None, keyword=None, assigned_user=None):
     params = {}
     if status:
         params['status'] = status.upper()
@@ -139,12 +164,14 @@ def api_filter_tasks(status=None, keyword=None, assigned_user=None):
         params['keyword'] = keyword
     if assigned_user:
         params['assigned_user'] = assigned_user
+    return tuple(sorted(params.items()))
 
-    response = requests.get(get_task_filter_url, params=params)
-    
-    if response.status_code == 200:
-        return response.json()
-    return []
+
+def api_filter_tasks(status=None, keyword=None, assigned_user=None):
+    try:
+        return fetch_filtered_tasks(filter_params(status, keyword, assigned_user))
+    except (ApiError, httpx.HTTPError):
+        return []
 
 
 
@@ -160,8 +187,9 @@ def api_add_task(name, description, status, assigned_user):
         "assigned_user": assigned_user
     }
     print("Posting JSON:", task_data)
-    response = requests.post(add_task_url, json=task_data, headers=headers)
+    response = api_send("POST", add_task_url, json=task_data, headers=headers)
     if response.status_code == 201:
+        invalidate_tasks()
         return True
     return False
 
@@ -175,15 +203,17 @@ def api_edit_task(task_id, name, description, status, assigned_user):
         "assigned_user": assigned_user
     }
     print("Posting JSON:", task_data)
-    response = requests.post(edit_task_url + str(task_id) + "/", json=task_data, headers=headers)
+    response = api_send("POST", edit_task_url + str(task_id) + "/", json=task_data, headers=headers)
     if response.status_code == 201 or response.status_code == 200:
+        invalidate_tasks()
         return True
     return False
 
 def api_delete_task(task_id):
     headers = {"Authorization": f"Bearer {st.session_state.token}"}
-    response = requests.delete(edit_task_url + str(task_id) + "/", headers=headers)
+    response = api_send("DELETE", edit_task_url + str(task_id) + "/", headers=headers)
     if response.status_code == 204:
+        invalidate_tasks()
         return True
     return False
 
@@ -191,36 +221,81 @@ def api_delete_task(task_id):
 ############
 #dropdowns##
 ############
-def api_get_all_users():
+def api_get_all_users(users_list=None):
     try:
-        response = requests.get(get_users_url, timeout=5)  # Add timeout
-        if response.status_code != 200:
-            print(f"Error: API returned status code {response.status_code}")
-            return {}  
-        users_list = response.json()
+        if users_list is None or isinstance(users_list, Exception):
+            users_list = fetch_users()  # cached for CACHE_TTL, shared by all sessions
         return {user["id"]: user["username"] for user in users_list}  # Convert to dictionary
-    except requests.exceptions.RequestException as e:
+    except ApiError as e:
+        print(f"Error: {e}")
+        return {}
+    except httpx.HTTPError as e:
         print(f"Request failed: {e}")
         return {}
 
-def api_get_all_tasks():
+def api_get_all_tasks(result, started):
     try:
-        response = requests.get(get_tasks_url, timeout=5)  # Add timeout
-        if response.status_code != 200:
-            print(f"Error: API returned status code {response.status_code}")
-            return {}  
-        tasks = response.json()
-        print("API response:", tasks)
-        task_dict = {task['id']: task['name'] for task in tasks}
+        # tasks are kept in the session and updated incrementally from the change feed
+        tasks = sync_tasks(result, started)
+        task_dict = {task_id: task['name'] for task_id, task in tasks.items()}
         return task_dict
-    except requests.exceptions.RequestException as e:
+    except ApiError as e:
+        print(f"Error: {e}")
+        return {}
+    except httpx.HTTPError as e:
         print(f"Request failed: {e}")
         return {}
 
 
+def selected(key, options):
+    # current value of a select widget (its default - the first option - before it was rendered)
+    value = st.session_state.get(key)
+    return value if value in options else next(iter(options), None)
+
+
+def load_page():
+    # every read this rerun needs, issued concurrently: the task list sync always, the other reads
+    # only when cached (they also warm the client cache for later reruns);
+    # widget keys tell which task is selected and which button was pressed
+    state = st.session_state
+    started = time.monotonic()
+    if state.get('feed_seq') is None:
+        # first render of the session: feed position, task list, users and the edited task
+        # (the first one) in a single request
+        page = fetch_many(bundle=bundle('edit'))
+        data = page.pop('bundle')
+        if isinstance(data, Exception):
+            page['tasks'] = data
+        else:
+            page['tasks'] = (data['seq'], data['tasks'], [])
+            page['users'] = [{'id': int(usr_id), 'username': name} for usr_id, name in data['users'].items()]
+            page['task'] = data['task']
+        return page, started
+    calls = {'tasks': tasks_since(state.get('feed_seq'))}
+    if CACHE_TTL > 0:
+        known = state.get('tasks', {})
+        calls['users'] = read_users()
+        edited = selected('edit_task', known)
+        if edited is not None:
+            calls['task'] = read_task(edited)
+        if state.get('apply_filters'):
+            calls['filtered'] = read_filtered_tasks(filter_params(
+                state.get('status_filter'), state.get('keyword_filter'), state.get('user_filter'),
+            ))
+        history = selected('history_task', known)
+        if state.get('show_history') and history is not None:
+            calls['history'] = read_task_history(history)
+    return fetch_many(**calls), started
+
+
 def main(): 
     login_screen()
 
+    # fetched once per render (concurrently) and shared by all tabs
+    page, started = load_page()
+    users = api_get_all_users(page.get('users'))
+    tasks = api_get_all_tasks(page['tasks'], started)
+
     add_task, edit_task, check_task, task_history = st.tabs(["Add task", "Edit task", "Check task", "Task history"])
    
     with add_task:
@@ -228,7 +303,6 @@ def main():
         name = st.text_input("Task name")
         description = st.text_area("Description")
         status = st.selectbox("Status", ["New", "In progress", "Solved"])
-        users = api_get_all_users()
         assigned_user_name = st.selectbox("Assigned user", list(users.values()))
         assigned_user_id = list(users.keys())[list(users.values()).index(assigned_user_name)] if assigned_user_name in users.values() else None
         if st.button("Add task"):
@@ -240,16 +314,13 @@ def main():
     with edit_task:
         st.title("Edit task")
         
-        tasks = api_get_all_tasks()
-        selected_task = st.selectbox("Select task to edit", list(tasks.values()))
+        task_id = st.selectbox("Select task to edit", list(tasks), format_func=tasks.get, key="edit_task")
         
-        task_id = list(tasks.keys())[list(tasks.values()).index(selected_task)]
-        task = get_task(task_id)
+        task = get_task(task_id, page.get('task'))
         
         name1 = st.text_input("Task name", value=task.name)
         description1 = st.text_area("Description", value=task.description)
         status1 = st.selectbox("Status", ["New", "In progress", "Solved"], placeholder='choose status')
-        users = api_get_all_users()
         assigned_user_name = st.selectbox("Assigned user", list(users.values()), placeholder='choose user')
         assigned_user_id = list(users.keys())[list(users.values()).index(assigned_user_name)] if assigned_user_name in users.values() else None
         
@@ -269,22 +340,23 @@ def main():
         
     with check_task:
         st.title("Filter tasks")
-        users = api_get_all_users()
-        status_filter = st.selectbox("Filter by status", ["", "New", "In progress", "Solved"])
-        keyword_filter = st.text_input("Search by keyword in description")
-        assigned_user_filter = st.selectbox("Filter by assigned user", [""] + list(users.values()))
+        status_filter = st.selectbox("Filter by status", ["", "New", "In progress", "Solved"], key="status_filter")
+        keyword_filter = st.text_input("Search by keyword in description", key="keyword_filter")
+        assigned_user_filter = st.selectbox(
+            "Filter by assigned user", [None] + list(users), format_func=lambda usr_id: users.get(usr_id, ""), key="user_filter",
+        )
         
-        if st.button("Apply Filters"):
-            filtered_tasks = api_filter_tasks(status=status_filter, keyword=keyword_filter, assigned_user=get_user_id(assigned_user_filter))
+        if st.button("Apply Filters", key="apply_filters"):
+            filtered_tasks = api_filter_tasks(status=status_filter, keyword=keyword_filter, assigned_user=assigned_user_filter)
             print("Status filter:", status_filter)
             print("Keyword filter:", keyword_filter)
-            print("Assigned user filter:", assigned_user_filter)
+            print("Assigned user filter:", get_user_name(assigned_user_filter, users))
             print("Filtered tasks:", filtered_tasks)  
             if filtered_tasks:
                 for task in filtered_tasks:
                     st.write(f"**{task['name']}** - {task['status']}")
                     st.write(f"Description: {task['description']}")
-                    st.write(f"Assigned to: {get_user_name(task['assigned_user'])}")
+                    st.write(f"Assigned to: {get_user_name(task['assigned_user'], users)}")
                     st.write("---")
             else:
                 st.write("No tasks match the filters.")
@@ -292,11 +364,9 @@ def main():
     with task_history:
         st.title("Task History")
 
-        tasks = api_get_all_tasks()
-        selected_task = st.selectbox("Select Task", list(tasks.values()))
+        task_id = st.selectbox("Select Task", list(tasks), format_func=tasks.get, key="history_task")
 
-        if st.button("Show History"):
-            task_id = list(tasks.keys())[list(tasks.values()).index(selected_task)]
+        if st.button("Show History", key="show_history"):
             history_data = get_task_history(task_id)
 
             if history_data:
@@ -304,6 +374,7 @@ def main():
                     st.write(f"**Updated At:** {entry['updated_at']}")
                     st.write(f"**Task Name:** {entry['name']}")
                     st.write(f"**Description:** {entry['description']}")
+                    st.write(f"**Status:** {entry['status']}")
                     st.write(f"**Assigned User:** {entry['assigned_user']}")
                     st.write(f"**Created At:** {entry['created_at']}")
                     st.write(f"**Deleted At:** {entry['deleted_at'] if entry['deleted_at'] else 'Not Deleted'}")
@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import authentication
+        from .cache import user_changed
+        from .counters import user_deleted
+        from .metrics import install_recorder
+        from .search import install_fts_triggers
+        post_migrate.connect(install_fts_triggers, sender=self)
+        connection_created.connect(install_recorder)
+        pre_delete.connect(user_deleted, sender='api.User')
+        pre_save.connect(authentication.user_saving, sender='api.User')
+        post_save.connect(authentication.user_saved, sender='api.User')
+        post_delete.connect(authentication.user_deleted, sender='api.User')
+        post_save.connect(user_changed, sender='api.User')
+        post_delete.connect(user_changed, sender='api.User')
@@ -0,0 +1,250 @@
+import gzip
+import heapq
+import itertools
+import json
+import os
+from datetime import datetime
+from operator import attrgetter
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, OuterRef, Subquery
+
+from . import partitions
+from .history import history_entries, replay, user_ids
+from .models import TaskEvent, User
+
+
+# Archiwum historii (archive_task_history): jeden plik NDJSON (gzip) na miesiąc zdarzeń
+# i obok niego manifest {task_id: [najniższa wersja, najwyższa wersja, offset, długość]}.
+# Plik to ciąg niezależnych członów gzip (bloków) po ok. ARCHIVE_BLOCK_SIZE bajtów danych,
+# dzielonych na granicy zadań - odczyt historii jednego zadania otwiera tylko pliki
+# miesięcy, w których zadanie ma zdarzenia, i rozpakowuje z nich jeden blok.
+# Zdarzenia miesiąca są czytane kursorem partiami (ARCHIVE_CHUNK_SIZE), a plik pisany
+# na bieżąco - pamięć nie zależy od liczby archiwizowanych zdarzeń.
+
+ARCHIVE_CHUNK_SIZE = 2000
+ARCHIVE_BLOCK_SIZE = 64 * 1024
+REBASE_BATCH_SIZE = 1000
+
+def archive_path(start):
+    return Path(settings.TASK_HISTORY_ARCHIVE_DIR) / f'taskevent-{start.year}-{start.month:02}.ndjson.gz'
+
+
+def manifest_path(start):
+    return archive_path(start).with_name(f'taskevent-{start.year}-{start.month:02}.tasks.json')
+
+
+def dump(event):
+    return json.dumps({
+        'id': event.id,
+        'task_id': event.task_id,
+        'version': event.version,
+        'kind': event.kind,
+        'snapshot': event.snapshot,
+        'changes': event.changes,
+        'created_at': event.created_at.isoformat(),
+    })
+
+
+def load(line):
+    data = json.loads(line)
+    data['created_at'] = datetime.fromisoformat(data['created_at'])
+    return TaskEvent(**data)
+
+
+def read_archive(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        for line in file:
+            yield load(line)
+
+
+def read_block(path, entry):
+    """
+    Zdarzenia bloku archiwum wskazanego wpisem manifestu; archiwa bez
+    offsetów bloków (wpis [najniższa, najwyższa wersja]) są czytane w całości.
+    """
+    if len(entry) < 4:
+        yield from read_archive(path)
+        return
+    _, _, offset, length = entry
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        data = gzip.decompress(file.read(length))
+    for line in data.decode('utf-8').splitlines():
+        yield load(line)
+
+
+def write_atomic(path, write):
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp, path)
+
+
+def event_key(event):
+    return event.task_id, event.version
+
+
+def merge(archived, events):
+    """
+    Scala dwa strumienie zdarzeń posortowane po (task_id, version); przy
+    powtórzonej wersji pierwszeństwo mają zdarzenia z bazy (events).
+    """
+    merged = heapq.merge(((event_key(event), 0, event) for event in archived), ((event_key(event), 1, event) for event in events))
+    for _, group in itertools.groupby(merged, key=lambda item: item[0]):
+        *_, (_, _, event) = group
+        yield event
+
+
+def write_archive(start, events):
+    """
+    Zapisuje zdarzenia miesiąca (posortowane po task_id, version) do archiwum,
+    łącząc je z już zarchiwizowanymi. Zwraca liczbę zdarzeń z events.
+    """
+    path = archive_path(start)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    manifest, written = {}, 0
+
+    def counted(events):
+        nonlocal written
+        for event in events:
+            written += 1
+            yield event
+
+    def write_events(file):
+        archived = read_archive(path) if path.exists() else ()
+        block, size, tasks = [], 0, []
+
+        def write_block():
+            data = gzip.compress(b''.join(block))
+            offset = file.tell()
+            file.write(data)
+            for task_id in tasks:
+                manifest[task_id] += [offset, len(data)]
+            block.clear()
+            tasks.clear()
+
+        for event in merge(archived, counted(events)):
+            if event.task_id not in manifest:
+                # nowy blok tylko na granicy zadań - zdarzenia zadania są w jednym bloku
+                if size >= ARCHIVE_BLOCK_SIZE:
+                    write_block()
+                    size = 0
+                manifest[event.task_id] = [event.version, event.version]
+                tasks.append(event.task_id)
+            entry = manifest[event.task_id]
+            entry[0], entry[1] = min(entry[0], event.version), max(entry[1], event.version)
+            line = dump(event).encode() + b'\n'
+            block.append(line)
+            size += len(line)
+        if block:
+            write_block()
+
+    write_atomic(path, write_events)
+    write_atomic(manifest_path(start), lambda file: file.write(json.dumps(manifest).encode()))
+    return written
+
+
+def rebase(events, end):
+    """
+    Zamienia najstarsze pozostające w bazie zdarzenie każdego zadania z
+    archiwizowanego miesiąca w snapshot (pełny stan), żeby odtworzenie
+    wersji z bazy nie wymagało zdarzeń z archiwum. events - zdarzenia
+    miesiąca posortowane po (task_id, version), przetwarzane partiami
+    REBASE_BATCH_SIZE zadań. Zwraca liczbę zmienionych zdarzeń.
+    """
+    first = (
+        TaskEvent.objects.filter(task_id=OuterRef('task_id'), created_at__gte=end)
+        .values('task_id').annotate(v=Min('version')).values('v')
+    )
+    count, states = 0, {}
+
+    def flush():
+        rebased = []
+        for event in TaskEvent.objects.filter(
+            task_id__in=list(states), created_at__gte=end, version=Subquery(first), snapshot=False,
+        ):
+            version, state = states[event.task_id]
+            if version == event.version - 1:
+                event.changes, event.snapshot = {**state, **event.changes}, True
+                rebased.append(event)
+        TaskEvent.objects.bulk_update(rebased, ['changes', 'snapshot'], batch_size=REBASE_BATCH_SIZE)
+        states.clear()
+        return len(rebased)
+
+    for task_id, task_events in itertools.groupby(events, key=attrgetter('task_id')):
+        for event, state in replay(task_events):
+            states[task_id] = (event.version, state)
+        if len(states) >= REBASE_BATCH_SIZE:
+            count += flush()
+    if states:
+        count += flush()
+    return count
+
+
+def archive_month(start):
+    """
+    Przenosi zdarzenia miesiąca do archiwum: zapis pliku, a potem w jednej
+    transakcji snapshoty dla zdarzeń pozostających w bazie i usunięcie
+    partycji (PostgreSQL) lub wierszy. Zwraca liczbę zarchiwizowanych zdarzeń.
+    """
+    end = partitions.add_months(start, 1)
+    qs = TaskEvent.objects.filter(created_at__gte=start, created_at__lt=end)
+    if not qs.exists():
+        if partitions.is_partitioned():
+            partitions.drop_partition(start)
+        return 0
+
+    def events():
+        return qs.order_by('task_id', 'version').iterator(chunk_size=ARCHIVE_CHUNK_SIZE)
+
+    # odtwarzanie wymaga ciągu od snapshotu - najstarsze zdarzenie zadania
+    # w bazie jest snapshotem (wersja 1 lub wcześniejszy rebase)
+    count = write_archive(start, events())
+    with transaction.atomic():
+        # drugi przebieg kursorem zamiast trzymania zdarzeń miesiąca w pamięci
+        rebase(events(), end)
+        if partitions.is_partitioned():
+            partitions.drop_partition(start)
+        # zdarzenia z partycji domyślnej (lub cała tabela poza PostgreSQL)
+        qs.delete()
+    return count
+
+
+def archived_events(task_id):
+    """
+    Zarchiwizowane zdarzenia zadania w kolejności wersji.
+    """
+    directory = Path(settings.TASK_HISTORY_ARCHIVE_DIR)
+    events = []
+    for manifest in sorted(directory.glob('taskevent-*.tasks.json')):
+        entry = json.loads(manifest.read_text()).get(str(task_id))
+        if entry is None:
+            continue
+        path = manifest.with_name(manifest.name.replace('.tasks.json', '.ndjson.gz'))
+        events.extend(event for event in read_block(path, entry) if event.task_id == task_id)
+    return sorted(events, key=lambda event: event.version)
+
+
+def full_history(task_id):
+    """
+    Wszystkie zdarzenia zadania: z archiwum i z bazy (pierwszeństwo ma baza).
+    """
+    events = {event.version: event for event in archived_events(task_id)}
+    events.update((event.version, event) for event in TaskEvent.objects.filter(task_id=task_id).order_by('version'))
+    return [events[version] for version in sorted(events)]
+
+
+def archived_task_history(task_id):
+    """
+    Wpisy historii zadania jak api.history.task_history, ale wszystkie
+    (z archiwum i z bazy) od najnowszych - bez stronicowania.
+    """
+    events = full_history(task_id)
+    page = [event for event in reversed(events) if event.version > 1]
+    usernames = dict(User.objects.filter(id__in=user_ids(events)).values_list('id', 'username'))
+    return history_entries(page, events, usernames)
@@ -0,0 +1,200 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.views import View
+from rest_framework.exceptions import NotAcceptable, NotFound, ValidationError
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .archive import archived_task_history
+from .conditional import atable_validators, atask_validators, representation_etag, set_validators
+from .feed import ahead, along_poll, astream, parse_after, parse_limit, parse_timeout, stream_headers, wants_stream
+from .export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, HISTORY_EXPORT_FIELDS, TASK_EXPORT_FIELDS, astream_export, astream_rows
+from .filters import filter_task_events, filter_tasks
+from .history import aexport_rows, history_entries, history_range, replay_range, user_ids
+from .models import Task, TaskEvent, TableVersion, User
+from .pagination import KeysetPage
+from .projection import project, selected_fields
+from .routers import AsyncReplicaReadMixin
+from .serializer import TaskHistorySerializer, TaskListSerializer, TaskSerializer
+
+# ===== ASYNC TASK VIEWS (tryb ASGI, zob. settings.API_ASYNC_VIEWS) =====
+
+NOT_FOUND = {'detail': 'Not found.'}
+
+
+def accepted_renderer(request):
+    """
+    Renderer wynegocjowany z nagłówka Accept spośród DEFAULT_RENDERER_CLASSES
+    (bez BrowsableAPIRenderer, który wymaga widoku DRF). None - format nieobsługiwany.
+    """
+    if not hasattr(request, 'accepted_renderer'):
+        renderers = [cls() for cls in api_settings.DEFAULT_RENDERER_CLASSES if cls.format != 'api']
+        try:
+            request.accepted_renderer = DefaultContentNegotiation().select_renderer(Request(request), renderers)[0]
+        except NotAcceptable:
+            request.accepted_renderer = None
+    return request.accepted_renderer
+
+
+def respond(request, data, status=200):
+    renderer = accepted_renderer(request) or api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    content_type = renderer.media_type if renderer.charset is None else f'{renderer.media_type}; charset={renderer.charset}'
+    return HttpResponse(renderer.render(data), content_type=content_type, status=status)
+
+
+async def conditional(request, validators, build):
+    """
+    Asynchroniczny odpowiednik api.conditional.ConditionalGetMixin.
+    """
+    if accepted_renderer(request) is None:
+        return respond(request, {'detail': NotAcceptable.default_detail}, status=406)
+    etag, last_modified = validators
+    if etag is None:
+        return await build()
+    etag = representation_etag(etag, accepted_renderer(request).format)
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+    if response is None:
+        response = await build()
+    return set_validators(response, etag, last_modified)
+
+
+async def task_page(request, qs, ordering):
+    """
+    Strona listy zadań z projekcją ?fields= (api.projection) i walidatorami kolekcji.
+    """
+    try:
+        fields = selected_fields(request.GET)
+    except ValidationError as exc:
+        return respond(request, exc.detail, status=400)
+
+    async def build():
+        try:
+            page = KeysetPage(request, ordering)
+            rows = page.paginate([row async for row in page.queryset(project(qs, fields))])
+        except NotFound as exc:
+            return respond(request, {'detail': exc.detail}, status=404)
+        return respond(request, page.response_data(rows, TaskListSerializer(rows, many=True, field_names=fields).data))
+
+    return await conditional(request, await atable_validators(TableVersion.TASKS), build)
+
+
+class AsyncTaskListView(AsyncReplicaReadMixin, View):
+    """
+    Zwraca wszystkie zadania (asynchronicznie).
+    """
+
+    async def get(self, request):
+        return await task_page(request, Task.objects.all(), ['created_at', 'id'])
+
+
+class AsyncTaskFilterView(AsyncReplicaReadMixin, View):
+    """
+    Zwraca listę zadań z możliwością filtrowania (asynchronicznie), parametry jak w TaskFilterView.
+    """
+
+    async def get(self, request):
+        qs = filter_tasks(Task.objects.all(), request.GET)
+        ordering = ['-search_rank', 'id'] if 'search_rank' in qs.query.annotations else ['created_at', 'id']
+        return await task_page(request, qs, ordering)
+
+
+class AsyncTaskDetailView(AsyncReplicaReadMixin, View):
+    """
+    Zwraca szczegóły konkretnego zadania (asynchronicznie).
+    """
+
+    async def get(self, request, task_id):
+        validators = await atask_validators(task_id)
+        if validators[0] is None:
+            return respond(request, NOT_FOUND, status=404)
+
+        async def build():
+            try:
+                task = await Task.objects.aget(id=task_id)
+            except Task.DoesNotExist:
+                return respond(request, NOT_FOUND, status=404)
+            return respond(request, TaskSerializer(task).data)
+
+        return await conditional(request, validators, build)
+
+
+class AsyncTaskHistoryView(AsyncReplicaReadMixin, View):
+    """
+    Zwraca historię zmian danego zadania odtworzoną z logu zdarzeń (asynchronicznie),
+    z ?archived=1 - całą, łącznie z zarchiwizowaną.
+    """
+
+    async def get(self, request, task_id):
+        if request.GET.get('archived'):
+            entries = await sync_to_async(archived_task_history)(task_id)
+            if not entries:
+                return respond(request, {"message": "No history found for this task"}, status=404)
+            return respond(request, {'next': None, 'previous': None, 'results': TaskHistorySerializer(entries, many=True).data})
+        qs = TaskEvent.objects.filter(task_id=task_id, version__gt=1)
+        try:
+            page = KeysetPage(request, ['-version'])
+            rows = page.paginate([event async for event in page.queryset(qs)])
+        except NotFound as exc:
+            return respond(request, {'detail': exc.detail}, status=404)
+        if not rows and page.cursor is None:
+            return respond(request, {"message": "No history found for this task"}, status=404)
+        entries = []
+        if rows:
+            replayed = [event async for event in replay_range(task_id, *history_range(rows))]
+            users = User.objects.filter(id__in=user_ids(replayed)).values_list('id', 'username')
+            entries = history_entries(rows, replayed, {user_id: username async for user_id, username in users})
+        return respond(request, page.response_data(rows, TaskHistorySerializer(entries, many=True).data))
+
+
+class AsyncTaskExportView(View):
+    """
+    Strumieniowy eksport zadań (asynchronicznie), parametry jak w TaskExportView.
+    """
+
+    async def get(self, request):
+        export_format = request.GET.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return respond(request, {'error': 'Unsupported export format'}, status=400)
+        qs = filter_tasks(Task.objects.all(), request.GET).order_by('id')
+        return astream_export(qs, TASK_EXPORT_FIELDS, export_format, 'tasks')
+
+
+class AsyncTaskHistoryExportView(View):
+    """
+    Strumieniowy eksport historii zadań (asynchronicznie), parametry jak w TaskHistoryExportView.
+    """
+
+    async def get(self, request):
+        export_format = request.GET.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return respond(request, {'error': 'Unsupported export format'}, status=400)
+        try:
+            qs = filter_task_events(TaskEvent.objects.all(), request.GET)
+        except ValidationError as exc:
+            return respond(request, exc.detail, status=400)
+        events = qs.aiterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return astream_rows(aexport_rows(events), HISTORY_EXPORT_FIELDS, export_format, 'task_history')
+
+
+class AsyncTaskFeedView(View):
+    """
+    Strumień zmian zadań (asynchronicznie), parametry jak w TaskFeedView.
+    Oczekujący klienci nie zajmują wątków - jeden worker obsługuje wiele strumieni.
+    """
+
+    async def get(self, request):
+        try:
+            after, limit, timeout = parse_after(request), parse_limit(request), parse_timeout(request)
+        except ValidationError as exc:
+            return respond(request, exc.detail, status=400)
+        if wants_stream(request):
+            after = await ahead() if after is None else after
+            return StreamingHttpResponse(astream(after, limit), content_type='text/event-stream', headers=stream_headers())
+        if accepted_renderer(request) is None:
+            return respond(request, {'detail': NotAcceptable.default_detail}, status=406)
+        if after is None:
+            return respond(request, {'events': [], 'seq': await ahead()})
+        events = await along_poll(after, limit, timeout)
+        return respond(request, {'events': events, 'seq': events[-1]['seq'] if events else after})
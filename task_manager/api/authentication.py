@@ -0,0 +1,221 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import RevokedToken, User
+
+
+class UserCache:
+    """
+    Użytkownicy z tokenów w cache LRU procesu: {user_id: (wygasa, użytkownik)}.
+    discard() przy zmianie użytkownika podnosi generację, więc odczyt z bazy
+    rozpoczęty przed zmianą nie zapisze w cache starego stanu.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.generation = 0
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            # kopia - widoki mogą modyfikować request.user
+            return copy.copy(entry[1])
+
+    def put(self, user_id, user, generation):
+        if self.ttl <= 0:
+            return
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[user_id] = (time.monotonic() + self.ttl, user)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self.lock:
+            self.generation += 1
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+
+class Denylist:
+    """
+    Unieważnione tokeny w pamięci procesu: {jti: exp} i {user_id: unieważnione przed}.
+    Źródłem jest tabela RevokedToken: co AUTH_DENYLIST_REFRESH_SECONDS jedno
+    zapytanie (liczba wierszy i największe id) sprawdza, czy coś się zmieniło,
+    i tylko wtedy lista jest wczytywana na nowo (także wpisy zatwierdzone
+    w innej kolejności niż nadane id). Unieważnienie w innym workerze działa
+    najpóźniej po tym czasie, w bieżącym - od razu. Wygasłe wpisy są usuwane,
+    więc rozmiar zależy od liczby unieważnień w czasie życia tokenów.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tokens = {}
+        self.users = {}
+        self.state = None
+        self.checked = None
+
+    def refresh(self):
+        now = time.monotonic()
+        if self.checked is not None and now - self.checked < settings.AUTH_DENYLIST_REFRESH_SECONDS:
+            return
+        self.checked = now
+        rows = RevokedToken.objects.using('default')
+        state = rows.aggregate(count=Count('id'), last=Max('id'))
+        if state == self.state:
+            return
+        tokens, revoked_users = {}, {}
+        for jti, user_id, created_at, expires_at in (
+            rows.filter(expires_at__gt=timezone.now()).values_list('jti', 'user_id', 'created_at', 'expires_at')
+        ):
+            self.apply(tokens, revoked_users, jti, user_id, created_at, expires_at)
+        with self.lock:
+            changed = [user_id for user_id, revoked in revoked_users.items() if self.users.get(user_id) != revoked]
+            self.tokens, self.users, self.state = tokens, revoked_users, state
+        for user_id in changed:
+            user_cache.discard(user_id)
+
+    @staticmethod
+    def apply(tokens, revoked_users, jti, user_id, created_at, expires_at):
+        if jti:
+            tokens[jti] = expires_at.timestamp()
+        else:
+            key = str(user_id)
+            revoked_users[key] = max(revoked_users.get(key, 0), created_at.timestamp())
+
+    def add(self, jti, user_id, created_at, expires_at):
+        with self.lock:
+            self.apply(self.tokens, self.users, jti, user_id, created_at, expires_at)
+        if not jti:
+            user_cache.discard(str(user_id))
+
+    def is_revoked(self, token):
+        self.refresh()
+        if token.get(api_settings.JTI_CLAIM) in self.tokens:
+            return True
+        # iat ma rozdzielczość sekund - token wystawiony w sekundzie unieważnienia pozostaje ważny
+        revoked = self.users.get(str(token.get(api_settings.USER_ID_CLAIM)))
+        return revoked is not None and token.get('iat', 0) < int(revoked)
+
+
+user_cache = UserCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL)
+denylist = Denylist()
+
+
+def revoke_tokens(tokens):
+    """
+    Unieważnia podane tokeny (access lub refresh) do ich wygaśnięcia.
+    """
+    rows = RevokedToken.objects.bulk_create([
+        RevokedToken(
+            jti=token[api_settings.JTI_CLAIM],
+            user_id=token.get(api_settings.USER_ID_CLAIM),
+            expires_at=datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc),
+        )
+        for token in tokens
+    ])
+    for row in rows:
+        denylist.add(row.jti, row.user_id, row.created_at, row.expires_at)
+    prune_revoked()
+
+
+def revoke_user(user_id):
+    """
+    Unieważnia wszystkie wystawione dotąd tokeny użytkownika.
+    """
+    row = RevokedToken.objects.create(user_id=user_id, expires_at=timezone.now() + api_settings.REFRESH_TOKEN_LIFETIME)
+    denylist.add(row.jti, row.user_id, row.created_at, row.expires_at)
+
+
+def prune_revoked():
+    RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+
+
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    # sygnał pre_save - dezaktywacja to zapis is_active=False aktywnego dotąd użytkownika
+    # (zapytanie tylko przy zapisie nieaktywnego)
+    if instance.pk is None or instance.is_active or (update_fields is not None and 'is_active' not in update_fields):
+        return
+    instance._deactivated = User.objects.using('default').filter(pk=instance.pk, is_active=True).exists()
+
+
+def user_saved(sender, instance, created, **kwargs):
+    user_cache.discard(str(instance.pk))
+    deactivated = instance.__dict__.pop('_deactivated', False)
+    if created:
+        return
+    # set_password() zostawia nowe hasło w _password do końca save()
+    if getattr(instance, '_password', None) is not None or deactivated:
+        revoke_user(instance.pk)
+
+
+def user_deleted(sender, instance, **kwargs):
+    user_cache.discard(str(instance.pk))
+    revoke_user(instance.pk)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication bez zapytania o użytkownika przy każdym żądaniu:
+    użytkownik z identyfikatora w tokenie pochodzi z cache LRU procesu
+    (odczyt z bazy tylko przy braku lub wygaśnięciu wpisu), a tokeny
+    z listy unieważnionych (Denylist) są odrzucane bez zapytania.
+    Zapis użytkownika usuwa go z cache (sygnały w api.apps), w innych
+    workerach - najpóźniej po AUTH_USER_CACHE_TTL; zmiana hasła,
+    dezaktywacja i usunięcie unieważniają też tokeny (revoke_user).
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if denylist.is_revoked(token):
+            raise InvalidToken({'detail': 'Token is revoked', 'code': 'token_revoked'})
+        return token
+
+    def get_user(self, validated_token):
+        user_id = str(validated_token.get(api_settings.USER_ID_CLAIM))
+        user = user_cache.get(user_id)
+        if user is None:
+            generation = user_cache.generation
+            user = super().get_user(validated_token)
+            user_cache.put(user_id, user, generation)
+        return user
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    """
+    Odświeżanie tokenu (/api/token/refresh/) odrzucające unieważnione tokeny refresh.
+    """
+
+    def validate(self, attrs):
+        # niepoprawny token - TokenError, który TokenRefreshView zamienia na 401
+        refresh = RefreshToken(attrs['refresh'])
+        if denylist.is_revoked(refresh):
+            raise InvalidToken({'detail': 'Token is revoked', 'code': 'token_revoked'})
+        return super().validate(attrs)
@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.db.models import F
+from django.urls import reverse
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
+
+from .feed import head
+from .filters import filter_tasks
+from .history import task_history
+from .models import Task, TaskEvent, User
+from .pagination import encode_cursor
+from .projection import project
+from .serializer import TASK_FIELDS, TaskHistorySerializer, TaskListSerializer
+
+
+# Części odpowiedzi /api/ui/<ekran>/ w kolejności wykonywania - numer ze strumienia
+# zmian (api.feed) czytamy przed listą zadań, żeby klient wznawiający od niego
+# nie pominął żadnej zmiany
+BUNDLES = {
+    'bootstrap': ('seq', 'tasks', 'users', 'task', 'history'),
+    'add': ('users',),
+    'edit': ('seq', 'tasks', 'users', 'task'),
+    'filter': ('users', 'filtered'),
+    'history': ('seq', 'tasks', 'history'),
+}
+
+
+def parse_task_id(params):
+    value = params.get('task_id')
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({'task_id': ['A valid integer is required.']})
+
+
+def task_summaries(request):
+    """
+    Pierwsze TASK_PAGE_SIZE zadań w kolejności list (created_at, id), tylko pola
+    potrzebne do list wyboru; version pozwala klientowi pominąć starsze zdarzenia
+    ze strumienia zmian. Drugi element to adres następnej strony /api/task/all/
+    (kursor keyset za ostatnim zadaniem) lub None.
+    """
+    size = settings.TASK_PAGE_SIZE
+    rows = list(
+        Task.objects.order_by('created_at', 'id')
+        .values('id', 'name', 'status', 'assigned_user', 'created_at', version=F('history_version'))[:size + 1]
+    )
+    tasks = rows[:size]
+    next_url = None
+    if len(rows) > size:
+        last = tasks[-1]
+        next_url = replace_query_param(
+            request.build_absolute_uri(reverse('get_all_tasks')), 'cursor', encode_cursor([last['created_at'], last['id']]),
+        )
+    for row in tasks:
+        del row['created_at']
+    return tasks, next_url
+
+
+def user_map():
+    return dict(User.objects.order_by('id').values_list('id', 'username'))
+
+
+def task_detail(task_id):
+    row = Task.objects.filter(id=task_id).values(*TASK_FIELDS).first() if task_id is not None else None
+    return TaskListSerializer(row).data if row is not None else None
+
+
+def history(task_id, usernames=None):
+    """
+    Najnowsze TASK_PAGE_SIZE wpisów historii zadania i informacja, czy są starsze
+    (kolejne strony: /api/task/history/<id>/).
+    """
+    if task_id is None:
+        return [], False
+    size = settings.TASK_PAGE_SIZE
+    page = list(TaskEvent.objects.filter(task_id=task_id, version__gt=1).order_by('-version')[:size + 1])
+    entries = task_history(task_id, page[:size], usernames)
+    return TaskHistorySerializer(entries, many=True).data, len(page) > size
+
+
+def filtered(params):
+    """
+    Pierwsze TASK_PAGE_SIZE zadań z filtrami /api/task/filter/ (w jego kolejności)
+    i informacja, czy są kolejne.
+    """
+    size = settings.TASK_PAGE_SIZE
+    qs = filter_tasks(Task.objects.all(), params)
+    ordering = ('-search_rank', 'id') if 'search_rank' in qs.query.annotations else ('created_at', 'id')
+    rows = list(project(qs, TASK_FIELDS).order_by(*ordering)[:size + 1])
+    return TaskListSerializer(rows[:size], many=True, field_names=TASK_FIELDS).data, len(rows) > size
+
+
+def build(name, request):
+    """
+    Dane ekranu frontendu w jednej odpowiedzi - po jednym zapytaniu (projekcja values())
+    na część, historia dwoma. Wybrane zadanie (task, history) to ?task_id=,
+    domyślnie pierwsze z listy zadań; filtered przyjmuje parametry /api/task/filter/.
+    """
+    parts = BUNDLES[name]
+    params = request.query_params
+    task_id = parse_task_id(params)
+    data = {}
+    if 'seq' in parts:
+        data['seq'] = head()
+    if 'tasks' in parts:
+        data['tasks'], data['tasks_next'] = task_summaries(request)
+        if task_id is None and data['tasks']:
+            task_id = data['tasks'][0]['id']
+    if 'users' in parts:
+        data['users'] = user_map()
+    if 'task' in parts or 'history' in parts:
+        data['task_id'] = task_id
+    if 'task' in parts:
+        data['task'] = task_detail(task_id)
+    if 'history' in parts:
+        data['history'], data['history_more'] = history(task_id, data.get('users'))
+    if 'filtered' in parts:
+        data['filtered'], data['filtered_more'] = filtered(params)
+    return data
@@ -0,0 +1,110 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import TableVersion
+from .routers import read_alias
+
+
+def namespace_key(name):
+    return f'api:ns:{name}'
+
+
+def namespace_versions(names):
+    """
+    Zwraca aktualne wersje przestrzeni nazw cache (jednym zapytaniem do backendu).
+    Brakującą wersję zakładamy na nowo - nowa wartość z zegara gwarantuje,
+    że wpisy sprzed jej usunięcia nie zostaną ponownie odczytane.
+    """
+    keys = [namespace_key(name) for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*names):
+    """
+    Unieważnia wpisy z podanych przestrzeni nazw zmieniając ich wersję.
+    Wykonywane po zatwierdzeniu transakcji, żeby równoległy odczyt nie zapisał
+    w cache danych sprzed zapisu pod nową wersją.
+    """
+    def bump():
+        cache.set_many({namespace_key(name): time.time_ns() for name in names}, timeout=None)
+    transaction.on_commit(bump)
+
+
+def invalidate_tasks(task_ids=(), user_ids=()):
+    """
+    Unieważnia listy zadań oraz wpisy dotyczące podanych zadań i użytkowników.
+    Zwiększa też wersję tabeli zadań (walidator ETag kolekcji, api.conditional)
+    w bieżącej transakcji zapisu.
+    """
+    TableVersion.bump(TableVersion.TASKS)
+    names = {'tasks'}
+    names.update(f'task:{task_id}' for task_id in task_ids)
+    names.update(f'user_tasks:{user_id}' for user_id in user_ids if user_id is not None)
+    invalidate(*names)
+
+
+def invalidate_users():
+    TableVersion.bump(TableVersion.USERS)
+    invalidate('users')
+
+
+# pola użytkownika, których nie ma w odpowiedziach API
+PRIVATE_USER_FIELDS = frozenset({'password', 'last_login'})
+
+
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    """
+    Sygnały post_save/post_delete modelu User: każdy zapis (rejestracja, panel
+    admina, ORM) zmienia wersję tabeli użytkowników i unieważnia ich listę.
+    Pomijamy zapisy samego hasła lub last_login (np. przy logowaniu).
+    """
+    if update_fields and PRIVATE_USER_FIELDS.issuperset(update_fields):
+        return
+    invalidate_users()
+
+
+class CachedResponseMixin:
+    """
+    Read-through cache odpowiedzi GET dla widoków tylko do odczytu.
+    Klucz składa się z nazwy widoku, pełnego adresu żądania (z parametrami)
+    i wersji przestrzeni nazw z get_cache_namespaces(); zapisy w widokach
+    modyfikujących unieważniają tylko dotknięte przestrzenie (invalidate).
+    Czas życia i limit wpisów (LRU) pochodzą z ustawień CACHES.
+    """
+    cache_namespaces = ()
+
+    def get_cache_namespaces(self):
+        return [name.format(**self.kwargs) for name in self.cache_namespaces]
+
+    def get(self, request, *args, **kwargs):
+        versions = namespace_versions(self.get_cache_namespaces())
+        key = 'api:view:{}:{}:{}'.format(
+            type(self).__name__,
+            '.'.join(str(version) for version in versions),
+            hashlib.sha1(request.build_absolute_uri().encode()).hexdigest(),
+        )
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK and self.is_cacheable(versions):
+            cache.set(key, response.data)
+        return response
+
+    def is_cacheable(self, versions):
+        # Replika może jeszcze nie mieć zapisu, który zmienił wersję przestrzeni -
+        # jej odpowiedzi nie zapisujemy pod nową wersją przez DB_REPLICA_PIN_SECONDS
+        if read_alias.get() is None:
+            return True
+        return time.time_ns() - max(versions, default=0) > settings.DB_REPLICA_PIN_SECONDS * 10**9
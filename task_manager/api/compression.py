@@ -0,0 +1,59 @@
+import re
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+accept_encoding_re = _lazy_re_compile(r'\b(br|gzip)\b')
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Kompresja odpowiedzi brotli lub gzip (wg Accept-Encoding, brotli ma
+    pierwszeństwo) dla treści od API_COMPRESS_MIN_SIZE bajtów - małe
+    odpowiedzi zostają bez zmian, bo kompresja kosztuje więcej niż zyskuje.
+    Odpowiedzi strumieniowe (eksport) nie są kompresowane.
+    Kompresowane są tylko typy z API_COMPRESS_MEDIA_TYPES (JSON, MessagePack):
+    strony HTML (panel admina, przeglądarka API) zawierają token CSRF obok
+    treści z żądania i kompresja odsłaniałaby go atakiem BREACH. Gzip dodaje
+    też losowe bajty do nagłówka jak GZipMiddleware (zmienna długość odpowiedzi).
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        media_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if media_type not in settings.API_COMPRESS_MEDIA_TYPES:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.API_COMPRESS_MIN_SIZE:
+            return response
+
+        accepted = set(accept_encoding_re.findall(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+            compressed = brotli.compress(response.content, quality=settings.API_BROTLI_QUALITY)
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+            compressed = compress_string(response.content, max_random_bytes=GZipMiddleware.max_random_bytes)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        # jak GZipMiddleware: skompresowana treść nie jest bajtowo identyczna - ETag staje się słaby
+        if response.has_header('ETag'):
+            response.headers['ETag'] = re.sub(r'^"', 'W/"', response.headers['ETag'])
+        return response
@@ -0,0 +1,103 @@
+from django.db.models import Max, Q, Sum
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import Task, TableVersion
+
+
+class ConditionalGetMixin:
+    """
+    Obsługa If-None-Match/If-Modified-Since dla widoków tylko do odczytu.
+    Walidatory (ETag, Last-Modified) pochodzą z get_validators() i są wyliczane
+    bez wykonywania właściwego zapytania ani serializacji - przy zgodności
+    zwracamy 304 od razu.
+    """
+
+    def get_validators(self):
+        # Brak walidatorów (None, None) - zwykła odpowiedź bez ETag/Last-Modified
+        return None, None
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        if etag is None:
+            return super().get(request, *args, **kwargs)
+        etag = representation_etag(etag, request.accepted_renderer.format)
+        response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+
+def representation_etag(etag, renderer_format):
+    """
+    ETag zależny od wynegocjowanego formatu (api.renderers) - JSON i MessagePack
+    tej samej wersji danych to różne reprezentacje.
+    """
+    if renderer_format == 'json':
+        return etag
+    return f'{etag[:-1]}-{renderer_format}"'
+
+
+def table_validators(row, tables):
+    if any(row[table] is None for table in tables):
+        return None, None
+    return '"{}"'.format('.'.join(f'{table}-{row[table]}' for table in tables)), row['updated_at']
+
+
+def task_validators(updated_at, task_id):
+    if updated_at is None:
+        return None, None
+    return f'"task-{task_id}-{updated_at.timestamp()}"', updated_at
+
+
+def table_version_query(tables):
+    """
+    Wersje tabel (suma wierszy licznika każdej z nich) i czas ostatniej zmiany - jedno zapytanie.
+    """
+    rows = Q()
+    for table in tables:
+        rows |= TableVersion.rows(table)
+    aggregates = {table: Sum('version', filter=TableVersion.rows(table)) for table in tables}
+    return TableVersion.objects.filter(rows), {**aggregates, 'updated_at': Max('updated_at')}
+
+
+def task_version_query(task_id):
+    return Task.objects.filter(id=task_id).values_list('updated_at', flat=True)
+
+
+async def atable_validators(*tables):
+    queryset, aggregates = table_version_query(tables)
+    return table_validators(await queryset.aaggregate(**aggregates), tables)
+
+
+async def atask_validators(task_id):
+    return task_validators(await task_version_query(task_id).afirst(), task_id)
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+class TableVersionMixin(ConditionalGetMixin):
+    """
+    Walidatory kolekcji z liczników wersji tabel (TableVersion), z których
+    pochodzi odpowiedź - jedno zapytanie niezależnie od rozmiaru tabel.
+    """
+    version_tables = ()
+
+    def get_validators(self):
+        queryset, aggregates = table_version_query(self.version_tables)
+        return table_validators(queryset.aggregate(**aggregates), self.version_tables)
+
+
+class TaskVersionMixin(ConditionalGetMixin):
+    """
+    Walidatory pojedynczego zadania z jego pola updated_at.
+    """
+
+    def get_validators(self):
+        task_id = self.kwargs.get('task_id')
+        return task_validators(task_version_query(task_id).first(), task_id)
@@ -0,0 +1,130 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count, F
+
+from .cache import invalidate_tasks
+from .models import Task, TaskCounter
+
+
+def key(task):
+    return task.assigned_user_id, task.status
+
+
+def apply(deltas):
+    """
+    Nakłada zmiany liczników {(user_id, status): delta} w bieżącej transakcji.
+    Wiersze są aktualizowane w stałej kolejności, żeby równoległe zapisy nie
+    blokowały się wzajemnie w odwrotnej kolejności (deadlock).
+    """
+    for (user_id, status), delta in sorted(deltas.items(), key=lambda item: (item[0][0] is not None, item[0][0] or 0, item[0][1])):
+        if not delta:
+            continue
+        counters = TaskCounter.objects.filter(assigned_user_id=user_id, status=status)
+        if not counters.update(count=F('count') + delta):
+            TaskCounter.objects.get_or_create(assigned_user_id=user_id, status=status)
+            counters.update(count=F('count') + delta)
+
+
+def created(tasks):
+    apply(Counter(key(task) for task in tasks))
+
+
+def deleted(tasks):
+    deltas = Counter()
+    deltas.subtract(key(task) for task in tasks)
+    apply(deltas)
+
+
+def changed(before, after):
+    """
+    before, after - klucze (user_id, status) zadań sprzed i po zmianie.
+    """
+    deltas = Counter(after)
+    deltas.subtract(before)
+    apply(deltas)
+
+
+def reassign_to_unassigned(user_ids):
+    """
+    Przenosi liczniki usuwanych użytkowników do wierszy bez użytkownika
+    (ich zadania dostają assigned_user=NULL, zob. Task.assigned_user).
+    """
+    deltas = Counter()
+    for user_id, status, count in TaskCounter.objects.filter(assigned_user_id__in=user_ids).values_list('assigned_user_id', 'status', 'count'):
+        deltas[(None, status)] += count
+        deltas[(user_id, status)] -= count
+    apply(deltas)
+
+
+def user_deleted(sender, instance, **kwargs):
+    # sygnał pre_delete - wykonywany w transakcji usuwania, przed SET_NULL w zadaniach
+    reassign_to_unassigned([instance.id])
+    invalidate_tasks(user_ids=[instance.id])
+
+
+def stats(rows):
+    """
+    Podsumowanie dla /api/task/stats/ z wierszy (user_id, username, status, count).
+    """
+    statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+    users, totals = {}, dict.fromkeys(statuses, 0)
+    for user_id, username, status, count in rows:
+        entry = users.setdefault(user_id, {
+            'assigned_user': user_id, 'username': username, 'counts': dict.fromkeys(statuses, 0), 'total': 0,
+        })
+        entry['counts'][status] = count
+        entry['total'] += count
+        totals[status] += count
+    return {
+        # nieprzypisane zadania na końcu
+        'users': sorted(users.values(), key=lambda entry: (entry['assigned_user'] is None, entry['assigned_user'] or 0)),
+        'totals': totals,
+        'total': sum(totals.values()),
+    }
+
+
+def expected():
+    """
+    Liczniki policzone od zera z tabeli zadań.
+    """
+    return {
+        (row['assigned_user'], row['status']): row['n']
+        for row in Task.objects.values('assigned_user', 'status').annotate(n=Count('id')).order_by()
+    }
+
+
+def current():
+    return {
+        (user_id, status): count
+        for user_id, status, count in TaskCounter.objects.exclude(count=0).values_list('assigned_user_id', 'status', 'count')
+    }
+
+
+def diff():
+    """
+    Różnice {(user_id, status): (licznik, rzeczywista liczba)}.
+    """
+    actual, stored = expected(), current()
+    return {
+        pair: (stored.get(pair, 0), actual.get(pair, 0))
+        for pair in actual.keys() | stored.keys()
+        if stored.get(pair, 0) != actual.get(pair, 0)
+    }
+
+
+def rebuild():
+    """
+    Przelicza liczniki od zera. W PostgreSQL blokada tabeli liczników czeka
+    na trwające zapisy i wstrzymuje nowe, więc żadna zmiana nie zostanie
+    policzona dwa razy ani pominięta.
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {TaskCounter._meta.db_table} IN EXCLUSIVE MODE')
+        TaskCounter.objects.all().delete()
+        TaskCounter.objects.bulk_create(
+            TaskCounter(assigned_user_id=user_id, status=status, count=count)
+            for (user_id, status), count in expected().items()
+        )
@@ -0,0 +1,87 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+TASK_EXPORT_FIELDS = ['id', 'name', 'description', 'status', 'assigned_user', 'created_at', 'updated_at']
+HISTORY_EXPORT_FIELDS = [
+    'id', 'task', 'version', 'kind', 'name', 'description', 'status', 'assigned_user', 'created_at', 'updated_at',
+]
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """
+    Bufor dla csv.writer zwracający zapisany wiersz zamiast go przechowywać.
+    """
+
+    def write(self, value):
+        return value
+
+
+def line_format(fields, export_format):
+    """
+    Nagłówek (lub None) i funkcja zamieniająca wiersz na linię eksportu.
+    """
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        return writer.writerow(fields), lambda row: writer.writerow([row[field] for field in fields])
+    encoder = DjangoJSONEncoder()
+    return None, lambda row: encoder.encode(row) + '\n'
+
+
+def export_lines(rows, fields, export_format):
+    header, line = line_format(fields, export_format)
+    if header is not None:
+        yield header
+    for row in rows:
+        yield line(row)
+
+
+async def aexport_lines(rows, fields, export_format):
+    header, line = line_format(fields, export_format)
+    if header is not None:
+        yield header
+    async for row in rows:
+        yield line(row)
+
+
+def export_response(lines, export_format, filename):
+    response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
+
+
+def stream_export(qs, fields, export_format, filename, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Strumieniuje wiersze zapytania jako NDJSON lub CSV. Wiersze pobierane są
+    kursorem po stronie serwera (iterator(chunk_size)), więc pamięć workera
+    nie zależy od liczby eksportowanych rekordów.
+    """
+    return stream_rows(qs.values(*fields).iterator(chunk_size=chunk_size), fields, export_format, filename)
+
+
+def stream_rows(rows, fields, export_format, filename):
+    """
+    Strumieniuje słowniki z dowolnego iteratora (np. stany odtwarzane z historii).
+    """
+    return export_response(export_lines(rows, fields, export_format), export_format, filename)
+
+
+def astream_export(qs, fields, export_format, filename, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    stream_export dla widoków asynchronicznych: aiterator() i asynchroniczny
+    generator linii, więc serwer ASGI wysyła eksport partiami, bez buforowania
+    całej odpowiedzi (co robi Django dla synchronicznego StreamingHttpResponse).
+    """
+    return astream_rows(qs.values(*fields).aiterator(chunk_size=chunk_size), fields, export_format, filename)
+
+
+def astream_rows(rows, fields, export_format, filename):
+    return export_response(aexport_lines(rows, fields, export_format), export_format, filename)
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, Subquery, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.fields import DateTimeField
+
+from .models import TaskEvent
+
+
+# Strumień zmian zadań (/api/task/feed/): numerem zdarzenia (seq) jest TaskEvent.id, a pozycją
+# w strumieniu para (xid, id) - transakcja zapisująca i numer. Numery id są nadawane przy wstawieniu,
+# więc transakcja może zatwierdzić się z niższym numerem później niż inna z wyższym. W PostgreSQL
+# czytelnik widzi więc tylko zdarzenia transakcji o xid niższym niż najstarsza trwająca transakcja
+# zapisu (pg_snapshot_xmin) - do takich nie dojdą już żadne nowe zdarzenia, a późniejsze mają wyższe
+# xid - bez globalnej blokady zapisów. Klient wznawiający od numeru N dostaje zdarzenia po pozycji
+# zdarzenia N; numer spoza tabeli (np. zarchiwizowany) wznawia od najstarszego zdarzenia.
+# SQLite szereguje transakcje zapisu, tam xid jest pusty, a pozycją jest id.
+
+HORIZON = 'pg_snapshot_xmin(pg_current_snapshot())::text::bigint'
+
+
+def visible():
+    if connection.vendor != 'postgresql':
+        return TaskEvent.objects.order_by('id')
+    return TaskEvent.objects.filter(xid__lt=RawSQL(HORIZON, [])).order_by('xid', 'id')
+
+
+class Broker:
+    """
+    Powiadomienia o nowych zdarzeniach w obrębie procesu (bez zewnętrznych
+    usług) dla czekających widoków async. Przenosi tylko sygnał "coś się
+    zmieniło" - czekający ponownie czytają zdarzenia z bazy, a zapisy
+    z innych workerów wykrywają odpytując ją co TASK_FEED_POLL_SECONDS.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.waiters = set()
+
+    def publish(self):
+        with self.lock:
+            self.generation += 1
+            waiters = list(self.waiters)
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    async def await_change(self, generation, timeout):
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self.lock:
+            if self.generation != generation:
+                return True
+            self.waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self.lock:
+                self.waiters.discard(waiter)
+
+
+broker = Broker()
+
+
+def payload(event):
+    """
+    Zdarzenie strumienia: create i snapshoty niosą pełny stan zadania,
+    update - tylko zmienione pola (changes), delete - id zadania.
+    """
+    return {
+        'seq': event.id,
+        'task_id': event.task_id,
+        'version': event.version,
+        'kind': event.kind,
+        'snapshot': event.snapshot,
+        'changes': event.changes,
+        'created_at': DateTimeField().to_representation(event.created_at),
+    }
+
+
+def events_after(after, limit):
+    if connection.vendor != 'postgresql':
+        return visible().filter(id__gt=after)[:limit]
+    xid = Coalesce(Subquery(TaskEvent.objects.filter(id=after).values('xid')[:1]), Value(0))
+    return visible().filter(Q(xid__gt=xid) | Q(xid=xid, id__gt=after))[:limit]
+
+
+def head_query():
+    # ostatnie widoczne zdarzenie, zob. visible()
+    return visible().reverse().values_list('id', flat=True)
+
+
+def head():
+    return head_query().first() or 0
+
+
+async def ahead():
+    return await head_query().afirst() or 0
+
+
+def parse_after(request):
+    """
+    Numer, od którego wznawiamy: ?after= lub nagłówek Last-Event-ID (EventSource).
+    None - klient pyta tylko o bieżący numer.
+    """
+    value = request.GET.get('after', request.headers.get('Last-Event-ID'))
+    if value in (None, ''):
+        return None
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        raise ValidationError({'after': ['A valid integer is required.']})
+
+
+def parse_limit(request):
+    try:
+        return min(max(int(request.GET.get('limit', settings.TASK_FEED_BATCH_SIZE)), 1), settings.TASK_FEED_BATCH_SIZE)
+    except ValueError:
+        return settings.TASK_FEED_BATCH_SIZE
+
+
+def parse_timeout(request):
+    try:
+        return min(max(float(request.GET.get('timeout', settings.TASK_FEED_POLL_TIMEOUT)), 0), settings.TASK_FEED_POLL_TIMEOUT)
+    except ValueError:
+        return settings.TASK_FEED_POLL_TIMEOUT
+
+
+def wants_stream(request):
+    return request.GET.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def stream_headers():
+    # bez buforowania w nginx (X-Accel-Buffering) i w cache pośrednich
+    return {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def sse(event):
+    return f"id: {event['seq']}\nevent: {event['kind']}\ndata: {json.dumps(event)}\n\n"
+
+
+class StreamUnavailable(APIException):
+    status_code = 406
+    default_detail = 'Server-Sent Events are served only in SERVER_MODE=asgi, use long-poll (?after=) instead.'
+    default_code = 'stream_unavailable'
+
+
+def poll(after, limit):
+    """
+    Zdarzenia po numerze after bez czekania - widok synchroniczny nie może
+    zajmować workera sync gunicorna (jedynego przy WEB_CONCURRENCY=1) na czas
+    long-polla ani połączenia SSE; czekanie obsługują tylko widoki async.
+    """
+    return [payload(event) for event in events_after(after, limit)]
+
+
+async def astream(after, limit):
+    """
+    Generator Server-Sent Events (tryb ASGI). Strumień kończy się po
+    TASK_FEED_STREAM_SECONDS - EventSource łączy się ponownie z nagłówkiem Last-Event-ID.
+    """
+    yield f'retry: {settings.TASK_FEED_RETRY_MS}\n\n'
+    deadline = time.monotonic() + settings.TASK_FEED_STREAM_SECONDS
+    while time.monotonic() < deadline:
+        generation = broker.generation
+        events = [payload(event) async for event in events_after(after, limit)]
+        for event in events:
+            yield sse(event)
+        if events:
+            after = events[-1]['seq']
+            continue
+        if not await broker.await_change(generation, min(settings.TASK_FEED_POLL_SECONDS, max(deadline - time.monotonic(), 0))):
+            yield ': keepalive\n\n'
+
+
+async def along_poll(after, limit, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        generation = broker.generation
+        events = [payload(event) async for event in events_after(after, limit)]
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0:
+            return events
+        await broker.await_change(generation, min(remaining, settings.TASK_FEED_POLL_SECONDS))
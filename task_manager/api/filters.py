@@ -0,0 +1,37 @@
+from rest_framework.exceptions import ValidationError
+
+from .models import Task
+from .search import search_tasks
+
+
+def filter_tasks(qs, params):
+    """
+    Filtrowanie zadań według statusu, słowa kluczowego lub przypisanego użytkownika
+    (parametry TaskFilterView, wspólne z eksportem).
+    """
+    status_param = params.get('status')
+    keyword = params.get('keyword')
+    assigned_user = params.get('assigned_user')
+    if status_param:
+        qs = qs.filter(status=status_param.upper())
+    if keyword:
+        qs = search_tasks(qs, keyword)
+    if assigned_user:
+        qs = qs.filter(assigned_user=assigned_user)
+    return qs
+
+
+def filter_task_events(qs, params):
+    """
+    Zdarzenia historii (TaskEvent) zadań wybranych filtrami TaskFilterView,
+    opcjonalnie jednego zadania (task_id), w kolejności (task_id, version).
+    """
+    task_id = params.get('task_id')
+    if task_id:
+        try:
+            qs = qs.filter(task_id=int(task_id))
+        except ValueError:
+            raise ValidationError({'task_id': ['A valid integer is required.']})
+    if any(params.get(param) for param in ('status', 'keyword', 'assigned_user')):
+        qs = qs.filter(task_id__in=filter_tasks(Task.objects.all(), params).values('id'))
+    return qs.order_by('task_id', 'version')
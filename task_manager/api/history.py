@@ -0,0 +1,166 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .feed import broker
+from .models import TaskEvent, User
+
+
+def record(events):
+    """
+    Zapisuje zdarzenia historii (pomija None - zmiany bez efektu).
+    Przy TASK_HISTORY_WRITER=async zdarzenia trafiają po zatwierdzeniu
+    transakcji do api.history_writer i są zapisywane w tle. Zapisane
+    zdarzenia są publikowane w strumieniu zmian (api.feed).
+    """
+    events = [event for event in events if event is not None]
+    if not events:
+        return events
+    if settings.TASK_HISTORY_WRITER == 'async':
+        from .history_writer import writer
+        transaction.on_commit(lambda: writer.submit(events))
+    else:
+        TaskEvent.objects.bulk_create(events)
+        transaction.on_commit(broker.publish)
+    return events
+
+
+def replay(events):
+    """
+    Odtwarza stany zadania: dla zdarzeń w kolejności wersji (od snapshotu)
+    zwraca pary (zdarzenie, stan po zdarzeniu). Przy zapisie w tle
+    (api.history_writer) wcześniejsza wersja może jeszcze nie być w bazie -
+    do następnego snapshotu stany po takiej luce są pomijane.
+    """
+    state, version = None, None
+    for event in events:
+        if event.snapshot:
+            state = dict(event.changes)
+        elif state is not None and event.version == version + 1:
+            state = {**state, **event.changes}
+        else:
+            state = None
+        version = event.version
+        if state is not None:
+            yield event, state
+
+
+def replay_range(task_id, first, last):
+    """
+    Zdarzenia potrzebne do odtworzenia wersji first..last zadania:
+    od ostatniego snapshotu nie późniejszego niż first (albo od początku,
+    gdy wcześniejsze zdarzenia są już w archiwum, zob. api.archive).
+    """
+    base = (
+        TaskEvent.objects.filter(task_id=task_id, version__lte=first, snapshot=True)
+        .order_by('-version').values('version')[:1]
+    )
+    return TaskEvent.objects.filter(
+        task_id=task_id, version__gte=Coalesce(Subquery(base), Value(0)), version__lte=last,
+    ).order_by('version')
+
+
+def task_at(task_id, version):
+    """
+    Stan zadania w podanej wersji (None, jeśli takiej wersji nie ma).
+    """
+    state = None
+    for event, state in replay(replay_range(task_id, version, version)):
+        pass
+    return state if state is not None and event.version == version else None
+
+
+def history_range(page):
+    """
+    Zakres wersji, których stany opisują wpisy strony historii
+    (stan sprzed każdego zdarzenia, czyli wersja o jeden niższa).
+    """
+    versions = [event.version for event in page]
+    return min(versions) - 1, max(versions) - 1
+
+
+def history_entries(page, replayed, usernames):
+    """
+    Wpisy historii w dotychczasowym kształcie (stan zadania sprzed zmiany
+    i czas zmiany) dla zdarzeń ze strony; replayed - zdarzenia z replay_range,
+    usernames - {id: nazwa użytkownika}.
+    """
+    states = {event.version: state for event, state in replay(replayed)}
+    entries = []
+    for event in page:
+        state = states.get(event.version - 1)
+        if state is None:
+            continue
+        entries.append({
+            'version': event.version,
+            'name': state['name'],
+            'description': state['description'],
+            'status': state['status'],
+            'assigned_user': usernames.get(state['assigned_user'], 'Unassigned'),
+            'created_at': datetime.fromisoformat(state['created_at']),
+            'updated_at': event.created_at,
+            'deleted_at': event.created_at if event.kind == TaskEvent.DELETE else None,
+        })
+    return entries
+
+
+def user_ids(replayed):
+    return {event.changes['assigned_user'] for event in replayed if event.changes.get('assigned_user') is not None}
+
+
+def task_history(task_id, page, usernames=None):
+    """
+    history_entries dla strony zdarzeń jednego zadania (2 zapytania niezależnie od rozmiaru strony,
+    jedno, gdy wywołujący ma już mapę {id: nazwa użytkownika}).
+    """
+    if not page:
+        return []
+    replayed = list(replay_range(task_id, *history_range(page)))
+    if usernames is None:
+        usernames = dict(User.objects.filter(id__in=user_ids(replayed)).values_list('id', 'username'))
+    return history_entries(page, replayed, usernames)
+
+
+def export_row(state, event):
+    """
+    Stan zadania po zdarzeniu (state - stan po poprzednim zdarzeniu tego
+    zadania lub None) -> (nowy stan, wiersz eksportu).
+    """
+    state = dict(event.changes) if event.snapshot else {**(state or {}), **event.changes}
+    return state, {
+        'id': event.id,
+        'task': event.task_id,
+        'version': event.version,
+        'kind': event.kind,
+        **state,
+        'created_at': datetime.fromisoformat(state['created_at']),
+        'updated_at': event.created_at,
+    }
+
+
+def export_rows(events):
+    """
+    Stany zadań po każdym zdarzeniu dla eksportu; events - wszystkie
+    zdarzenia wybranych zadań uporządkowane po (task_id, version).
+    """
+    state, task_id = None, None
+    for event in events:
+        if event.task_id != task_id:
+            state, task_id = None, event.task_id
+        state, row = export_row(state, event)
+        yield row
+
+
+async def aexport_rows(events):
+    """
+    export_rows dla asynchronicznego iteratora zdarzeń (aiterator()).
+    """
+    state, task_id = None, None
+    async for event in events:
+        if event.task_id != task_id:
+            state, task_id = None, event.task_id
+        state, row = export_row(state, event)
+        yield row
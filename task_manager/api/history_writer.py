@@ -0,0 +1,231 @@
+import atexit
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+from .feed import broker
+from .models import TaskEvent
+
+
+logger = logging.getLogger('api.history')
+
+
+def dump(event):
+    return json.dumps({
+        'task_id': event.task_id,
+        'version': event.version,
+        'kind': event.kind,
+        'snapshot': event.snapshot,
+        'changes': event.changes,
+        'created_at': event.created_at.isoformat(),
+    })
+
+
+def load(line):
+    data = json.loads(line)
+    data['created_at'] = datetime.fromisoformat(data['created_at'])
+    return TaskEvent(**data)
+
+
+def read_segment(path):
+    """
+    Zdarzenia z segmentu WAL. Wiersz urwany przez awarię w trakcie dopisywania
+    (zwykle ostatni) jest pomijany - jego transakcja nie zdążyła zapisać zdarzenia.
+    """
+    events, torn = [], 0
+    for line in path.read_text(encoding='utf-8', errors='replace').splitlines():
+        if not line.strip():
+            continue
+        try:
+            events.append(load(line))
+        except (ValueError, KeyError, TypeError):
+            torn += 1
+    if torn:
+        logger.warning('Skipped %s torn lines in %s', torn, path.name)
+    return events
+
+
+def segment_owner(path):
+    # history-<pid>-<n>.wal należy do procesu, który go pisze, .recovering-<pid> - do odtwarzającego
+    if path.suffix.startswith('.recovering-'):
+        return int(path.suffix.removeprefix('.recovering-'))
+    return int(path.name.split('-')[1])
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class HistoryWriter:
+    """
+    Zapis historii poza ścieżką żądania (TASK_HISTORY_WRITER=async).
+    Zdarzenia zatwierdzonych transakcji trafiają do dziennika WAL (plik
+    segmentu bieżącego procesu) i do bufora w pamięci, który wątek w tle
+    zapisuje jednym bulk_create co TASK_HISTORY_BATCH_SIZE zdarzeń lub
+    TASK_HISTORY_FLUSH_MS ms. Segment jest usuwany dopiero po zapisaniu
+    jego zdarzeń; segmenty martwych procesów są odtwarzane przy starcie.
+    Ponowny zapis jest idempotentny dzięki unikalnemu (task_id, version).
+    """
+
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.buffer = []
+        self.pending = []
+        self.segment = None
+        self.wal = None
+        self.sequence = 0
+        self.thread = None
+        self.stopping = False
+        self.pid = None
+
+    @property
+    def directory(self):
+        return Path(settings.TASK_HISTORY_WAL_DIR)
+
+    def start(self):
+        # po fork (workery gunicorna) każdy proces uruchamia własny wątek
+        if self.thread is not None and self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        self.buffer, self.pending, self.stopping = [], [], False
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.recover()
+        self.rotate()
+        self.thread = threading.Thread(target=self.run, name='history-writer', daemon=True)
+        self.thread.start()
+        atexit.register(self.drain)
+
+    def rotate(self):
+        """
+        Zamyka bieżący segment i otwiera nowy; zwraca ścieżkę zamkniętego.
+        """
+        previous = self.segment
+        if self.wal is not None:
+            self.wal.close()
+        self.sequence += 1
+        self.segment = self.directory / f'history-{self.pid}-{self.sequence}.wal'
+        self.wal = open(self.segment, 'a', encoding='utf-8')
+        return previous
+
+    def enqueue(self, events):
+        with self.lock:
+            self.start()
+            self.wal.write(''.join(dump(event) + '\n' for event in events))
+            self.wal.flush()
+            if settings.TASK_HISTORY_WAL_FSYNC:
+                os.fsync(self.wal.fileno())
+            self.buffer.extend(events)
+            if len(self.buffer) >= settings.TASK_HISTORY_BATCH_SIZE:
+                self.lock.notify()
+
+    def submit(self, events):
+        """
+        Hook on_commit z api.history.record. Transakcja żądania jest już
+        zatwierdzona, więc błąd (np. brak miejsca na WAL) nie może skończyć się
+        odpowiedzią 500 - zdarzenia zapisujemy wtedy od razu do bazy.
+        """
+        try:
+            self.enqueue(events)
+            return
+        except Exception:
+            logger.exception('History WAL append of %s events failed, writing them directly', len(events))
+        try:
+            with transaction.atomic():
+                TaskEvent.objects.bulk_create(events, batch_size=1000, ignore_conflicts=True)
+            broker.publish()
+        except Exception:
+            logger.exception('History write of %s events failed, events lost', len(events))
+
+    def take(self):
+        """
+        Bufor razem z segmentem WAL, który zawiera dokładnie te zdarzenia.
+        """
+        with self.lock:
+            if not self.buffer:
+                return
+            batch, self.buffer = self.buffer, []
+            self.pending.append((batch, self.rotate()))
+
+    def flush(self):
+        self.take()
+        close_old_connections()
+        while self.pending:
+            batch, segment = self.pending[0]
+            try:
+                with transaction.atomic():
+                    TaskEvent.objects.bulk_create(batch, batch_size=1000, ignore_conflicts=True)
+            except Exception:
+                # baza niedostępna - zdarzenia zostają w WAL, ponowimy przy następnym cyklu
+                logger.exception('History flush of %s events failed', len(batch))
+                return False
+            self.pending.pop(0)
+            segment.unlink(missing_ok=True)
+            broker.publish()
+        return True
+
+    def run(self):
+        interval = settings.TASK_HISTORY_FLUSH_MS / 1000
+        while True:
+            with self.lock:
+                if not self.stopping and len(self.buffer) < settings.TASK_HISTORY_BATCH_SIZE:
+                    self.lock.wait(interval)
+                stopping = self.stopping
+            self.flush()
+            if stopping:
+                connections.close_all()
+                return
+
+    def drain(self, timeout=30):
+        """
+        Zapisuje wszystkie zdarzenia z bufora (zamknięcie workera, hook worker_exit gunicorna).
+        """
+        if self.thread is None or self.pid != os.getpid():
+            return
+        with self.lock:
+            self.stopping = True
+            self.lock.notify()
+        self.thread.join(timeout)
+        self.thread = None
+        if self.wal is not None:
+            self.wal.close()
+            self.wal = None
+            if self.segment.stat().st_size == 0:
+                self.segment.unlink(missing_ok=True)
+
+    def recover(self):
+        """
+        Zapisuje zdarzenia z segmentów WAL procesów, które zakończyły się bez
+        opróżnienia bufora, także segmentów, których odtwarzanie przerwała
+        awaria (.recovering-<pid> martwego procesu).
+        """
+        paths = [*self.directory.glob('history-*.wal'), *self.directory.glob('history-*.recovering-*')]
+        for path in sorted(paths):
+            pid = segment_owner(path)
+            if pid != self.pid and pid_alive(pid):
+                continue
+            # przejęcie segmentu - inny startujący worker go pominie
+            claimed = path.with_suffix(f'.recovering-{self.pid}')
+            try:
+                path.rename(claimed)
+            except FileNotFoundError:
+                continue
+            events = read_segment(claimed)
+            with transaction.atomic():
+                TaskEvent.objects.bulk_create(events, batch_size=1000, ignore_conflicts=True)
+            claimed.unlink()
+            logger.warning('Recovered %s history events from %s', len(events), path.name)
+
+
+writer = HistoryWriter()
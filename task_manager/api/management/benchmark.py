@@ -0,0 +1,306 @@
+import asyncio
+import itertools
+import json
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections, transaction
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import counters
+from api.cache import invalidate_tasks
+from api.history import record
+from api.models import Task, TaskEvent, User
+from api.urls import urlpatterns
+
+
+BENCH_PASSWORD = 'bench-Password-123'
+
+
+class Fixtures:
+    """
+    Dane potrzebne scenariuszom: użytkownik z hasłem, tokeny JWT i przykładowe zadanie.
+    """
+
+    def __init__(self):
+        self.user, _ = User.objects.get_or_create(username='bench_login', defaults={'email': 'bench_login@example.com'})
+        self.user.set_password(BENCH_PASSWORD)
+        self.user.save()
+        refresh = RefreshToken.for_user(self.user)
+        self.refresh = str(refresh)
+        self.access = str(refresh.access_token)
+        self.task = Task.objects.filter(history_version__gt=1).order_by('id').first() or Task.objects.order_by('id').first()
+        self.sample_user_id = self.task.assigned_user_id or self.user.id
+        self.counter = itertools.count()
+
+    def new_task(self):
+        # jak TaskCreateView - usunięcie przez API zmniejsza liczniki zadań
+        with transaction.atomic():
+            task = Task.objects.create(name='bench task', description='bench', assigned_user=self.user, history_version=1)
+            record([TaskEvent.created(task, task.created_at)])
+            counters.created([task])
+            invalidate_tasks([task.id], [task.assigned_user_id])
+        return task
+
+
+class Scenario:
+    """
+    Jedno żądanie do endpointu z api/urls.py. path i data mogą być funkcjami
+    wywoływanymi przed każdym żądaniem (poza pomiarem czasu), np. gdy
+    endpoint usuwa zadanie i każde żądanie potrzebuje nowego.
+    """
+
+    def __init__(self, name, method, path, data=None, auth=False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.auth = auth
+
+    def build(self, fixtures):
+        path = self.path(fixtures) if callable(self.path) else self.path
+        data = self.data(fixtures) if callable(self.data) else self.data
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {fixtures.access}'} if self.auth else {}
+        body = json.dumps(data).encode() if data is not None else b''
+        return self.method, path, body, headers
+
+
+def task_payload(fixtures):
+    return {'name': 'bench', 'description': 'bench description', 'status': 'NEW', 'assigned_user': fixtures.user.id}
+
+
+def register_payload(fixtures):
+    n = next(fixtures.counter)
+    return {'username': f'bench_reg_{time.time_ns()}_{n}', 'email': f'bench_reg_{time.time_ns()}_{n}@example.com', 'password': BENCH_PASSWORD}
+
+
+SCENARIOS = [
+    Scenario('get_user_tasks', 'GET', lambda f: reverse('get_user_tasks', args=[f.sample_user_id])),
+    Scenario('create_task', 'POST', reverse('create_task'), task_payload, auth=True),
+    Scenario('edit_task', 'PUT', lambda f: reverse('edit_task', args=[f.task.id]), task_payload, auth=True),
+    Scenario('delete_task', 'DELETE', lambda f: reverse('delete_task', args=[f.new_task().id]), auth=True),
+    Scenario('bulk_tasks', 'POST', reverse('bulk_tasks'), lambda f: [task_payload(f) for _ in range(100)], auth=True),
+    Scenario('login_user', 'POST', reverse('login_user'), lambda f: {'name': f.user.username, 'password': BENCH_PASSWORD}),
+    Scenario('register_user', 'POST', reverse('register_user'), register_payload),
+    Scenario('get_all_users', 'GET', reverse('get_all_users')),
+    Scenario('get_all_tasks', 'GET', reverse('get_all_tasks')),
+    Scenario('task_stats', 'GET', reverse('task_stats')),
+    # long-poll bez czekania: 100 zdarzeń od początku logu
+    Scenario('task_feed', 'GET', reverse('task_feed') + '?after=0&limit=100&timeout=0'),
+    Scenario('get_task', 'GET', lambda f: reverse('get_task', args=[f.task.id])),
+    Scenario('token_obtain_pair', 'POST', reverse('token_obtain_pair'), lambda f: {'username': f.user.username, 'password': BENCH_PASSWORD}),
+    Scenario('token_refresh', 'POST', reverse('token_refresh'), lambda f: {'refresh': f.refresh}),
+    # każde żądanie unieważnia nowy token refresh (tokeny fixtures zostają ważne)
+    Scenario('token_revoke', 'POST', reverse('token_revoke'), lambda f: {'refresh': str(RefreshToken.for_user(f.user))}),
+    Scenario('filter_tasks', 'GET', reverse('filter_tasks') + '?status=NEW&keyword=faktura'),
+    Scenario('get_task_history', 'GET', lambda f: reverse('get_task_history', args=[f.task.id])),
+    Scenario('export_tasks', 'GET', reverse('export_tasks') + '?status=SOLVED'),
+    Scenario('export_task_history', 'GET', lambda f: reverse('export_task_history') + f'?task_id={f.task.id}'),
+    Scenario('ui_bootstrap', 'GET', lambda f: reverse('ui_bootstrap') + f'?task_id={f.task.id}'),
+    Scenario('ui_tab', 'GET', lambda f: reverse('ui_tab', args=['edit']) + f'?task_id={f.task.id}'),
+    Scenario('metrics', 'GET', reverse('metrics')),
+]
+
+
+def missing_scenarios():
+    names = {scenario.name for scenario in SCENARIOS}
+    return [pattern.name for pattern in urlpatterns if pattern.name not in names]
+
+
+def summarize(latencies, elapsed, queries=None):
+    latencies = sorted(latencies)
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    summary = {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'p50_ms': round(cuts[49] * 1000, 3),
+        'p95_ms': round(cuts[94] * 1000, 3),
+        'p99_ms': round(cuts[98] * 1000, 3),
+    }
+    if queries is not None:
+        summary['queries_per_request'] = round(statistics.mean(queries), 2)
+    return summary
+
+
+def summarize_samples(samples, elapsed, queries=None):
+    """
+    Podsumowanie z próbek (czas, status): przepustowość i percentyle tylko
+    z odpowiedzi 2xx, pozostałe liczone w `failed` - szybkie błędy (np. 500
+    "database is locked") nie mogą wyglądać jak dobry wynik.
+    """
+    ok = [latency for latency, status in samples if 200 <= status < 300]
+    if ok:
+        summary = summarize(ok, elapsed, queries)
+    else:
+        summary = {'requests': 0, 'throughput_rps': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+        if queries is not None:
+            summary['queries_per_request'] = round(statistics.mean(queries), 2)
+    summary['failed'] = len(samples) - len(ok)
+    summary['status_codes'] = dict(sorted(Counter(status for _, status in samples).items()))
+    return summary
+
+
+def fmt(value, spec):
+    # None (wszystkie żądania nieudane) jako "-" o szerokości pola
+    return format(value, spec) if value is not None else format('-', '>' + spec.split('.')[0])
+
+
+def check_concurrency(concurrency):
+    """
+    SQLite przy kilku wątkach zapisujących wymaga WAL i transaction_mode IMMEDIATE
+    (jak w settings.py dla DB_ENGINE=sqlite) - inaczej zapisy kończą się 500
+    "database is locked" zamiast czekać na blokadę.
+    """
+    if connection.vendor != 'sqlite' or concurrency <= 1:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        journal_mode = cursor.fetchone()[0]
+    transaction_mode = connection.settings_dict.get('OPTIONS', {}).get('transaction_mode')
+    if journal_mode.lower() != 'wal' or (transaction_mode or '').upper() != 'IMMEDIATE':
+        raise CommandError(
+            f'SQLite with concurrency {concurrency} needs journal_mode=WAL and transaction_mode=IMMEDIATE '
+            f'(found {journal_mode}, {transaction_mode}); use --concurrency 1 or DB_ENGINE=sqlite settings.'
+        )
+
+
+def run_client(scenario, fixtures, requests):
+    """
+    Sekwencyjne żądania przez django.test.Client z liczeniem zapytań SQL.
+    """
+    client = Client()
+    samples, queries = [], []
+    started = time.perf_counter()
+    measured = 0.0
+    for _ in range(requests):
+        method, path, body, headers = scenario.build(fixtures)
+        with CaptureQueriesContext(connection) as ctx:
+            begin = time.perf_counter()
+            response = client.generic(method, path, body, content_type='application/json', **headers)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            latency = time.perf_counter() - begin
+        samples.append((latency, response.status_code))
+        measured += latency
+        queries.append(len(ctx.captured_queries))
+    return summarize_samples(samples, measured or time.perf_counter() - started, queries)
+
+
+def wsgi_environ(method, path, body, headers):
+    url = urlsplit(path)
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '8000',
+        'REMOTE_ADDR': '127.0.0.1',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': BytesIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    environ.update(headers)
+    return environ
+
+
+def call_wsgi(application, method, path, body, headers):
+    """
+    Jedno żądanie do aplikacji WSGI z odczytem całej odpowiedzi -> kod statusu.
+    """
+    status_holder = []
+    result = application(wsgi_environ(method, path, body, headers), lambda status, headers, *args: status_holder.append(status))
+    try:
+        for _chunk in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return int(status_holder[0].split()[0])
+
+
+def run_wsgi(scenario, fixtures, requests, concurrency, application=None):
+    """
+    Generator obciążenia wywołujący aplikację WSGI w wątkach (bez sieci),
+    tak jak robiłby to wielowątkowy serwer aplikacji.
+    """
+    application = application or get_wsgi_application()
+    lock = threading.Lock()
+    samples = []
+
+    def one_request(_):
+        method, path, body, headers = scenario.build(fixtures)
+        begin = time.perf_counter()
+        status = call_wsgi(application, method, path, body, headers)
+        latency = time.perf_counter() - begin
+        with lock:
+            samples.append((latency, status))
+
+    def worker(indices):
+        try:
+            for index in indices:
+                one_request(index)
+        finally:
+            connections.close_all()
+
+    chunks = [range(i, requests, concurrency) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, chunks))
+    summary = summarize_samples(samples, time.perf_counter() - started)
+    summary['concurrency'] = concurrency
+    return summary
+
+
+def consume(iterable):
+    for _chunk in iterable:
+        pass
+
+
+def run_asgi(scenario, fixtures, requests, concurrency):
+    """
+    Generator obciążenia dla ścieżki ASGI: do `concurrency` żądań jednocześnie
+    w jednej pętli zdarzeń (odpowiednik jednego workera uvicorn).
+    """
+    samples = []
+
+    async def one_request(client, semaphore):
+        method, path, body, headers = await sync_to_async(scenario.build)(fixtures)
+        async with semaphore:
+            begin = time.perf_counter()
+            response = await client.generic(method, path, body, content_type='application/json', **headers)
+            if response.streaming and response.is_async:
+                async for _chunk in response.streaming_content:
+                    pass
+            elif response.streaming:
+                # synchroniczny StreamingHttpResponse (widok sync w trybie ASGI)
+                await sync_to_async(consume)(response.streaming_content)
+            samples.append((time.perf_counter() - begin, response.status_code))
+
+    async def main():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(one_request(client, semaphore) for _ in range(requests)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    summary = summarize_samples(samples, time.perf_counter() - started)
+    summary['concurrency'] = concurrency
+    return summary
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+
+from api import partitions
+from api.archive import archive_month, archive_path
+from api.models import TaskEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Przenosi historię zadań starszą niż --retention-months miesięcy do plików NDJSON (gzip) "
+        "w TASK_HISTORY_ARCHIVE_DIR, miesiąc po miesiącu, i usuwa ją z bazy (w PostgreSQL - całe partycje). "
+        "Zarchiwizowaną historię zwraca GET /api/task/history/<id>/?archived=1."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-months', type=int, default=settings.TASK_HISTORY_RETENTION_MONTHS)
+        parser.add_argument('--dry-run', action='store_true', help='Tylko wypisz miesiące do archiwizacji.')
+
+    def handle(self, *args, **options):
+        cutoff = partitions.add_months(partitions.month_start(timezone.now()), -options['retention_months'])
+        oldest = TaskEvent.objects.aggregate(m=Min('created_at'))['m']
+        if oldest is None or oldest >= cutoff:
+            self.stdout.write("Nothing to archive")
+            return
+        start = partitions.month_start(oldest)
+        while start < cutoff:
+            if options['dry_run']:
+                end = partitions.add_months(start, 1)
+                count = TaskEvent.objects.filter(created_at__gte=start, created_at__lt=end).count()
+                self.stdout.write(f"{start:%Y-%m}: {count} events")
+            else:
+                count = archive_month(start)
+                if count:
+                    self.stdout.write(f"{start:%Y-%m}: archived {count} events to {archive_path(start)}")
+            start = partitions.add_months(start, 1)
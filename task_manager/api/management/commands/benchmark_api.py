@@ -0,0 +1,123 @@
+import json
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.test import override_settings
+from django.utils import timezone
+
+from api.management.benchmark import (
+    SCENARIOS, Fixtures, check_concurrency, fmt, missing_scenarios, run_asgi, run_client, run_wsgi,
+)
+from api.management.seed import delete_tasks, seed_history, seed_tasks, seed_users
+from api.models import Task, TaskEvent, User
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark wszystkich endpointów z api/urls.py: django.test.Client (z liczbą zapytań) "
+        "i wielowątkowy generator obciążenia WSGI. Wyniki (przepustowość, p50/p95/p99) "
+        "zapisywane są jako JSON. Dane testowe są zapisywane w bazie - uruchamiaj na bazie "
+        "testowej; po pomiarze są usuwane (chyba że podano --keep)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--tasks', type=int, default=1_000)
+        parser.add_argument('--history', type=int, default=10_000, help='Łączna liczba wpisów historii.')
+        parser.add_argument('--requests', type=int, default=100, help='Liczba żądań na endpoint i tryb.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--endpoints', nargs='+', help='Nazwy URL z api/urls.py (domyślnie wszystkie).')
+        parser.add_argument(
+            '--modes', nargs='+', default=['client', 'wsgi'], choices=['client', 'wsgi', 'asgi'],
+            help='asgi mierzy widoki async, gdy API_ASYNC_VIEWS=1.',
+        )
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--skip-seed', action='store_true', help='Użyj danych już obecnych w bazie.')
+        parser.add_argument('--keep', action='store_true', help='Nie usuwaj danych testowych.')
+
+    def handle(self, *args, **options):
+        missing = missing_scenarios()
+        if missing:
+            raise CommandError(f"No benchmark scenario for: {', '.join(missing)}")
+        scenarios = [s for s in SCENARIOS if not options['endpoints'] or s.name in options['endpoints']]
+        if {'wsgi', 'asgi'} & set(options['modes']):
+            check_concurrency(options['concurrency'])
+
+        marks = {
+            'task': Task.objects.aggregate(m=Max('id'))['m'] or 0,
+            'history': TaskEvent.objects.aggregate(m=Max('id'))['m'] or 0,
+            'user': User.objects.aggregate(m=Max('id'))['m'] or 0,
+        }
+        if not options['skip_seed']:
+            self.seed(options)
+        try:
+            # wszystkie żądania idą z jednego adresu - limit logowań na IP zafałszowałby wyniki
+            with override_settings(PASSWORD_RATE_LIMIT=''):
+                results = self.measure(scenarios, options)
+        finally:
+            if not options['keep']:
+                delete_tasks(Task.objects.filter(id__gt=marks['task']))
+                TaskEvent.objects.filter(id__gt=marks['history']).delete()
+                User.objects.filter(id__gt=marks['user']).delete()
+
+        report = {
+            'meta': {
+                'commit': git_commit(),
+                'timestamp': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'users': options['users'],
+                'tasks': options['tasks'],
+                'history': options['history'],
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'async_views': settings.API_ASYNC_VIEWS,
+            },
+            'results': results,
+        }
+        Path(options['output']).write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def seed(self, options):
+        self.stdout.write(f"Seeding {options['users']} users, {options['tasks']} tasks, {options['history']} history rows")
+        users = seed_users(options['users'], prefix=f'bench_{timezone.now():%Y%m%d%H%M%S}')
+        users = list(User.objects.filter(username__in=[u.username for u in users]))
+        seed_tasks(options['tasks'], users=users)
+        with_history = min(options['tasks'], 1_000)
+        if options['history'] and with_history:
+            tasks = Task.objects.order_by('-id')[:with_history]
+            seed_history(tasks, max(1, options['history'] // with_history))
+
+    def measure(self, scenarios, options):
+        fixtures = Fixtures()
+        results = {}
+        for scenario in scenarios:
+            result = results[scenario.name] = {}
+            line = [f'{scenario.name:<22}']
+            if 'client' in options['modes']:
+                result['client'] = client = run_client(scenario, fixtures, options['requests'])
+                line.append(
+                    f"client p50 {fmt(client['p50_ms'], '9.2f')} ms  p99 {fmt(client['p99_ms'], '9.2f')} ms  "
+                    f"queries {client['queries_per_request']:6.1f}  failed {client['failed']}"
+                )
+            for mode, runner in (('wsgi', run_wsgi), ('asgi', run_asgi)):
+                if mode in options['modes']:
+                    result[mode] = load = runner(scenario, fixtures, options['requests'], options['concurrency'])
+                    line.append(
+                        f"{mode} x{load['concurrency']} {fmt(load['throughput_rps'], '8.1f')} req/s  "
+                        f"p95 {fmt(load['p95_ms'], '9.2f')} ms  failed {load['failed']} {load['status_codes']}"
+                    )
+            self.stdout.write(' | '.join(line))
+        return results
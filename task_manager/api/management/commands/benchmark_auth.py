@@ -0,0 +1,79 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from api.authentication import CachedJWTAuthentication
+from api.management.benchmark import SCENARIOS, Fixtures, fmt, run_client
+from api.management.seed import delete_tasks
+from api.models import Task, TaskEvent
+
+
+BACKENDS = {
+    'simplejwt': JWTAuthentication,
+    'cached': CachedJWTAuthentication,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mierzy narzut uwierzytelniania JWT na żądanie: simplejwt JWTAuthentication (użytkownik "
+        "z bazy przy każdym żądaniu) i api.authentication.CachedJWTAuthentication - samo "
+        "authenticate() oraz całe żądania zapisu przez django.test.Client (z liczbą zapytań). "
+        "Tworzy zadania testowe i usuwa je po pomiarze - uruchamiaj na bazie testowej."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--endpoints', nargs='+', default=['edit_task', 'create_task'])
+        parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+
+    def handle(self, *args, **options):
+        fixtures = Fixtures()
+        scenarios = [s for s in SCENARIOS if s.name in options['endpoints']]
+        marks = {
+            'task': Task.objects.aggregate(m=Max('id'))['m'] or 0,
+            'history': TaskEvent.objects.aggregate(m=Max('id'))['m'] or 0,
+        }
+        try:
+            for name in options['backends']:
+                backend = BACKENDS[name]
+                self.measure_authenticate(name, backend(), fixtures, options['requests'])
+                # widoki API dziedziczą authentication_classes z APIView (DEFAULT_AUTHENTICATION_CLASSES)
+                default, APIView.authentication_classes = APIView.authentication_classes, [backend]
+                try:
+                    for scenario in scenarios:
+                        result = run_client(scenario, fixtures, options['requests'])
+                        self.stdout.write(
+                            f"{name:<10} {scenario.name:<14} p50 {fmt(result['p50_ms'], '8.3f')} ms  "
+                            f"p99 {fmt(result['p99_ms'], '8.3f')} ms  queries {result['queries_per_request']:5.1f}  "
+                            f"{result['status_codes']}"
+                        )
+                finally:
+                    APIView.authentication_classes = default
+        finally:
+            delete_tasks(Task.objects.filter(id__gt=marks['task']))
+            TaskEvent.objects.filter(id__gt=marks['history']).delete()
+
+    def measure_authenticate(self, name, backend, fixtures, requests):
+        factory = RequestFactory()
+        latencies, queries = [], []
+        for _ in range(requests):
+            request = Request(factory.post('/', HTTP_AUTHORIZATION=f'Bearer {fixtures.access}'))
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                backend.authenticate(request)
+                latencies.append(time.perf_counter() - started)
+            queries.append(len(ctx.captured_queries))
+        self.stdout.write(
+            f"{name:<10} {'authenticate':<14} p50 {statistics.median(latencies) * 1000:8.3f} ms  "
+            f"p99 {statistics.quantiles(latencies, n=100)[98] * 1000:8.3f} ms  "
+            f"queries {statistics.mean(queries):5.1f}"
+        )
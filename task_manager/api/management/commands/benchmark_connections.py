@@ -0,0 +1,58 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.utils import ConnectionHandler
+
+
+class Command(BaseCommand):
+    help = (
+        "Mierzy koszt nawiązania połączenia z bazą w każdym trybie DB_POOL_MODE "
+        "(none, persistent, pool) w cyklu żądania: start żądania, SELECT 1, koniec żądania."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--modes', nargs='+', default=list(settings.DATABASE_POOL_MODES), choices=list(settings.DATABASE_POOL_MODES))
+
+    def handle(self, *args, **options):
+        base = settings.DATABASES[options['database']]
+        for mode in options['modes']:
+            overrides = settings.DATABASE_POOL_MODES[mode]
+            if 'pool' in overrides.get('OPTIONS', {}) and 'postgresql' not in base['ENGINE']:
+                self.stdout.write(f"{mode:<11} skipped: pool requires the PostgreSQL backend (psycopg 3)")
+                continue
+            options_ = {**base.get('OPTIONS', {}), **overrides.get('OPTIONS', {})}
+            if mode != 'pool':
+                options_.pop('pool', None)
+            # osobny alias - pula psycopg jest współdzielona przez połączenia o tym samym aliasie
+            alias = f'benchmark_{mode}'
+            handler = ConnectionHandler({'default': dict(base), alias: {**base, **overrides, 'OPTIONS': options_}})
+            self.measure(mode, handler[alias], options['requests'])
+
+    def measure(self, mode, connection, requests):
+        connect, total = [], []
+        try:
+            for _ in range(requests):
+                started = time.perf_counter()
+                # to samo co sygnały request_started/request_finished (close_old_connections)
+                connection.close_if_unusable_or_obsolete()
+                connection.ensure_connection()
+                connected = time.perf_counter()
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                connection.close_if_unusable_or_obsolete()
+                connect.append(connected - started)
+                total.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+            if mode == 'pool':
+                connection.close_pool()
+        self.stdout.write(
+            f"{mode:<11} connect median {statistics.median(connect) * 1000:7.3f} ms  "
+            f"p95 {statistics.quantiles(connect, n=20)[18] * 1000:7.3f} ms  "
+            f"request median {statistics.median(total) * 1000:7.3f} ms"
+        )
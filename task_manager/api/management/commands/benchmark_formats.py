@@ -0,0 +1,74 @@
+import gzip
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from api.compression import brotli
+from api.management.seed import rolled_back, seed_tasks, seed_users
+from api.models import Task
+from api.projection import project
+from api.renderers import FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+from api.serializer import TASK_FIELDS, TaskListSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Porównuje formaty odpowiedzi list zadań (JSON DRF, orjson, MessagePack) bez kompresji, "
+        "z gzip i brotli: rozmiar w bajtach oraz czas kodowania i dekodowania. "
+        "Dane testowe są wstawiane w transakcji i wycofywane po pomiarze."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 10_000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            seed_tasks(max(options['sizes']), users=seed_users(100, prefix='bench_fmt'))
+            for size in options['sizes']:
+                rows = list(project(Task.objects.order_by('created_at', 'id')[:size], TASK_FIELDS))
+                data = {'next': None, 'previous': None, 'results': TaskListSerializer(rows, many=True).data}
+                self.measure(size, data, options['repeat'])
+
+    def formats(self):
+        formats = [('json', JSONRenderer(), json.loads)]
+        if orjson is not None:
+            formats.append(('orjson', FastJSONRenderer(), orjson.loads))
+        if msgpack is not None:
+            formats.append(('msgpack', MessagePackRenderer(), msgpack.unpackb))
+        return formats
+
+    def encodings(self):
+        encodings = [('identity', lambda body: body, lambda body: body), ('gzip', compress_string, gzip.decompress)]
+        if brotli is not None:
+            encodings.append((
+                'br',
+                lambda body: brotli.compress(body, quality=settings.API_BROTLI_QUALITY),
+                brotli.decompress,
+            ))
+        return encodings
+
+    def timed(self, func, arg, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func(arg)
+            timings.append(time.perf_counter() - started)
+        return result, statistics.median(timings) * 1000
+
+    def measure(self, size, data, repeat):
+        for label, renderer, loads in self.formats():
+            body, render_ms = self.timed(renderer.render, data, repeat)
+            _, loads_ms = self.timed(loads, body, repeat)
+            for encoding, compress, decompress in self.encodings():
+                wire, compress_ms = self.timed(compress, body, repeat)
+                _, decompress_ms = self.timed(decompress, wire, repeat)
+                self.stdout.write(
+                    f"{size:>7} {label:<8} {encoding:<9} {len(wire):>10} B  "
+                    f"encode {render_ms + compress_ms:8.2f} ms  decode {loads_ms + decompress_ms:8.2f} ms"
+                )
@@ -0,0 +1,125 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from api import counters
+from api.history import task_at, task_history
+from api.management.seed import WORDS, rolled_back, seed_tasks
+from api.models import Task, TaskEvent, TaskHistory
+
+
+def table_size(model):
+    """
+    Rozmiar tabeli razem z indeksami w bajtach.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+        else:
+            cursor.execute(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+                "(SELECT name FROM sqlite_master WHERE tbl_name = %s)",
+                [table],
+            )
+        return cursor.fetchone()[0] or 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Porównuje dotychczasową historię (pełne kopie w TaskHistory) z logiem zdarzeń TaskEvent: "
+        "rozmiar tabel oraz czas odtworzenia wersji zadania i strony historii. "
+        "Dane testowe są wstawiane w transakcji i wycofywane po pomiarze."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1_000)
+        parser.add_argument('--edits', type=int, default=50, help='Liczba zmian każdego zadania.')
+        parser.add_argument('--samples', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            seed_tasks(options['tasks'])
+            tasks = list(Task.objects.order_by('-id')[:options['tasks']])
+            legacy_before, events_before = table_size(TaskHistory), table_size(TaskEvent)
+            self.seed_edits(tasks, options['edits'])
+            self.stdout.write(
+                f"storage  TaskHistory {table_size(TaskHistory) - legacy_before:>12} B  "
+                f"TaskEvent {table_size(TaskEvent) - events_before:>12} B  "
+                f"({options['tasks']} tasks x {options['edits']} edits)"
+            )
+            self.measure(tasks, options)
+
+    def seed_edits(self, tasks, edits, batch_size=10_000):
+        """
+        Te same zmiany zapisane na dwa sposoby: kopia zadania sprzed zmiany (TaskHistory)
+        i zdarzenie z samymi zmienionymi polami (TaskEvent).
+        """
+        rnd = random.Random(0)
+        statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+        now = timezone.now()
+        before = [counters.key(task) for task in tasks]
+        legacy, events = [], []
+        for task in tasks:
+            for i in range(edits):
+                at = now - timezone.timedelta(minutes=edits - i)
+                if i % 5 == 4:
+                    data = {'description': ' '.join(rnd.choices(WORDS, k=40))}
+                else:
+                    data = {'status': rnd.choice([status for status in statuses if status != task.status])}
+                legacy.append(TaskHistory.snapshot(task, at))
+                event = TaskEvent.updated(task, data, at)
+                events.append(event)
+                for attr, value in data.items():
+                    setattr(task, attr, value)
+                task.history_version = event.version
+            if len(events) >= batch_size:
+                TaskHistory.objects.bulk_create(legacy)
+                TaskEvent.objects.bulk_create(events)
+                legacy, events = [], []
+        TaskHistory.objects.bulk_create(legacy)
+        TaskEvent.objects.bulk_create(events)
+        Task.objects.bulk_update(tasks, ['status', 'description', 'history_version'], batch_size=batch_size)
+        counters.changed(before, [counters.key(task) for task in tasks])
+
+    def timed(self, func, samples):
+        timings = []
+        for args in samples:
+            started = time.perf_counter()
+            func(*args)
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), statistics.quantiles(timings, n=20)[18]
+
+    def measure(self, tasks, options):
+        rnd = random.Random(1)
+        versions = [(task.id, rnd.randint(1, options['edits'])) for task in rnd.choices(tasks, k=options['samples'])]
+        page_tasks = [(task.id,) for task in rnd.choices(tasks, k=options['samples'])]
+        page_size = options['page_size']
+
+        def legacy_version(task_id, version):
+            # k-ta kopia w kolejności zmian to stan zadania w wersji k
+            return TaskHistory.objects.filter(task_id=task_id).order_by('updated_at', 'id')[version - 1]
+
+        def legacy_page(task_id):
+            return list(
+                TaskHistory.objects.filter(task_id=task_id).select_related('assigned_user')
+                .order_by('-updated_at', '-id')[:page_size]
+            )
+
+        def events_page(task_id):
+            page = list(TaskEvent.objects.filter(task_id=task_id, version__gt=1).order_by('-version')[:page_size])
+            return task_history(task_id, page)
+
+        for label, func, samples in (
+            ('version  TaskHistory', legacy_version, versions),
+            ('version  TaskEvent  ', task_at, versions),
+            ('page     TaskHistory', legacy_page, page_tasks),
+            ('page     TaskEvent  ', events_page, page_tasks),
+        ):
+            median, p95 = self.timed(func, samples)
+            self.stdout.write(f"{label}  median {median:8.3f} ms  p95 {p95:8.3f} ms")
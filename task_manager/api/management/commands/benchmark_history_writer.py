@@ -0,0 +1,63 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.test import override_settings
+from django.urls import reverse
+
+from api.history_writer import writer
+from api.management.benchmark import Fixtures, Scenario, check_concurrency, fmt, run_wsgi
+from api.management.seed import delete_tasks, seed_tasks
+from api.models import Task, TaskEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Porównuje przepustowość edycji zadań (PUT /api/task/edit/<id>/) przy zapisie historii "
+        "w transakcji żądania (TASK_HISTORY_WRITER=sync) i w tle z dziennikiem WAL (async). "
+        "Zadania testowe są zapisywane w bazie i usuwane po pomiarze."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=1_000)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--modes', nargs='+', default=['sync', 'async'], choices=['sync', 'async'])
+
+    def handle(self, *args, **options):
+        check_concurrency(options['concurrency'])
+        marks = {
+            'task': Task.objects.aggregate(m=Max('id'))['m'] or 0,
+            'history': TaskEvent.objects.aggregate(m=Max('id'))['m'] or 0,
+        }
+        fixtures = Fixtures()
+        seed_tasks(options['tasks'], users=[fixtures.user])
+        task_ids = list(Task.objects.filter(id__gt=marks['task']).values_list('id', flat=True))
+        rnd = random.Random(0)
+
+        def payload(f):
+            # każda edycja zmienia opis, więc każde żądanie zapisuje zdarzenie historii
+            return {'name': 'bench', 'description': f'edit {next(f.counter)}', 'status': 'IN_PROGRESS', 'assigned_user': f.user.id}
+
+        scenario = Scenario('edit_task', 'PUT', lambda f: reverse('edit_task', args=[rnd.choice(task_ids)]), payload, auth=True)
+        try:
+            for mode in options['modes']:
+                self.measure(mode, scenario, fixtures, options)
+        finally:
+            delete_tasks(Task.objects.filter(id__gt=marks['task']))
+            TaskEvent.objects.filter(id__gt=marks['history']).delete()
+
+    def measure(self, mode, scenario, fixtures, options):
+        before = TaskEvent.objects.count()
+        with override_settings(TASK_HISTORY_WRITER=mode):
+            result = run_wsgi(scenario, fixtures, options['requests'], options['concurrency'])
+            started = time.perf_counter()
+            writer.drain()
+            drain = time.perf_counter() - started
+        written = TaskEvent.objects.count() - before
+        self.stdout.write(
+            f"{mode:<6} x{result['concurrency']} {fmt(result['throughput_rps'], '8.1f')} req/s  "
+            f"p50 {fmt(result['p50_ms'], '7.2f')} ms  p95 {fmt(result['p95_ms'], '7.2f')} ms  "
+            f"drain {drain * 1000:7.1f} ms  events {written}/{options['requests']}  {result['status_codes']}"
+        )
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.models import Max
+from django.test import override_settings
+from django.urls import reverse
+
+from api import passwords
+from api.management.benchmark import BENCH_PASSWORD, SCENARIOS, Fixtures, call_wsgi, summarize
+from api.management.seed import delete_tasks
+from api.models import Task, TaskEvent
+
+
+# inline - haszowanie w wątku żądania bez limitu (jak przed api.passwords), pool - ustawienia PASSWORD_HASH_*
+MODES = {
+    'inline': {'PASSWORD_HASH_WORKERS': 0, 'PASSWORD_HASH_CONCURRENCY': 0},
+    'pool': {},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Obciążenie mieszane: odczyty wybranego endpointu w stałym tempie, najpierw bez obciążenia, "
+        "potem w trakcie burzy logowań (--storm równoległych klientów POST /api/user/login/) dla "
+        "haszowania w wątku żądania (inline) i w puli procesów z limitem (pool). Żądania wykonuje "
+        "w wątkach aplikacja WSGI (--threads wątków serwera, jak widoki sync w trybie ASGI)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--read-endpoint', default='get_task', help='Nazwa scenariusza odczytu z api.management.benchmark.')
+        parser.add_argument('--duration', type=float, default=5.0, help='Czas jednej fazy (s).')
+        parser.add_argument('--storm', type=int, default=16, help='Liczba równoległych klientów logujących się bez przerwy.')
+        parser.add_argument('--storm-ips', type=int, default=16, help='Z ilu adresów (X-Real-IP) przychodzą logowania.')
+        parser.add_argument('--read-interval', type=float, default=0.01, help='Przerwa między odczytami (s).')
+        parser.add_argument('--threads', type=int, default=64)
+        parser.add_argument(
+            '--rate-limit', default='',
+            help="PASSWORD_RATE_LIMIT w czasie pomiaru, np. '20/min' (domyślnie wyłączony, mierzymy samo haszowanie).",
+        )
+        parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+
+    def handle(self, *args, **options):
+        marks = {
+            'task': Task.objects.aggregate(m=Max('id'))['m'] or 0,
+            'history': TaskEvent.objects.aggregate(m=Max('id'))['m'] or 0,
+        }
+        fixtures = Fixtures()
+        read = next(s for s in SCENARIOS if s.name == options['read_endpoint'])
+        application = get_wsgi_application()
+        self.stdout.write(
+            f"hasher {settings.PASSWORD_HASHERS[0].rsplit('.', 1)[-1]}, pool: workers {settings.PASSWORD_HASH_WORKERS}, "
+            f"concurrency {settings.PASSWORD_HASH_CONCURRENCY}, wait {settings.PASSWORD_HASH_WAIT_SECONDS} s"
+        )
+        try:
+            with override_settings(PASSWORD_RATE_LIMIT=options['rate_limit']):
+                self.phase('baseline', None, application, read, fixtures, options)
+                for mode in options['modes']:
+                    with override_settings(**MODES[mode]):
+                        passwords.pool.shutdown()
+                        # start procesów puli poza pomiarem
+                        fixtures.user.check_password(BENCH_PASSWORD)
+                        self.phase(mode, options['storm'], application, read, fixtures, options)
+                        passwords.pool.shutdown()
+        finally:
+            delete_tasks(Task.objects.filter(id__gt=marks['task']))
+            TaskEvent.objects.filter(id__gt=marks['history']).delete()
+
+    def phase(self, name, storm, application, read, fixtures, options):
+        cache.clear()
+        server = ThreadPoolExecutor(max_workers=options['threads'])
+        stop = threading.Event()
+        lock = threading.Lock()
+        logins, login_latencies = Counter(), []
+
+        def handle(method, path, body, headers):
+            try:
+                return call_wsgi(application, method, path, body, headers)
+            finally:
+                connections.close_all()
+
+        def login_client(n):
+            body = f'{{"name": "{fixtures.user.username}", "password": "{BENCH_PASSWORD}"}}'.encode()
+            headers = {'HTTP_X_REAL_IP': f'10.0.{n % options["storm_ips"] // 256}.{n % options["storm_ips"] % 256}'}
+            while not stop.is_set():
+                begin = time.perf_counter()
+                status = server.submit(handle, 'POST', reverse('login_user'), body, headers).result()
+                with lock:
+                    logins[status] += 1
+                    if status == 200:
+                        login_latencies.append(time.perf_counter() - begin)
+
+        clients = [threading.Thread(target=login_client, args=(n,)) for n in range(storm or 0)]
+        for client in clients:
+            client.start()
+        latencies, statuses = [], Counter()
+        started = time.perf_counter()
+        while time.perf_counter() - started < options['duration']:
+            begin = time.perf_counter()
+            statuses[server.submit(handle, *read.build(fixtures)).result()] += 1
+            latencies.append(time.perf_counter() - begin)
+            time.sleep(options['read_interval'])
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for client in clients:
+            client.join()
+        server.shutdown()
+
+        result = summarize(latencies, elapsed)
+        line = (
+            f"{name:<9} reads {result['requests']:5d}  p50 {result['p50_ms']:8.2f} ms  "
+            f"p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  {dict(statuses)}"
+        )
+        if storm:
+            ok = summarize(login_latencies, elapsed) if login_latencies else None
+            line += (
+                f"  | logins {sum(logins.values())} ({logins[200] / elapsed:.1f}/s ok)  {dict(sorted(logins.items()))}"
+                + (f"  login p50 {ok['p50_ms']:.0f} ms" if ok else '')
+            )
+        self.stdout.write(line)
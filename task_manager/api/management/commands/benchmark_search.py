@@ -0,0 +1,47 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.management.seed import rolled_back, seed_tasks
+from api.models import Task
+from api.search import IContainsSearch, get_search_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Porównuje silnik wyszukiwania z api.search z dotychczasowym icontains. "
+        "Dane testowe są wstawiane w transakcji i wycofywane po pomiarze."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--keywords', nargs='+', default=['faktura', 'serwer backup', 'grac'])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--limit', type=int, default=100)
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            with rolled_back():
+                seed_tasks(size, seed=size)
+                self.measure(size, options)
+
+    def measure(self, size, options):
+        backends = [('icontains', IContainsSearch()), ('indexed', get_search_backend())]
+        for keyword in options['keywords']:
+            for label, backend in backends:
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    qs = backend.search(Task.objects.all(), keyword)
+                    # taka sama kolejność jak w TaskCursorPagination
+                    if 'search_rank' in qs.query.annotations:
+                        qs = qs.order_by('-search_rank', 'id')
+                    else:
+                        qs = qs.order_by('created_at', 'id')
+                    list(qs[:options['limit']])
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{size:>9} {label:<10} {keyword!r:<16} "
+                    f"median {statistics.median(timings):8.2f} ms  max {max(timings):8.2f} ms"
+                )
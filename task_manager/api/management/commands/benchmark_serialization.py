@@ -0,0 +1,56 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.management.seed import rolled_back, seed_tasks, seed_users
+from api.models import Task
+from api.projection import project
+from api.serializer import TASK_FIELDS, TaskListSerializer, TaskSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Porównuje serializację list zadań: TaskSerializer na obiektach modelu "
+        "z TaskListSerializer na wierszach values() (wszystkie pola i projekcja ?fields=). "
+        "Dane testowe są wstawiane w transakcji i wycofywane po pomiarze."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100_000])
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--fields', default='id,name', help='Projekcja mierzona obok pełnej listy pól.')
+
+    def handle(self, *args, **options):
+        projection = tuple(name for name in TASK_FIELDS if name in options['fields'].split(','))
+        for size in options['sizes']:
+            with rolled_back():
+                seed_tasks(size, users=seed_users(100, prefix='bench_ser'), seed=size)
+                self.measure(size, projection, options['repeat'])
+
+    def measure(self, size, projection, repeat):
+        qs = Task.objects.order_by('created_at', 'id')[:size]
+        cases = [
+            ('TaskSerializer', lambda: list(qs), lambda rows: TaskSerializer(rows, many=True).data),
+            ('TaskListSerializer', lambda: list(project(qs, TASK_FIELDS)),
+             lambda rows: TaskListSerializer(rows, many=True).data),
+            (f"fields={','.join(projection)}", lambda: list(project(qs, projection)),
+             lambda rows: TaskListSerializer(rows, many=True, field_names=projection).data),
+        ]
+        baseline = None
+        for label, fetch, serialize in cases:
+            fetch_times, serialize_times = [], []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows = fetch()
+                fetched = time.perf_counter()
+                serialize(rows)
+                fetch_times.append(fetched - started)
+                serialize_times.append(time.perf_counter() - fetched)
+            fetch_ms = statistics.median(fetch_times) * 1000
+            serialize_ms = statistics.median(serialize_times) * 1000
+            baseline = baseline or serialize_ms
+            self.stdout.write(
+                f"{size:>9} {label:<24} fetch {fetch_ms:9.1f} ms  serialize {serialize_ms:9.1f} ms  "
+                f"speedup x{baseline / serialize_ms:5.1f}"
+            )
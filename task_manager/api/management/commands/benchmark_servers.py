@@ -0,0 +1,131 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.benchmark import SCENARIOS, Fixtures, summarize
+
+
+READ_ENDPOINTS = ['get_all_tasks', 'filter_tasks', 'get_task', 'get_task_history', 'export_tasks']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def http_headers(headers):
+    # Scenario.build zwraca nagłówki w postaci WSGI (HTTP_AUTHORIZATION)
+    return {name[5:].replace('_', '-').title(): value for name, value in headers.items()}
+
+
+class Command(BaseCommand):
+    help = (
+        "Porównuje tryby serwera przy tej samej liczbie workerów: uruchamia gunicorna z gunicorn.conf.py "
+        "(SERVER_MODE=wsgi - workery sync, asgi - UvicornWorker z widokami async) na wolnym porcie "
+        "i obciąża endpointy odczytu przez HTTP (httpx) przy kolejnych poziomach współbieżności. "
+        "--pollers utrzymuje dodatkowo otwarte long-polle /api/task/feed/ (klienci strumienia zmian)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', default=['wsgi', 'asgi'], choices=['wsgi', 'asgi'])
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--requests', type=int, default=400, help='Liczba żądań na endpoint i poziom współbieżności.')
+        parser.add_argument('--endpoints', nargs='+', default=READ_ENDPOINTS)
+        parser.add_argument('--pollers', type=int, default=0)
+
+    def handle(self, *args, **options):
+        fixtures = Fixtures()
+        scenarios = [s for s in SCENARIOS if s.name in options['endpoints']]
+        for mode in options['modes']:
+            port = free_port()
+            server = self.start(mode, port, options['workers'])
+            try:
+                base = f'http://127.0.0.1:{port}'
+                self.wait_ready(base, server)
+                for scenario in scenarios:
+                    for concurrency in options['concurrency']:
+                        result = asyncio.run(self.load(base, scenario, fixtures, options['requests'], concurrency, options['pollers']))
+                        self.stdout.write(
+                            f"{mode:<5} x{options['workers']} {scenario.name:<17} c={concurrency:<3} "
+                            f"{result['throughput_rps']:8.1f} req/s  p50 {result['p50_ms']:8.2f} ms  "
+                            f"p95 {result['p95_ms']:8.2f} ms  {result['status_codes']}"
+                        )
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+    def start(self, mode, port, workers):
+        env = {**os.environ, 'SERVER_MODE': mode, 'WEB_CONCURRENCY': str(workers)}
+        env.pop('API_ASYNC_VIEWS', None)
+        return subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+            cwd=settings.BASE_DIR, env=env,
+        )
+
+    def wait_ready(self, base, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'Server exited with code {server.returncode}')
+            try:
+                if httpx.get(f'{base}/api/task/stats/').status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.2)
+        raise CommandError('Server did not start')
+
+    async def load(self, base, scenario, fixtures, requests, concurrency, pollers):
+        limits = httpx.Limits(max_connections=concurrency + pollers, max_keepalive_connections=concurrency + pollers)
+        latencies, statuses = [], set()
+        stop = asyncio.Event()
+
+        async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as client:
+            async def poller():
+                # long-poll bez nowych zdarzeń: w trybie asgi odpowiedź dopiero po TASK_FEED_POLL_TIMEOUT,
+                # w trybie wsgi od razu - klient ponawia wtedy po TASK_FEED_POLL_SECONDS
+                seq = (await client.get('/api/task/feed/')).json()['seq']
+                while not stop.is_set():
+                    await client.get('/api/task/feed/', params={'after': seq})
+                    await asyncio.sleep(settings.TASK_FEED_POLL_SECONDS)
+
+            async def worker(count):
+                for _ in range(count):
+                    method, path, body, headers = scenario.build(fixtures)
+                    begin = time.perf_counter()
+                    for attempt in range(2):
+                        try:
+                            response = await client.request(
+                                method, path, content=body or None,
+                                headers={'Content-Type': 'application/json', **http_headers(headers)},
+                            )
+                            break
+                        except httpx.RemoteProtocolError:
+                            # połączenie keep-alive zamknięte przez serwer w chwili wysłania żądania
+                            if attempt:
+                                raise
+                    latencies.append(time.perf_counter() - begin)
+                    statuses.add(response.status_code)
+
+            polling = [asyncio.create_task(poller()) for _ in range(pollers)]
+            if pollers:
+                await asyncio.sleep(1)
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(len(range(i, requests, concurrency))) for i in range(concurrency)))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            for task in polling:
+                task.cancel()
+            await asyncio.gather(*polling, return_exceptions=True)
+        summary = summarize(latencies, elapsed)
+        summary['status_codes'] = sorted(statuses)
+        return summary
@@ -0,0 +1,74 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.management.seed import rolled_back, seed_history, seed_tasks, seed_users
+from api.history import replay_range
+from api.models import Task, TaskEvent
+from api.search import search_tasks
+
+
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN \S+$')
+
+
+def is_full_scan(plan):
+    if connection.vendor == 'postgresql':
+        return 'Seq Scan' in plan
+    return any(SQLITE_FULL_SCAN.search(line.strip()) for line in plan.splitlines())
+
+
+class Command(BaseCommand):
+    help = (
+        "Wykonuje EXPLAIN dla zapytań widoków z api.views na zasianej bazie i kończy się "
+        "błędem, jeśli któreś z nich wymaga pełnego skanu tabeli."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=5_000)
+        parser.add_argument('--history', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            users = seed_users(20)
+            seed_tasks(options['tasks'], users=users)
+            task = Task.objects.order_by('id').first()
+            seed_history(Task.objects.order_by('id')[:100], options['history'])
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+            failures = self.check_plans(self.view_queries(task, options['page_size']))
+        if failures:
+            raise CommandError(f"Full table scan in: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('All view queries use indexes.'))
+
+    def view_queries(self, task, page_size):
+        ordering = ('created_at', 'id')
+        user_id = task.assigned_user_id
+        return {
+            'get_all_tasks': Task.objects.order_by(*ordering)[:page_size],
+            'get_task': Task.objects.filter(id=task.id),
+            'get_user_tasks': Task.objects.filter(assigned_user=user_id).order_by(*ordering)[:page_size],
+            'filter_tasks[status]': Task.objects.filter(status=Task.NEW).order_by(*ordering)[:page_size],
+            'filter_tasks[status,assigned_user]': (
+                Task.objects.filter(status=Task.NEW, assigned_user=user_id).order_by(*ordering)[:page_size]
+            ),
+            'filter_tasks[keyword]': search_tasks(Task.objects.all(), 'faktura').order_by('-search_rank', 'id')[:page_size],
+            'get_task_history': (
+                TaskEvent.objects.filter(task_id=task.id, version__gt=1).order_by('-version')[:page_size]
+            ),
+            'get_task_history[replay]': replay_range(task.id, 1, page_size),
+        }
+
+    def check_plans(self, queries):
+        failures = []
+        for name, qs in queries.items():
+            plan = qs.explain()
+            if is_full_scan(plan):
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: full scan'))
+                self.stdout.write(plan)
+            else:
+                self.stdout.write(f'{name}: ok')
+        return failures
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Porównuje liczniki zadań (TaskCounter, /api/task/stats/) z liczbą zadań policzoną od zera "
+        "i kończy się błędem przy rozbieżnościach; --fix przelicza liczniki od nowa."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Przelicz liczniki od zera.')
+
+    def handle(self, *args, **options):
+        differences = counters.diff()
+        for (user_id, status), (stored, actual) in sorted(differences.items(), key=lambda item: (item[0][0] or 0, item[0][1])):
+            user = 'unassigned' if user_id is None else f'user {user_id}'
+            self.stdout.write(f"{user:<16} {status:<12} counter {stored:>8}  actual {actual:>8}")
+        if not differences:
+            self.stdout.write(self.style.SUCCESS("Task counters are consistent."))
+            return
+        if not options['fix']:
+            raise CommandError(f"{len(differences)} task counters differ from the task table (use --fix to rebuild).")
+        counters.rebuild()
+        remaining = counters.diff()
+        if remaining:
+            raise CommandError(f"{len(remaining)} task counters still differ after rebuild.")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt task counters ({len(differences)} fixed)."))
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Tworzy partycje miesięczne historii zadań (api_taskevent, tylko PostgreSQL) "
+        "dla bieżącego i --months kolejnych miesięcy. Uruchamiaj okresowo (np. z crona)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=settings.TASK_HISTORY_PARTITIONS_AHEAD)
+
+    def handle(self, *args, **options):
+        if not partitions.is_partitioned():
+            self.stdout.write("Skipped: task history is partitioned only on PostgreSQL")
+            return
+        current = partitions.month_start(timezone.now())
+        for offset in range(options['months'] + 1):
+            start = partitions.add_months(current, offset)
+            if partitions.create_partition(start):
+                self.stdout.write(f"Created {partitions.partition_name(start)}")
+        self.stdout.write(self.style.SUCCESS(f"Partitions: {', '.join(partitions.partitions())}"))
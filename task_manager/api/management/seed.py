@@ -0,0 +1,109 @@
+import random
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.utils import timezone
+
+from api import counters
+from api.cache import invalidate_tasks
+from api.models import Task, TaskEvent, User
+
+
+WORDS = [
+    'raport', 'klient', 'faktura', 'serwer', 'wdrożenie', 'spotkanie', 'backup',
+    'migracja', 'testy', 'dokumentacja', 'przegląd', 'aktualizacja', 'błąd', 'umowa',
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back(using='default'):
+    """
+    Wykonuje blok w transakcji, która zawsze jest wycofywana - dane testowe
+    z komend benchmarkowych nie zostają w bazie.
+    """
+    try:
+        with transaction.atomic(using=using):
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def seed_users(count, prefix='seed'):
+    return User.objects.bulk_create(
+        User(username=f'{prefix}_{i}', email=f'{prefix}_{i}@example.com')
+        for i in range(count)
+    )
+
+
+def seed_tasks(count, users=(), batch_size=10_000, seed=0):
+    """
+    Zasiewa count zadań partiami jak TaskBulkView.post: zdarzenia utworzenia,
+    liczniki (api.counters) i wersja tabeli zadań w transakcji każdej partii.
+    """
+    rnd = random.Random(seed)
+    statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+    for start in range(0, count, batch_size):
+        with transaction.atomic():
+            tasks = Task.objects.bulk_create(
+                Task(
+                    name=' '.join(rnd.choices(WORDS, k=3)),
+                    description=' '.join(rnd.choices(WORDS, k=40)),
+                    status=rnd.choice(statuses),
+                    assigned_user=rnd.choice(users) if users else None,
+                    history_version=1,
+                )
+                for _ in range(min(batch_size, count - start))
+            )
+            TaskEvent.objects.bulk_create(TaskEvent.created(task, task.created_at) for task in tasks)
+            counters.created(tasks)
+            invalidate_tasks(user_ids={task.assigned_user_id for task in tasks})
+
+
+def seed_history(tasks, per_task, batch_size=10_000, seed=0):
+    """
+    Dopisuje per_task zmian każdego zadania do historii (TaskEvent): zwykle
+    zmiana statusu, co piąta - nowy opis. Zadania dostają stan po ostatniej zmianie
+    (z aktualizacją liczników i unieważnieniem cache, jak TaskBulkView.put).
+    """
+    rnd = random.Random(seed)
+    statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+    now = timezone.now()
+    tasks = list(tasks)
+    before = [counters.key(task) for task in tasks]
+    batch = []
+    for task in tasks:
+        for i in range(per_task):
+            if i % 5 == 4:
+                data = {'description': ' '.join(rnd.choices(WORDS, k=40))}
+            else:
+                data = {'status': rnd.choice([status for status in statuses if status != task.status])}
+            event = TaskEvent.updated(task, data, now - timezone.timedelta(minutes=per_task - i))
+            for attr, value in data.items():
+                setattr(task, attr, value)
+            task.history_version = event.version
+            batch.append(event)
+            if len(batch) >= batch_size:
+                TaskEvent.objects.bulk_create(batch)
+                batch = []
+    with transaction.atomic():
+        TaskEvent.objects.bulk_create(batch)
+        Task.objects.bulk_update(tasks, ['status', 'description', 'history_version'], batch_size=batch_size)
+        counters.changed(before, [counters.key(task) for task in tasks])
+        invalidate_tasks([task.id for task in tasks], {task.assigned_user_id for task in tasks})
+
+
+def delete_tasks(tasks):
+    """
+    Usuwa zadania z querysetu tasks (np. zasiane przez benchmark) jak TaskBulkView.delete, ale bez
+    zdarzeń usunięcia: z aktualizacją liczników (api.counters) i unieważnieniem cache.
+    """
+    with transaction.atomic():
+        deleted = list(tasks.only('id', 'assigned_user_id', 'status'))
+        counters.deleted(deleted)
+        tasks.delete()
+        invalidate_tasks([task.id for task in deleted], {task.assigned_user_id for task in deleted})
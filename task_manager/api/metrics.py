@@ -0,0 +1,333 @@
+import fcntl
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .history_writer import pid_alive
+from .routers import client_ip
+
+
+logger = logging.getLogger('api.metrics')
+
+HISTOGRAMS = {
+    'api_request_duration_seconds': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'api_request_db_queries': (1, 2, 5, 10, 20, 50, 100, 200, 500),
+    'api_request_db_duration_seconds': (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    'api_response_size_bytes': (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+}
+
+HELP = {
+    'api_request_duration_seconds': 'Wall time of API requests.',
+    'api_request_db_queries': 'Number of database queries per API request.',
+    'api_request_db_duration_seconds': 'Time spent in database queries per API request.',
+    'api_response_size_bytes': 'Size of API response bodies (streaming responses excluded).',
+}
+
+
+class Registry:
+    """
+    Histogramy per (nazwa URL, metoda) w pamięci procesu.
+    Przy kilku workerach gunicorna każdy proces okresowo zapisuje swój stan
+    do pliku {pid}-{start}.json w METRICS_DIR, a endpoint /api/metrics/ sumuje
+    pliki wszystkich workerów - liczniki nie giną przy obsłudze żądania przez
+    inny proces. Znacznik startu odróżnia nowy proces o ponownie użytym PID
+    od martwego poprzednika; stan martwych workerów jest przenoszony do
+    retired.json, więc sumy liczników nie maleją po restarcie workera.
+    """
+    RETIRED = 'retired.json'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+        self.requests = {}
+        self.last_flush = 0.0
+        self.pid = None
+        self.started = None
+
+    def observe(self, view, method, status, values):
+        key = f'{view}|{method}'
+        with self.lock:
+            series = self.series.setdefault(key, {
+                name: {'buckets': [0] * len(bounds), 'count': 0, 'sum': 0.0}
+                for name, bounds in HISTOGRAMS.items()
+            })
+            for name, value in values.items():
+                if value is None:
+                    continue
+                histogram = series[name]
+                for i, bound in enumerate(HISTOGRAMS[name]):
+                    if value <= bound:
+                        histogram['buckets'][i] += 1
+                histogram['count'] += 1
+                histogram['sum'] += value
+            status_key = f'{key}|{status}'
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps({'series': self.series, 'requests': self.requests}))
+
+    def path(self, directory):
+        # Rejestr powstaje przed forkiem workerów - znacznik liczony w procesie
+        if self.pid != os.getpid():
+            self.pid, self.started = os.getpid(), time.time_ns()
+        return Path(directory) / f'{self.pid}-{self.started}.json'
+
+    def flush_due(self):
+        return bool(settings.METRICS_DIR) and (
+            time.monotonic() - self.last_flush >= settings.METRICS_FLUSH_INTERVAL
+        )
+
+    def flush(self, force=False):
+        if not force and not self.flush_due():
+            return
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        self.last_flush = time.monotonic()
+        path = self.path(directory)
+        tmp = path.with_suffix('.tmp')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, path)
+
+    def retire(self, directory):
+        """
+        Przenosi stan martwych workerów do retired.json i usuwa ich pliki.
+        Z kilku plików o tym samym PID żyć może tylko najnowszy.
+        """
+        workers = {}
+        for path in directory.glob('*-*.json'):
+            pid, _, started = path.stem.partition('-')
+            try:
+                workers.setdefault(int(pid), []).append((int(started), path))
+            except ValueError:
+                continue
+        dead = []
+        for pid, files in workers.items():
+            files.sort()
+            if pid_alive(pid):
+                files = files[:-1]
+            dead.extend(path for _, path in files)
+        if not dead:
+            return
+        with open(directory / '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            retired = directory / self.RETIRED
+            snapshots, moved = [], []
+            if retired.exists():
+                snapshots.append(json.loads(retired.read_text()))
+            for path in dead:
+                try:
+                    snapshots.append(json.loads(path.read_text()))
+                except FileNotFoundError:
+                    # Przeniesiony już przez inny worker
+                    continue
+                except ValueError:
+                    pass
+                moved.append(path)
+            series, requests = merge(snapshots)
+            tmp = retired.with_suffix('.tmp')
+            tmp.write_text(json.dumps({'series': series, 'requests': requests}))
+            os.replace(tmp, retired)
+            for path in moved:
+                path.unlink(missing_ok=True)
+
+    def collect(self):
+        """
+        Stan wszystkich workerów, także zakończonych (lub tylko bieżącego procesu bez METRICS_DIR).
+        """
+        if not settings.METRICS_DIR:
+            return [self.snapshot()]
+        self.flush(force=True)
+        directory = Path(settings.METRICS_DIR)
+        self.retire(directory)
+        snapshots = []
+        for path in directory.glob('*.json'):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+
+registry = Registry()
+
+
+def merge(snapshots):
+    series, requests = {}, {}
+    for snapshot in snapshots:
+        for key, histograms in snapshot['series'].items():
+            target = series.setdefault(key, {
+                name: {'buckets': [0] * len(bounds), 'count': 0, 'sum': 0.0}
+                for name, bounds in HISTOGRAMS.items()
+            })
+            for name, histogram in histograms.items():
+                target[name]['buckets'] = [a + b for a, b in zip(target[name]['buckets'], histogram['buckets'])]
+                target[name]['count'] += histogram['count']
+                target[name]['sum'] += histogram['sum']
+        for key, count in snapshot['requests'].items():
+            requests[key] = requests.get(key, 0) + count
+    return series, requests
+
+
+def render(snapshots):
+    series, requests = merge(snapshots)
+    lines = [
+        '# HELP api_requests_total Number of API requests.',
+        '# TYPE api_requests_total counter',
+    ]
+    for key, count in sorted(requests.items()):
+        view, method, status = key.split('|')
+        lines.append(f'api_requests_total{{view="{view}",method="{method}",status="{status}"}} {count}')
+    for name, bounds in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {HELP[name]}')
+        lines.append(f'# TYPE {name} histogram')
+        for key, histograms in sorted(series.items()):
+            view, method = key.split('|')
+            labels = f'view="{view}",method="{method}"'
+            histogram = histograms[name]
+            for bound, count in zip(bounds, histogram['buckets']):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram["sum"]}')
+            lines.append(f'{name}_count{{{labels}}} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+class QueryRecorder:
+    """
+    Licznik zapytań i ich czasu (opcjonalnie z treścią SQL) dla jednego żądania.
+    """
+
+    def __init__(self, keep_sql):
+        self.count = 0
+        self.duration = 0.0
+        self.keep_sql = keep_sql
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if self.keep_sql:
+                self.statements.append((elapsed, sql))
+
+
+current_recorder = ContextVar('api_metrics_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_recorder(sender, connection, **kwargs):
+    """
+    connection_created: stały execute_wrapper na każdym połączeniu, także
+    w wątkach sync_to_async, w których ASGI wykonuje zapytania ORM. Licznik
+    żądania trafia tam przez ContextVar kopiowany do wątku przez asgiref.
+    Wstawiany na początek listy, bo execute_wrapper() zdejmuje ostatni element.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class MetricsMiddleware:
+    """
+    Mierzy czas, liczbę i czas zapytań SQL oraz rozmiar odpowiedzi dla
+    każdego żądania i zapisuje je pod nazwą rozwiązanego URL (np. filter_tasks).
+    Żądania wolniejsze niż METRICS_SLOW_REQUEST_MS są logowane wraz z SQL.
+    W trybie ASGI zapis do METRICS_DIR odbywa się w wątku, poza pętlą zdarzeń.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder(keep_sql=bool(settings.METRICS_SLOW_REQUEST_MS))
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.record(request, response, time.perf_counter() - started, recorder)
+        registry.flush()
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder(keep_sql=bool(settings.METRICS_SLOW_REQUEST_MS))
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.record(request, response, time.perf_counter() - started, recorder)
+        if registry.flush_due():
+            await sync_to_async(registry.flush, thread_sensitive=False)()
+        return response
+
+    def record(self, request, response, duration, recorder):
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unresolved'
+        size = None if response.streaming else len(response.content)
+        registry.observe(view, request.method, response.status_code, {
+            'api_request_duration_seconds': duration,
+            'api_request_db_queries': recorder.count,
+            'api_request_db_duration_seconds': recorder.duration,
+            'api_response_size_bytes': size,
+        })
+
+        slow_ms = settings.METRICS_SLOW_REQUEST_MS
+        if slow_ms and duration * 1000 >= slow_ms:
+            logger.warning(
+                'Slow request %s %s (%s): %.1f ms, %s queries, %.1f ms in DB\n%s',
+                request.method, request.get_full_path(), view, duration * 1000,
+                recorder.count, recorder.duration * 1000,
+                '\n'.join(f'  [{elapsed * 1000:.1f} ms] {sql}' for elapsed, sql in recorder.statements),
+            )
+
+
+def metrics_allowed(request):
+    """
+    Metryki ujawniają nazwy widoków i ruch - tylko dla adresów z
+    METRICS_ALLOWED_NETWORKS albo z nagłówkiem Authorization: Bearer METRICS_TOKEN.
+    """
+    token = settings.METRICS_TOKEN
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    try:
+        address = ipaddress.ip_address(client_ip(request))
+    except ValueError:
+        return False
+    return any(address in network for network in settings.METRICS_ALLOWED_NETWORKS)
+
+
+def metrics_view(request):
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render(registry.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,72 @@
+import api.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE api_task ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX api_task_search_vector_gin ON api_task USING GIN (search_vector)",
+    "CREATE INDEX api_task_name_trgm ON api_task USING GIN (name gin_trgm_ops)",
+    "CREATE INDEX api_task_description_trgm ON api_task USING GIN (description gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS api_task_description_trgm",
+    "DROP INDEX IF EXISTS api_task_name_trgm",
+    "DROP INDEX IF EXISTS api_task_search_vector_gin",
+    "ALTER TABLE api_task DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE api_task_fts USING fts5(
+        name, description, content='api_task', content_rowid='id', tokenize='trigram'
+    )
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS api_task_fts",
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    # Struktury wyszukiwania pełnotekstowego zależą od bazy danych (api.search).
+    # Wyzwalacze FTS5 dla SQLite zakłada api.search.install_fts_triggers po migracji.
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run_for_vendor({'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}),
+        ),
+        migrations.CreateModel(
+            name='TaskSearchIndex',
+            fields=[
+                ('task', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='api.task')),
+                ('document', api.models.FTSDocumentField(db_column='api_task_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'api_task_fts',
+                'managed': False,
+            },
+        ),
+    ]
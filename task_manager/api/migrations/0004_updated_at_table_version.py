@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:56
+
+from django.db import migrations, models
+
+
+def populate(apps, schema_editor):
+    Task = apps.get_model('api', 'Task')
+    TableVersion = apps.get_model('api', 'TableVersion')
+    Task.objects.update(updated_at=models.F('created_at'))
+    for table in ('tasks', 'users'):
+        TableVersion.objects.get_or_create(table=table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_task_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('table', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,134 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:13
+
+import itertools
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# zadania usuniętego (bez wiersza Task) nie znamy statusu - dotychczasowa historia go nie zapisywała
+DELETED_TASK_STATUS = 'NEW'
+
+
+def legacy_state(row, status, created_at):
+    # dotychczasowa historia nie zapisywała statusu - przyjmujemy bieżący status zadania
+    return {
+        'name': row.name,
+        'description': row.description,
+        'status': status,
+        'assigned_user': row.assigned_user_id,
+        'created_at': created_at.isoformat(),
+    }
+
+
+def task_events(TaskEvent, task_id, rows, task, interval):
+    """
+    Zdarzenia zadania z jego wpisów TaskHistory (stanów sprzed kolejnych zmian):
+    utworzenie (najstarszy zapisany stan) i kolejne zmiany aż do bieżącego stanu
+    zadania, a dla zadania usuniętego (task=None) - do zdarzenia usunięcia.
+    """
+    if task is not None:
+        states = [legacy_state(row, task.status, task.created_at) for row in rows] + [legacy_state(task, task.status, task.created_at)]
+        times = [task.created_at] + [row.updated_at for row in rows]
+    else:
+        states = [legacy_state(row, DELETED_TASK_STATUS, row.created_at) for row in rows]
+        times = [rows[0].created_at] + [row.updated_at for row in rows[:-1]]
+    events, previous = [], None
+    for version, (state, at) in enumerate(zip(states, times), start=1):
+        snapshot = (version - 1) % interval == 0
+        if snapshot:
+            changes = state
+        else:
+            changes = {field: value for field, value in state.items() if previous[field] != value}
+        events.append(TaskEvent(
+            task_id=task_id, version=version, kind='create' if version == 1 else 'update',
+            snapshot=snapshot, changes=changes, created_at=at,
+        ))
+        previous = state
+    if task is None:
+        version = len(states) + 1
+        snapshot = (version - 1) % interval == 0
+        events.append(TaskEvent(
+            task_id=task_id, version=version, kind='delete', snapshot=snapshot,
+            changes=previous if snapshot else {}, created_at=rows[-1].deleted_at or rows[-1].updated_at,
+        ))
+    return events
+
+
+def migrate_history(apps, schema_editor):
+    """
+    Zamienia pełne kopie z TaskHistory na zdarzenia TaskEvent dla każdego
+    zadania z historią (także usuniętego) i każdego istniejącego zadania.
+    Wpisy TaskHistory zostają w tabeli.
+    """
+    Task = apps.get_model('api', 'Task')
+    TaskHistory = apps.get_model('api', 'TaskHistory')
+    TaskEvent = apps.get_model('api', 'TaskEvent')
+    interval = settings.TASK_HISTORY_SNAPSHOT_INTERVAL
+
+    history = itertools.groupby(
+        TaskHistory.objects.order_by('task_id', 'updated_at', 'id').iterator(chunk_size=2000),
+        key=attrgetter('task_id'),
+    )
+    tasks = Task.objects.order_by('id').iterator(chunk_size=2000)
+    events, updated = [], []
+
+    def add(task_id, rows, task):
+        nonlocal events, updated
+        events.extend(task_events(TaskEvent, task_id, rows, task, interval))
+        if task is not None:
+            task.history_version = len(rows) + 1
+            updated.append(task)
+        if len(events) >= 2000:
+            TaskEvent.objects.bulk_create(events)
+            Task.objects.bulk_update(updated, ['history_version'])
+            events, updated = [], []
+
+    # scalanie dwóch strumieni uporządkowanych po id zadania
+    task = next(tasks, None)
+    for task_id, rows in history:
+        while task is not None and task.id < task_id:
+            add(task.id, [], task)
+            task = next(tasks, None)
+        if task is not None and task.id == task_id:
+            add(task_id, list(rows), task)
+            task = next(tasks, None)
+        else:
+            add(task_id, list(rows), None)
+    while task is not None:
+        add(task.id, [], task)
+        task = next(tasks, None)
+    TaskEvent.objects.bulk_create(events)
+    Task.objects.bulk_update(updated, ['history_version'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_updated_at_table_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='history_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='TaskEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField()),
+                ('version', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=6)),
+                ('snapshot', models.BooleanField(default=False)),
+                ('changes', models.JSONField()),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('task_id', 'version'), name='taskevent_task_version_uniq')],
+            },
+        ),
+        migrations.RunPython(migrate_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:02
+
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations
+
+
+COLUMNS = 'id, task_id, version, kind, snapshot, changes, created_at'
+
+PARTITIONED_TABLE = """
+CREATE SEQUENCE api_taskevent_event_id_seq;
+CREATE TABLE api_taskevent (
+    id bigint NOT NULL DEFAULT nextval('api_taskevent_event_id_seq'),
+    task_id bigint NOT NULL,
+    version integer NOT NULL CHECK (version >= 0),
+    kind varchar(6) NOT NULL,
+    snapshot boolean NOT NULL,
+    changes jsonb NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    PRIMARY KEY (id, created_at),
+    CONSTRAINT taskevent_task_version_uniq UNIQUE (task_id, version, created_at)
+) PARTITION BY RANGE (created_at);
+ALTER SEQUENCE api_taskevent_event_id_seq OWNED BY api_taskevent.id;
+CREATE TABLE api_taskevent_default PARTITION OF api_taskevent DEFAULT;
+"""
+
+PLAIN_TABLE = """
+CREATE TABLE api_taskevent (
+    id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    task_id bigint NOT NULL,
+    version integer NOT NULL CHECK (version >= 0),
+    kind varchar(6) NOT NULL,
+    snapshot boolean NOT NULL,
+    changes jsonb NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    CONSTRAINT taskevent_task_version_uniq UNIQUE (task_id, version)
+);
+"""
+
+
+def month_index(value):
+    return value.year * 12 + value.month - 1
+
+
+def month(index):
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_events(apps, schema_editor):
+    """
+    PostgreSQL: zamienia api_taskevent na tabelę partycjonowaną miesięcznie
+    po created_at (partycje dla miesięcy z danymi i TASK_HISTORY_PARTITIONS_AHEAD
+    kolejnych, dalsze tworzy create_history_partitions). Klucz główny i
+    ograniczenie unikalności muszą zawierać created_at - unikalność wersji
+    zadania zapewnia nadal Task.history_version.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('ALTER TABLE api_taskevent RENAME TO api_taskevent_unpartitioned')
+        cursor.execute('ALTER TABLE api_taskevent_unpartitioned DROP CONSTRAINT taskevent_task_version_uniq')
+        cursor.execute('ALTER TABLE api_taskevent_unpartitioned RENAME CONSTRAINT api_taskevent_pkey TO api_taskevent_unpartitioned_pkey')
+        cursor.execute(PARTITIONED_TABLE)
+        cursor.execute("SELECT MIN(created_at) FROM api_taskevent_unpartitioned")
+        oldest = cursor.fetchone()[0]
+        now = datetime.now(timezone.utc)
+        first = month_index(oldest) if oldest else month_index(now)
+        for index in range(first, month_index(now) + settings.TASK_HISTORY_PARTITIONS_AHEAD + 1):
+            start, end = month(index), month(index + 1)
+            cursor.execute(
+                f'CREATE TABLE api_taskevent_y{start.year}m{start.month:02} PARTITION OF api_taskevent '
+                f'FOR VALUES FROM (%s) TO (%s)', [start, end],
+            )
+        cursor.execute(f'INSERT INTO api_taskevent ({COLUMNS}) SELECT {COLUMNS} FROM api_taskevent_unpartitioned')
+        cursor.execute("SELECT setval('api_taskevent_event_id_seq', COALESCE(MAX(id), 0) + 1, false) FROM api_taskevent")
+        cursor.execute('DROP TABLE api_taskevent_unpartitioned')
+
+
+def unpartition_events(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('ALTER TABLE api_taskevent RENAME TO api_taskevent_partitioned')
+        cursor.execute('ALTER TABLE api_taskevent_partitioned DROP CONSTRAINT taskevent_task_version_uniq')
+        cursor.execute('ALTER TABLE api_taskevent_partitioned RENAME CONSTRAINT api_taskevent_pkey TO api_taskevent_partitioned_pkey')
+        cursor.execute(PLAIN_TABLE)
+        cursor.execute(f'INSERT INTO api_taskevent ({COLUMNS}) SELECT {COLUMNS} FROM api_taskevent_partitioned')
+        cursor.execute("SELECT setval(pg_get_serial_sequence('api_taskevent', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM api_taskevent")
+        cursor.execute('DROP TABLE api_taskevent_partitioned')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_task_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_events, unpartition_events),
+    ]
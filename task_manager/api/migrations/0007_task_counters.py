@@ -0,0 +1,38 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_tasks(apps, schema_editor):
+    Task = apps.get_model('api', 'Task')
+    TaskCounter = apps.get_model('api', 'TaskCounter')
+    TaskCounter.objects.bulk_create(
+        TaskCounter(assigned_user_id=row['assigned_user'], status=row['status'], count=row['n'])
+        for row in Task.objects.values('assigned_user', 'status').annotate(n=Count('id')).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_partition_task_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('NEW', 'New'), ('IN_PROGRESS', 'In progress'), ('SOLVED', 'Solved')], max_length=11)),
+                ('count', models.IntegerField(default=0)),
+                ('assigned_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('assigned_user__isnull', False)), fields=('assigned_user', 'status'), name='taskcounter_user_status_uniq'), models.UniqueConstraint(condition=models.Q(('assigned_user__isnull', True)), fields=('status',), name='taskcounter_unassigned_status_uniq')],
+            },
+        ),
+        migrations.RunPython(count_tasks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:03
+
+import api.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_revoked_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskevent',
+            name='xid',
+            field=models.BigIntegerField(db_default=api.models.CurrentTransaction(), editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='taskevent',
+            index=models.Index(fields=['xid', 'id'], name='taskevent_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.5 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+class OutsidePostgres:
+    # PostgreSQL ma już (task_id, version, created_at) z migracji 0006 (tabela partycjonowana)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class RemoveConstraint(OutsidePostgres, migrations.RemoveConstraint):
+    pass
+
+
+class AddConstraint(OutsidePostgres, migrations.AddConstraint):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_task_event_xid'),
+    ]
+
+    operations = [
+        RemoveConstraint(
+            model_name='taskevent',
+            name='taskevent_task_version_uniq',
+        ),
+        AddConstraint(
+            model_name='taskevent',
+            constraint=models.UniqueConstraint(fields=['task_id', 'version', 'created_at'], name='taskevent_task_version_uniq'),
+        ),
+    ]
@@ -1,6 +1,14 @@
+import os
+import threading
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Lookup
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 
+from . import passwords
+
 
 class Task(models.Model):
     NEW = 'NEW'
@@ -27,13 +35,30 @@ class Task(models.Model):
         blank=True 
     )
     created_at = models.DateTimeField(auto_now_add=True)
-    
+    updated_at = models.DateTimeField(auto_now=True)
+    # numer ostatniego zdarzenia historii (TaskEvent.version) - nadawany w transakcji zapisu
+    history_version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['assigned_user', 'status'], name='task_user_status_idx'),
+            models.Index(fields=['status', 'created_at'], name='task_status_created_idx'),
+            # kolejność stronicowania kursorowego (api.pagination)
+            models.Index(fields=['created_at', 'id'], name='task_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} {self.id}"
 
 class TaskHistory(models.Model):
-    task = models.ForeignKey(Task, on_delete=models.CASCADE, null=True, blank=True)
+    """
+    Dotychczasowa historia w postaci pełnych kopii zadania przed każdą zmianą.
+    Zastąpiona przez TaskEvent (wpisy przeniesione w migracji 0005); tabela
+    zostaje do porównań (benchmark_history) i ewentualnego wycofania zmian.
+    task_id to zwykła kolumna bez klucza obcego (jak w 0001_initial) - wpisy
+    usuniętych zadań zostają i są przenoszone do TaskEvent.
+    """
+    task_id = models.IntegerField()
     name = models.CharField(max_length=100)
     description = models.TextField()
     assigned_user = models.ForeignKey(
@@ -46,6 +71,243 @@ class TaskHistory(models.Model):
     updated_at = models.DateTimeField()
     deleted_at = models.DateTimeField(null=True)
 
+    @classmethod
+    def snapshot(cls, task, updated_at):
+        """
+        Niezapisany wpis historii z bieżącym stanem zadania.
+        """
+        return cls(
+            task_id=task.id,
+            name=task.name,
+            description=task.description,
+            assigned_user_id=task.assigned_user_id,
+            created_at=task.created_at,
+            updated_at=updated_at,
+        )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['task_id', '-updated_at'], name='taskhistory_task_updated_idx'),
+        ]
+
+
+class CurrentTransaction(models.Func):
+    """
+    Identyfikator transakcji zapisującej wiersz (PostgreSQL, xid8 jako bigint) -
+    domyślna wartość TaskEvent.xid. W SQLite NULL: zapisy i tak są szeregowane.
+    """
+    template = 'pg_current_xact_id()::text::bigint'
+    output_field = models.BigIntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return 'NULL', []
+
+
+class TaskEvent(models.Model):
+    """
+    Historia zadania jako dopisywany log zdarzeń (api.history).
+    Zdarzenie przechowuje tylko zmienione pola (changes), a co
+    TASK_HISTORY_SNAPSHOT_INTERVAL wersji - pełny stan zadania (snapshot),
+    więc odtworzenie dowolnej wersji wymaga co najwyżej tylu zdarzeń.
+    Nie ma klucza obcego do zadania - historia zostaje po jego usunięciu.
+    W PostgreSQL tabela jest partycjonowana miesięcznie po created_at
+    (migracja 0006, api.partitions), a stare miesiące trafiają do archiwum (api.archive).
+    Ograniczenie unikalności tabeli partycjonowanej musi zawierać klucz partycji,
+    więc baza pilnuje (task_id, version, created_at); jednoznaczność samej wersji
+    zadania zapewnia Task.history_version, nadawany pod blokadą wiersza zadania
+    (select_for_update) we wszystkich ścieżkach zapisu.
+    """
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    KIND_CHOICES = [
+        (CREATE, 'Create'),
+        (UPDATE, 'Update'),
+        (DELETE, 'Delete'),
+    ]
+    # pola zadania odtwarzane z historii
+    FIELDS = ('name', 'description', 'status', 'assigned_user', 'created_at')
+
+    task_id = models.BigIntegerField()
+    version = models.PositiveIntegerField()
+    kind = models.CharField(max_length=6, choices=KIND_CHOICES)
+    snapshot = models.BooleanField(default=False)
+    changes = models.JSONField()
+    created_at = models.DateTimeField()
+    # transakcja, która zapisała zdarzenie - pozycja w strumieniu zmian to (xid, id), zob. api.feed
+    xid = models.BigIntegerField(null=True, editable=False, db_default=CurrentTransaction())
+
+    class Meta:
+        constraints = [
+            # ponowny zapis zdarzenia (odtwarzanie WAL, api.history_writer) ma ten sam created_at
+            models.UniqueConstraint(fields=['task_id', 'version', 'created_at'], name='taskevent_task_version_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['xid', 'id'], name='taskevent_feed_idx'),
+        ]
+
+    @staticmethod
+    def state(task, data=None):
+        """
+        Stan zadania w postaci zapisywanej w changes (JSON), opcjonalnie
+        po nałożeniu zwalidowanych danych z TaskSerializer.
+        """
+        state = {
+            'name': task.name,
+            'description': task.description,
+            'status': task.status,
+            'assigned_user': task.assigned_user_id,
+            'created_at': task.created_at.isoformat(),
+        }
+        for field, value in (data or {}).items():
+            if field == 'assigned_user':
+                state[field] = value.pk if value is not None else None
+            elif field in state and field != 'created_at':
+                state[field] = value
+        return state
+
+    @staticmethod
+    def is_snapshot(version):
+        return (version - 1) % settings.TASK_HISTORY_SNAPSHOT_INTERVAL == 0
+
+    @classmethod
+    def created(cls, task, at):
+        """
+        Pierwsze zdarzenie (wersja 1, zawsze pełny stan) dla zapisanego zadania.
+        """
+        return cls(task_id=task.id, version=1, kind=cls.CREATE, snapshot=True, changes=cls.state(task), created_at=at)
+
+    @classmethod
+    def updated(cls, task, data, at):
+        """
+        Niezapisane zdarzenie zmiany zadania danymi z TaskSerializer
+        (przed ich nałożeniem na zadanie) lub None, gdy nic się nie zmienia.
+        """
+        before, after = cls.state(task), cls.state(task, data)
+        changes = {field: value for field, value in after.items() if before[field] != value}
+        if not changes:
+            return None
+        version = task.history_version + 1
+        snapshot = cls.is_snapshot(version)
+        return cls(
+            task_id=task.id, version=version, kind=cls.UPDATE, snapshot=snapshot,
+            changes=after if snapshot else changes, created_at=at,
+        )
+
+    @classmethod
+    def deleted(cls, task, at):
+        version = task.history_version + 1
+        snapshot = cls.is_snapshot(version)
+        return cls(
+            task_id=task.id, version=version, kind=cls.DELETE, snapshot=snapshot,
+            changes=cls.state(task) if snapshot else {}, created_at=at,
+        )
+
+
+class TableVersion(models.Model):
+    """
+    Licznik wersji tabeli zwiększany przy każdym zapisie przez API.
+    Służy jako tani walidator (ETag/Last-Modified) dla kolekcji, zob. api.conditional.
+    Licznik jest rozłożony na TABLE_VERSION_SHARDS wierszy ('tasks', 'tasks:1', ...),
+    a wersją tabeli jest ich suma - współbieżne zapisy nie czekają na blokadę jednego wiersza.
+    """
+    TASKS = 'tasks'
+    USERS = 'users'
+
+    table = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @staticmethod
+    def rows(table):
+        # wszystkie wiersze licznika, także po zmniejszeniu TABLE_VERSION_SHARDS (suma nie maleje)
+        return models.Q(table=table) | models.Q(table__startswith=f'{table}:')
+
+    @classmethod
+    def bump(cls, table):
+        # wiersz stały dla wątku: transakcja blokuje najwyżej jeden wiersz licznika
+        shard = hash((os.getpid(), threading.get_ident())) % max(settings.TABLE_VERSION_SHARDS, 1)
+        if shard:
+            table = f'{table}:{shard}'
+        rows = cls.objects.filter(table=table)
+        if rows.update(version=models.F('version') + 1, updated_at=timezone.now()):
+            return
+        if not cls.objects.get_or_create(table=table, defaults={'version': 1})[1]:
+            # wiersz utworzył równolegle inny zapis
+            rows.update(version=models.F('version') + 1, updated_at=timezone.now())
+
+
+class TaskCounter(models.Model):
+    """
+    Liczba zadań dla pary (przypisany użytkownik, status) utrzymywana w
+    transakcjach zapisu zadań (api.counters) - źródło /api/task/stats/.
+    Wiersz bez użytkownika liczy zadania nieprzypisane; usunięcie
+    użytkownika przenosi jego liczniki do tego wiersza (SET_NULL w Task).
+    """
+    assigned_user = models.ForeignKey('User', on_delete=models.CASCADE, null=True, related_name='+')
+    status = models.CharField(max_length=11, choices=Task.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['assigned_user', 'status'], condition=models.Q(assigned_user__isnull=False),
+                name='taskcounter_user_status_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['status'], condition=models.Q(assigned_user__isnull=True),
+                name='taskcounter_unassigned_status_uniq',
+            ),
+        ]
+
+
+class RevokedToken(models.Model):
+    """
+    Unieważniony token JWT (jti) albo - przy pustym jti - wszystkie tokeny
+    użytkownika wystawione przed created_at (zmiana hasła, dezaktywacja,
+    usunięcie). Workery trzymają te wpisy w pamięci (api.authentication)
+    i doczytują nowe po id; wpis jest potrzebny do expires_at - później
+    unieważnione tokeny i tak wygasły.
+    """
+    jti = models.CharField(max_length=255, blank=True)
+    user_id = models.BigIntegerField(null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+
+class FTSDocumentField(models.TextField):
+    """
+    Ukryta kolumna tabeli FTS5 o nazwie tabeli - cel operatora MATCH.
+    """
+
+
+@FTSDocumentField.register_lookup
+class FTSMatch(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class TaskSearchIndex(models.Model):
+    """
+    Wirtualna tabela FTS5 indeksująca nazwę i opis zadań (tylko SQLite, zob. api.search).
+    """
+    task = models.OneToOneField(
+        Task,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_index',
+    )
+    document = FTSDocumentField(db_column='api_task_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'api_task_fts'
 
 
 class User(AbstractUser):
@@ -64,3 +326,12 @@ class User(AbstractUser):
         help_text="Specific permissions for this user.",
     )
 
+    # haszowanie w puli procesów z limitem współbieżności (api.passwords) - także dla
+    # /api/token/ (ModelBackend) i rejestracji (UserSerializer.create)
+    def set_password(self, raw_password):
+        self.password = passwords.make(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        return passwords.check(self, raw_password)
+
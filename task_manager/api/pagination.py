@@ -0,0 +1,149 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(values, reverse=False):
+    """
+    Kursor KeysetPage dla wartości pól ordering wiersza (np. następna strona
+    /api/task/all/ po pierwszej stronie zwróconej przez api.bundles).
+    """
+    data = json.dumps({'v': values, 'r': int(reverse)}, default=str)
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+class TaskCursorPagination(BasePagination):
+    """
+    Stronicowanie keyset po pełnej krotce (created_at, id), a dla wyszukiwania
+    pełnotekstowego (api.search) po (-search_rank, id) - przez KeysetPage.
+    Kolejne strony pobierane są warunkiem WHERE na wszystkich polach krotki
+    zamiast OFFSET (także przy remisach created_at lub trafności), więc koszt
+    strony nie zależy od jej głębokości, a nieprzezroczyste kursory
+    next/previous pozostają stabilne przy dopisywaniu nowych zadań.
+    """
+    cursor_query_param = 'cursor'
+
+    def get_ordering(self, queryset):
+        if 'search_rank' in queryset.query.annotations:
+            return ['-search_rank', 'id']
+        return ['created_at', 'id']
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page = KeysetPage(request, self.get_ordering(queryset))
+        self.rows = self.page.paginate(list(self.page.queryset(queryset)))
+        return self.rows
+
+    def get_paginated_response(self, data):
+        return Response(self.page.response_data(self.rows, data))
+
+
+class TaskHistoryCursorPagination(CursorPagination):
+    """
+    Stronicowanie kursorowe historii zadania (TaskEvent) - od najnowszych wersji.
+    """
+    ordering = ('-version',)
+    page_size = settings.TASK_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class KeysetPage:
+    """
+    Stronicowanie keyset po pełnej krotce pól ordering (bez OFFSET), używane
+    przez TaskCursorPagination i widoki asynchroniczne (api.async_views).
+    Kursor zawiera wartości pól ostatniego (next) lub pierwszego (previous)
+    wiersza strony; odpowiedź ma postać next/previous/results. Niepoprawny
+    kursor kończy się NotFound (404), jak w CursorPagination z DRF.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, request, ordering):
+        self.request = request
+        self.ordering = ordering
+        self.cursor = self.decode(request.GET.get(self.cursor_query_param))
+        self.forward = self.cursor is None or not self.cursor['r']
+        try:
+            self.page_size = min(int(request.GET[self.page_size_query_param]), self.max_page_size)
+        except (KeyError, ValueError):
+            self.page_size = settings.TASK_PAGE_SIZE
+        if self.page_size < 1:
+            self.page_size = settings.TASK_PAGE_SIZE
+
+    def decode(self, cursor):
+        if not cursor:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        valid = (
+            isinstance(data, dict) and data.get('r') in (0, 1)
+            and isinstance(data.get('v'), list) and len(data['v']) == len(self.ordering)
+            and all(isinstance(value, (str, int, float)) and not isinstance(value, bool) for value in data['v'])
+        )
+        if not valid:
+            raise NotFound(self.invalid_cursor_message)
+        return data
+
+    def encode(self, values, reverse):
+        return encode_cursor(values, reverse)
+
+    def position(self, obj):
+        # obiekt modelu lub wiersz z values() (api.projection)
+        if isinstance(obj, dict):
+            return [obj[field.lstrip('-')] for field in self.ordering]
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def queryset(self, qs):
+        """
+        Zapytanie o stronę: page_size + 1 wierszy za (lub przed) kursorem.
+        """
+        if self.cursor:
+            condition = Q()
+            for i, field in enumerate(self.ordering):
+                name, desc = field.lstrip('-'), field.startswith('-')
+                lookup = 'gt' if desc != self.forward else 'lt'
+                equal = {f.lstrip('-'): v for f, v in zip(self.ordering[:i], self.cursor['v'][:i])}
+                condition |= Q(**equal, **{f'{name}__{lookup}': self.cursor['v'][i]})
+            try:
+                qs = qs.filter(condition)
+            except (ValidationError, ValueError, TypeError):
+                # wartość kursora niepasująca do typu pola (np. tekst zamiast daty)
+                raise NotFound(self.invalid_cursor_message)
+        ordering = self.ordering if self.forward else [
+            field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering
+        ]
+        return qs.order_by(*ordering)[:self.page_size + 1]
+
+    def link(self, obj, reverse):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode(self.position(obj), reverse))
+
+    def paginate(self, rows):
+        """
+        Przycina wiersze pobrane zapytaniem z queryset() do strony w kolejności ordering.
+        """
+        self.has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if not self.forward:
+            rows.reverse()
+        return rows
+
+    def response_data(self, rows, data):
+        has_next = self.has_more if self.forward else self.cursor is not None
+        has_previous = self.cursor is not None if self.forward else self.has_more
+        return {
+            'next': self.link(rows[-1], reverse=False) if rows and has_next else None,
+            'previous': self.link(rows[0], reverse=True) if rows and has_previous else None,
+            'results': data,
+        }
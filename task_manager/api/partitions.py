@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+
+from django.db import connection, transaction
+
+
+# Tabela TaskEvent (api_taskevent) jest w PostgreSQL partycjonowana miesięcznie
+# po created_at (migracja 0006); na innych bazach to zwykła tabela.
+TABLE = 'api_taskevent'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(start, months):
+    index = start.year * 12 + start.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(start):
+    return f'{TABLE}_y{start.year}m{start.month:02}'
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [TABLE])
+        return cursor.fetchone() is not None
+
+
+def partitions():
+    """
+    Nazwy istniejących partycji miesięcznych (bez domyślnej).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = inhrelid "
+            "WHERE inhparent = to_regclass(%s) ORDER BY child.relname", [TABLE],
+        )
+        return [name for name, in cursor.fetchall() if name != DEFAULT_PARTITION]
+
+
+def create_partition(start):
+    """
+    Tworzy partycję miesiąca zaczynającego się w start (jeśli jej nie ma).
+    Zdarzenia z tego miesiąca, które trafiły do partycji domyślnej, są do niej
+    przenoszone - partycję tworzymy osobno i dołączamy w jednej transakcji.
+    Zwraca True, jeśli partycja została utworzona.
+    """
+    name = partition_name(start)
+    if name in partitions():
+        return False
+    end = add_months(start, 1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved', [start, end],
+        )
+        cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)', [start, end])
+    return True
+
+
+def drop_partition(start):
+    """
+    Usuwa partycję miesiąca (po archiwizacji); False, jeśli jej nie było.
+    """
+    name = partition_name(start)
+    if name not in partitions():
+        return False
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+        cursor.execute(f'DROP TABLE {name}')
+    return True
@@ -0,0 +1,182 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, identify_hasher, is_password_usable, make_password
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import SimpleRateThrottle
+
+from .routers import client_ip
+
+
+class PasswordHashBusy(APIException):
+    status_code = 503
+    default_detail = 'Too many password checks in progress, try again later.'
+    default_code = 'password_hash_busy'
+
+
+def init_worker():
+    # proces puli startuje metodą spawn - bez stanu workera (wątków, połączeń z bazą)
+    import django
+    django.setup()
+    if settings.PASSWORD_HASH_NICE:
+        os.nice(settings.PASSWORD_HASH_NICE)
+
+
+def hash_password(password):
+    return make_password(password)
+
+
+def verify_password(password, encoded):
+    """
+    Sprawdzenie hasła jak django.contrib.auth.hashers.check_password: przy
+    poprawnym haśle zapisanym innym hasherem niż PASSWORD_HASHERS[0] (lub ze
+    starszymi parametrami) zwraca też nowy skrót -> (poprawne, nowy skrót lub None).
+    """
+    preferred = get_hasher('default')
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False, None
+    is_correct = hasher.verify(password, encoded)
+    must_update = hasher.algorithm != preferred.algorithm or hasher.must_update(encoded)
+    if not is_correct:
+        if must_update:
+            hasher.harden_runtime(password, encoded)
+        return False, None
+    return True, preferred.encode(password, preferred.salt()) if must_update else None
+
+
+class HashPool:
+    """
+    Haszowanie haseł poza wątkiem żądania: w puli PASSWORD_HASH_WORKERS procesów
+    (z obniżonym priorytetem PASSWORD_HASH_NICE, więc nie zabierają procesora
+    obsłudze innych żądań), najwyżej PASSWORD_HASH_CONCURRENCY zadań naraz
+    w procesie aplikacji. Żądanie, które nie dostanie miejsca w ciągu
+    PASSWORD_HASH_WAIT_SECONDS, kończy się 503 (PasswordHashBusy) zamiast
+    zajmować worker. PASSWORD_HASH_WORKERS=0 - haszowanie w wątku żądania.
+    Pula jest tworzona przy pierwszym użyciu, osobno w każdym workerze gunicorna.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = None
+        self.slots = None
+
+    def get_slots(self):
+        with self.lock:
+            if self.slots is None and settings.PASSWORD_HASH_CONCURRENCY > 0:
+                self.slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_CONCURRENCY)
+            return self.slots
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=init_worker,
+                )
+            return self.executor
+
+    def discard(self, executor):
+        with self.lock:
+            if self.executor is executor:
+                self.executor = None
+        executor.shutdown(wait=False)
+
+    def call(self, fn, *args):
+        slots = self.get_slots()
+        if slots is not None and not slots.acquire(timeout=settings.PASSWORD_HASH_WAIT_SECONDS):
+            raise PasswordHashBusy()
+        try:
+            if settings.PASSWORD_HASH_WORKERS <= 0:
+                return fn(*args)
+            executor = self.get_executor()
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                # proces puli zginął (np. OOM) - nowa pula i jedna ponowna próba
+                self.discard(executor)
+                return self.get_executor().submit(fn, *args).result()
+        finally:
+            if slots is not None:
+                slots.release()
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor, self.slots = self.executor, None, None
+        if executor is not None:
+            executor.shutdown()
+
+
+pool = HashPool()
+
+
+def make(raw_password):
+    """
+    make_password() w puli; None daje hasło nieużywalne bez haszowania.
+    """
+    if raw_password is None:
+        return make_password(None)
+    return pool.call(hash_password, raw_password)
+
+
+def check(user, raw_password):
+    """
+    Sprawdza hasło użytkownika w puli; skrót zapisany innym hasherem niż
+    PASSWORD_HASHER jest od razu zastępowany nowym (zapis tylko pola password,
+    bez unieważniania tokenów użytkownika).
+    """
+    if raw_password is None or not is_password_usable(user.password):
+        return False
+    is_correct, upgraded = pool.call(verify_password, raw_password, user.password)
+    if upgraded is not None:
+        user.password = upgraded
+        user.save(update_fields=['password'])
+    return is_correct
+
+
+class PasswordRateThrottle(SimpleRateThrottle):
+    """
+    Limit żądań sprawdzających lub ustawiających hasło (logowanie, rejestracja,
+    /api/token/) na adres klienta (api.routers.client_ip) - PASSWORD_RATE_LIMIT,
+    np. '20/min'; pusty wyłącza. Każde takie żądanie kosztuje haszowanie (także dla
+    nieistniejącego użytkownika), więc limit nie zależy od podanej nazwy.
+    Liczniki są w cache 'default', więc przy API_CACHE_BACKEND=locmem limit dotyczy
+    jednego workera, przy memcached - całej instalacji.
+    """
+    scope = 'password'
+
+    def get_rate(self):
+        return settings.PASSWORD_RATE_LIMIT or None
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': client_ip(request)}
+
+
+class PasswordUserRateThrottle(PasswordRateThrottle):
+    """
+    Dodatkowy limit prób na nazwę użytkownika ze wszystkich adresów -
+    PASSWORD_USER_RATE_LIMIT (domyślnie wyłączony: pozwala zablokować logowanie
+    cudzego konta). Żądanie bez nazwy podlega tylko limitowi na adres.
+    """
+    scope = 'password_user'
+
+    def get_rate(self):
+        return settings.PASSWORD_USER_RATE_LIMIT or None
+
+    def get_cache_key(self, request, view):
+        data = request.data if isinstance(request.data, dict) else {}
+        username = str(data.get('username') or data.get('name') or '').casefold()
+        if not username:
+            return None
+        # skrót - klucz cache ograniczonej długości niezależnie od podanej nazwy
+        return self.cache_format % {'scope': self.scope, 'ident': hashlib.md5(username.encode()).hexdigest()}
+
+
+PASSWORD_THROTTLES = [PasswordRateThrottle, PasswordUserRateThrottle]
@@ -0,0 +1,45 @@
+from rest_framework.exceptions import ValidationError
+
+from .serializer import TASK_FIELDS, TaskListSerializer
+
+
+def selected_fields(params):
+    """
+    Pola zadania wybrane parametrem ?fields=id,name (domyślnie wszystkie),
+    w kolejności TASK_FIELDS.
+    """
+    value = params.get('fields')
+    if not value:
+        return TASK_FIELDS
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = sorted(names.difference(TASK_FIELDS))
+    if unknown or not names:
+        raise ValidationError({'fields': [f'Unknown field: {name}' for name in unknown] or ['No fields selected']})
+    return tuple(name for name in TASK_FIELDS if name in names)
+
+
+def project(qs, fields):
+    """
+    Zapytanie pobierające z bazy tylko wybrane kolumny (values()).
+    Pola kolejności stronicowania kursorowego dołączamy zawsze, bo kursor
+    next/previous jest liczony z ostatniego wiersza strony.
+    """
+    extra = ['id', 'created_at']
+    if 'search_rank' in qs.query.annotations:
+        extra.append('search_rank')
+    return qs.values(*dict.fromkeys([*fields, *extra]))
+
+
+class TaskProjectionMixin:
+    """
+    Listy zadań z projekcją ?fields= wypychaną do bazy i serializowane
+    przez TaskListSerializer zamiast TaskSerializer.
+    """
+
+    def filter_queryset(self, queryset):
+        self.projection = selected_fields(self.request.query_params)
+        return project(super().filter_queryset(queryset), self.projection)
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('context', self.get_serializer_context())
+        return TaskListSerializer(*args, field_names=self.projection, **kwargs)
@@ -0,0 +1,61 @@
+from rest_framework.renderers import JSONRenderer, BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def encode_default(obj):
+    # typy, których orjson/msgpack nie obsługują natywnie (Decimal, lazy str, QuerySet...)
+    return JSONEncoder().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON kodowany przez orjson (kilkukrotnie szybciej niż json.dumps),
+    bez wcięć i spacji. Bez zainstalowanego orjson - zwykły JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=encode_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Binarny MessagePack (Accept: application/msgpack) - mniejsze odpowiedzi
+    i szybsze dekodowanie po stronie klienta niż JSON.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default)
+
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Server-Sent Events (Accept: text/event-stream) dla /api/task/feed/ - widok
+    async zwraca wtedy strumień (api.feed.astream), a renderer służy negocjacji
+    i pojedynczym odpowiedziom (np. błędom) w postaci jednego komunikatu.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return b'data: ' + FastJSONRenderer().render(data) + b'\n\n'
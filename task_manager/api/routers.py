@@ -0,0 +1,128 @@
+import ipaddress
+import logging
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.utils.connection import ConnectionDoesNotExist
+from django.utils.deprecation import MiddlewareMixin
+
+
+logger = logging.getLogger('api.routers')
+
+
+# Alias repliki wybranej dla bieżącego żądania (None - baza główna)
+read_alias = ContextVar('read_alias', default=None)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReadReplicaRouter:
+    """
+    Kieruje odczyty widoków oznaczonych ReplicaReadMixin do repliki wybranej
+    na początku żądania; wszystkie pozostałe odczyty i wszystkie zapisy
+    trafiają do bazy głównej (default). Migracje wykonujemy tylko na bazie
+    głównej - repliki dostają schemat przez replikację.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def client_ip(request):
+    """
+    Adres klienta: X-Real-IP tylko od zaufanego pośrednika (API_TRUSTED_PROXIES -
+    nginx, frontend Streamlit), w przeciwnym razie adres połączenia. Nagłówek od
+    dowolnego klienta pozwalałby podać cudzy adres (limit logowań, replika).
+    """
+    remote = request.META.get('REMOTE_ADDR', '')
+    forwarded = request.META.get('HTTP_X_REAL_IP', '').strip()
+    if not forwarded:
+        return remote
+    try:
+        address = ipaddress.ip_address(remote)
+    except ValueError:
+        return remote
+    if any(address in network for network in settings.API_TRUSTED_PROXIES):
+        return forwarded
+    return remote
+
+
+def pin_key(request):
+    return f'api:pin:{client_ip(request)}'
+
+
+def replica_for(request):
+    """
+    Replika dla żądania lub None, jeśli klient niedawno zapisywał
+    (read-your-writes: odczyt z bazy głównej przez DB_REPLICA_PIN_SECONDS)
+    albo wylosowanej repliki nie ma lub nie odpowiada - wtedy przez
+    DB_REPLICA_PIN_SECONDS odczyty idą do bazy głównej bez ponownych prób.
+    """
+    if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS:
+        return None
+    alias = random.choice(settings.DATABASE_REPLICAS)
+    # przypięcie klienta lub znacznik niedostępnej repliki
+    if cache.get_many([pin_key(request), f'api:replica_down:{alias}']):
+        return None
+    try:
+        connections[alias].ensure_connection()
+    except (ConnectionDoesNotExist, DatabaseError):
+        logger.warning('Replica %s is unavailable, reading from the primary database', alias, exc_info=True)
+        cache.set(f'api:replica_down:{alias}', True, settings.DB_REPLICA_PIN_SECONDS)
+        return None
+    return alias
+
+
+class ReplicaReadMixin:
+    """
+    Widok tylko do odczytu obsługiwany z repliki (jednej na całe żądanie,
+    więc walidatory ETag i dane pochodzą z tej samej bazy).
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        token = read_alias.set(replica_for(request))
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            read_alias.reset(token)
+
+
+class AsyncReplicaReadMixin:
+    """
+    ReplicaReadMixin dla widoków asynchronicznych (api.async_views).
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        # cache i połączenie z repliką są synchroniczne - poza pętlą zdarzeń
+        token = read_alias.set(await sync_to_async(replica_for)(request))
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        finally:
+            read_alias.reset(token)
+
+
+class PrimaryPinMiddleware(MiddlewareMixin):
+    """
+    Po udanym zapisie kieruje odczyty tego klienta do bazy głównej przez
+    DB_REPLICA_PIN_SECONDS, żeby od razu widział własne zmiany mimo
+    opóźnienia replikacji. Przy kilku workerach wymaga wspólnego cache
+    (API_CACHE_BACKEND=file lub memcached).
+    """
+
+    def process_response(self, request, response):
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS and response.status_code < 400:
+            cache.set(pin_key(request), True, settings.DB_REPLICA_PIN_SECONDS)
+        return response
@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Task, TaskSearchIndex
+
+
+TASK_TABLE = Task._meta.db_table
+FTS_TABLE = TaskSearchIndex._meta.db_table
+
+
+def escape_like(keyword):
+    return keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class IContainsSearch:
+    """
+    Dotychczasowe wyszukiwanie ILIKE '%x%' po nazwie i opisie (bez rankingu).
+    """
+
+    def search(self, qs, keyword):
+        return qs.filter(Q(description__icontains=keyword) | Q(name__icontains=keyword))
+
+
+class PostgresSearch:
+    """
+    Wyszukiwanie po kolumnie tsvector (indeks GIN) z dopasowaniem podciągów
+    przez indeksy trigramowe pg_trgm. Wyniki oznaczone są rankingiem ts_rank.
+    """
+
+    def search(self, qs, keyword):
+        pattern = f'%{escape_like(keyword)}%'
+        match = RawSQL(
+            f"{TASK_TABLE}.search_vector @@ websearch_to_tsquery('simple', %s)"
+            f" OR {TASK_TABLE}.name ILIKE %s OR {TASK_TABLE}.description ILIKE %s",
+            (keyword, pattern, pattern),
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"ts_rank({TASK_TABLE}.search_vector, websearch_to_tsquery('simple', %s))::float8",
+            (keyword,),
+            output_field=FloatField(),
+        )
+        return qs.filter(match).annotate(search_rank=rank)
+
+
+class SQLiteSearch:
+    """
+    Wyszukiwanie w wirtualnej tabeli FTS5 (TaskSearchIndex, tokenizer trigram,
+    więc dopasowuje również podciągi). Ranking to odwrócony wynik bm25.
+    Frazy krótsze niż 3 znaki nie mają trigramów - wtedy używamy ILIKE.
+    """
+
+    def search(self, qs, keyword):
+        if len(keyword) < 3:
+            return IContainsSearch().search(qs, keyword)
+        phrase = '"' + keyword.replace('"', '""') + '"'
+        return qs.filter(search_index__document__match=phrase).annotate(
+            search_rank=-F('search_index__rank'),
+        )
+
+
+VENDOR_BACKENDS = {
+    'postgresql': PostgresSearch,
+    'sqlite': SQLiteSearch,
+}
+
+
+FTS_TRIGGERS = {
+    f'{FTS_TABLE}_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON {TASK_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END
+    """,
+    f'{FTS_TABLE}_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON {TASK_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+    """,
+    f'{FTS_TABLE}_update': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF name, description ON {TASK_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END
+    """,
+}
+
+
+def install_fts_triggers(using='default', **kwargs):
+    """
+    Zakłada wyzwalacze utrzymujące indeks FTS5 (SQLite). Django przebudowuje
+    tabelę przy zmianie jej kolumn i gubi przy tym wyzwalacze, dlatego
+    sprawdzamy je po każdej migracji i w razie braku odbudowujemy indeks.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+        if cursor.fetchone() is None:
+            return
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {row[0] for row in cursor.fetchall()}
+        if existing.issuperset(FTS_TRIGGERS):
+            return
+        for sql in FTS_TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def get_search_backend(using='default'):
+    """
+    Zwraca silnik wyszukiwania wskazany w TASK_SEARCH_BACKEND (ścieżka do klasy)
+    lub - dla 'auto' - silnik odpowiedni dla bazy danych.
+    """
+    backend = getattr(settings, 'TASK_SEARCH_BACKEND', 'auto')
+    if backend != 'auto':
+        return import_string(backend)()
+    return VENDOR_BACKENDS.get(connections[using].vendor, IContainsSearch)()
+
+
+def search_tasks(qs, keyword):
+    return get_search_backend(qs.db).search(qs, keyword)
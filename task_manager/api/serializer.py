@@ -1,12 +1,95 @@
 from rest_framework import serializers
+from django.utils import timezone
 from .models import Task, User
 from django.contrib.auth import get_user_model
 
 class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
-        fields = '__all__'
-        
+        # numer wersji historii jest wewnętrzny (api.models.TaskEvent)
+        exclude = ['history_version']
+
+
+class PreloadedUserField(serializers.PrimaryKeyRelatedField):
+    """
+    Użytkownik po id szukany w context['users'] ({id: User}, wczytanych
+    jednym zapytaniem dla całej listy), a bez niego - w bazie.
+    """
+
+    def to_internal_value(self, data):
+        users = self.context.get('users')
+        if users is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return users[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class BulkTaskSerializer(TaskSerializer):
+    """
+    TaskSerializer dla list z /api/task/bulk/ - bez zapytania o użytkownika na każdy element.
+    """
+    assigned_user = PreloadedUserField(queryset=User.objects.all(), required=False, allow_null=True)
+
+    @staticmethod
+    def for_items(items):
+        user_ids = set()
+        for item in items:
+            try:
+                user_ids.add(int(item['assigned_user']))
+            except (KeyError, TypeError, ValueError):
+                pass
+        return BulkTaskSerializer(data=items, many=True, context={'users': User.objects.in_bulk(user_ids)})
+
+
+# Pola zadania w kolejności TaskSerializer
+TASK_FIELDS = ('id', 'name', 'description', 'status', 'created_at', 'updated_at', 'assigned_user')
+
+
+class TaskListSerializer(serializers.BaseSerializer):
+    """
+    Szybki serializer list zadań tylko do odczytu. Przyjmuje wiersze z
+    Task.objects.values() (assigned_user to id) i zwraca wybrane pola w tym
+    samym formacie co TaskSerializer, bez maszynerii pól ModelSerializer.
+    """
+    datetime_fields = {'created_at', 'updated_at'}
+
+    def __init__(self, *args, field_names=TASK_FIELDS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.field_names = field_names
+        self.datetimes = [name for name in field_names if name in self.datetime_fields]
+        self.timezone = timezone.get_current_timezone()
+
+    def to_representation(self, row):
+        data = {name: row[name] for name in self.field_names}
+        for name in self.datetimes:
+            value = data[name]
+            if value is not None:
+                # jak serializers.DateTimeField: ISO 8601 w bieżącej strefie, 'Z' dla UTC
+                value = value.astimezone(self.timezone).isoformat()
+                data[name] = value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return data
+
+
+class TaskHistorySerializer(serializers.Serializer):
+    """
+    Wpis historii odtworzony z TaskEvent (api.history.history_entries):
+    stan zadania sprzed zmiany wykonanej w updated_at.
+    """
+    name = serializers.CharField()
+    description = serializers.CharField()
+    status = serializers.CharField()
+    assigned_user = serializers.CharField()
+    created_at = serializers.DateTimeField()
+    updated_at = serializers.DateTimeField()
+    deleted_at = serializers.DateTimeField()
+    version = serializers.IntegerField()
+
 User = get_user_model()
 
 class UserSerializer(serializers.ModelSerializer):
@@ -1,3 +1,952 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import archive, counters
+from .async_views import AsyncTaskExportView, AsyncTaskHistoryExportView, AsyncTaskListView
+from .authentication import CachedJWTAuthentication, denylist, user_cache
+from .conditional import ConditionalGetMixin
+from .export import EXPORT_FORMATS
+from .history import replay, task_at
+from .history_writer import HistoryWriter, dump, writer
+from .management.commands.check_query_plans import is_full_scan
+from .management.seed import seed_history, seed_tasks, seed_users
+from .metrics import Registry, merge, registry
+from .search import SQLiteSearch, get_search_backend
+from .models import RevokedToken, TableVersion, Task, TaskEvent, TaskHistory, User
+
+
+class QueryPlanTests(TestCase):
+    """
+    Zapytania widoków list, filtrów i historii nie wymagają pełnego skanu tabeli
+    (EXPLAIN przez check_query_plans na zasianej bazie).
+    """
+
+    def test_view_queries_use_indexes(self):
+        out = StringIO()
+        call_command('check_query_plans', tasks=2_000, stdout=out)
+        self.assertIn('All view queries use indexes.', out.getvalue())
+
+    def test_unindexed_query_is_reported(self):
+        self.assertTrue(is_full_scan(Task.objects.filter(description='x').explain()))
+
+
+class QueryCountTests(TestCase):
+    """
+    Strona list zadań, filtrów i historii wymaga stałej liczby zapytań,
+    niezależnie od rozmiaru strony i długości historii.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_users(1)[0]
+        seed_tasks(300, users=[cls.user])
+        cls.task = Task.objects.order_by('id').first()
+        seed_history([cls.task], 250)
+
+    def assert_queries(self, url, expected, **params):
+        for page_size in (5, 50):
+            cache.clear()
+            with self.assertNumQueries(expected):
+                response = self.client.get(url, {**params, 'page_size': page_size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), page_size)
+            cache.clear()
+            with self.assertNumQueries(expected):
+                self.assertEqual(self.client.get(response.json()['next']).status_code, 200)
+
+    # wersja tabeli (ETag) + strona
+    def test_task_list(self):
+        self.assert_queries(reverse('get_all_tasks'), 2)
+
+    def test_user_tasks(self):
+        self.assert_queries(reverse('get_user_tasks', args=[self.user.id]), 1)
+
+    def test_filter(self):
+        self.assert_queries(reverse('filter_tasks'), 2, status=Task.NEW, assigned_user=self.user.id)
+
+    def test_keyword_filter(self):
+        self.assert_queries(reverse('filter_tasks'), 2, keyword='faktura')
+
+    # strona zdarzeń + odtworzenie stanów + nazwy użytkowników
+    def test_task_history(self):
+        self.assert_queries(reverse('get_task_history', args=[self.task.id]), 3)
+
+
+class ExportMemoryTests(TestCase):
+    """
+    Eksport jest strumieniowany partiami (iterator(chunk_size)), więc szczyt
+    pamięci nie rośnie z liczbą eksportowanych zadań.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.small, cls.large = seed_users(2)
+        # co najmniej dwie pełne partie (2000 wierszy) także w mniejszym eksporcie
+        seed_tasks(4_000, users=[cls.small])
+        seed_tasks(16_000, users=[cls.large], seed=1)
+
+    def export_peak(self, user, export_format):
+        tracemalloc.start()
+        try:
+            response = self.client.get(reverse('export_tasks'), {'assigned_user': user.id, 'export_format': export_format})
+            lines = sum(chunk.count(b'\n') for chunk in response.streaming_content)
+            return lines, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_peak_memory_does_not_grow_with_rows(self):
+        for export_format, header in (('ndjson', 0), ('csv', 1)):
+            small_lines, small_peak = self.export_peak(self.small, export_format)
+            large_lines, large_peak = self.export_peak(self.large, export_format)
+            self.assertEqual((small_lines, large_lines), (4_000 + header, 16_000 + header))
+            # przy buforowaniu całej odpowiedzi szczyt rósłby ~4x
+            self.assertLess(large_peak, small_peak * 1.5, export_format)
+
+    async def async_export(self, view, params):
+        response = await view.as_view()(AsyncRequestFactory().get('/', params))
+        self.assertTrue(response.is_async)
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    async def test_async_export_matches_sync(self):
+        task = await Task.objects.filter(assigned_user=self.small).afirst()
+        cases = [
+            (AsyncTaskExportView, reverse('export_tasks'), {'assigned_user': self.small.id}),
+            (AsyncTaskHistoryExportView, reverse('export_task_history'), {'task_id': task.id}),
+        ]
+        for view, url, params in cases:
+            for export_format in EXPORT_FORMATS:
+                params = {**params, 'export_format': export_format}
+                response = await sync_to_async(self.client.get)(url, params)
+                expected = await sync_to_async(b''.join)(response.streaming_content)
+                self.assertEqual(await self.async_export(view, params), expected)
+
+    async def test_async_export_peak_memory_does_not_grow_with_rows(self):
+        peaks = []
+        for user in (self.small, self.large):
+            tracemalloc.start()
+            try:
+                response = await AsyncTaskExportView.as_view()(AsyncRequestFactory().get('/', {'assigned_user': user.id}))
+                async for _chunk in response.streaming_content:
+                    pass
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+        self.assertLess(peaks[1], peaks[0] * 1.5)
+
+    def test_history_export_rejects_invalid_task_id(self):
+        response = self.client.get(reverse('export_task_history'), {'task_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class UserListValidationTests(TestCase):
+    """
+    Lista użytkowników jest unieważniana przy każdym zapisie użytkownika,
+    także spoza widoków API (ORM, panel admina).
+    """
+
+    def assert_changed(self, change):
+        response = self.client.get(reverse('get_all_users'))
+        etag = response['ETag']
+        change()
+        self.assertEqual(self.client.get(reverse('get_all_users'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_create_and_delete(self):
+        users = []
+        self.assert_changed(lambda: users.append(User.objects.create(username='orm_user', email='orm_user@example.com')))
+        self.assert_changed(lambda: users[0].delete())
+
+    def test_password_only_save_keeps_etag(self):
+        user = User.objects.create(username='pw_user', email='pw_user@example.com')
+        etag = self.client.get(reverse('get_all_users'))['ETag']
+        user.save(update_fields=['last_login'])
+        self.assertEqual(self.client.get(reverse('get_all_users'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    @override_settings(TABLE_VERSION_SHARDS=4)
+    def test_every_counter_row_changes_etag(self):
+        etags = {self.client.get(reverse('get_all_users'))['ETag']}
+        for thread in range(8):
+            with mock.patch('api.models.threading.get_ident', return_value=thread):
+                TableVersion.bump(TableVersion.USERS)
+            etags.add(self.client.get(reverse('get_all_users'))['ETag'])
+        self.assertEqual(len(etags), 9)
+        self.assertGreater(TableVersion.objects.filter(TableVersion.rows(TableVersion.USERS)).count(), 1)
+
+
+class TaskCounterTests(TestCase):
+    """
+    Liczniki zadań (api.counters) śledzą tworzenie, edycję i usuwanie zadań
+    oraz usunięcie użytkownika; /api/task/stats/ zależy też od nazw użytkowników.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(username='alice', email='alice@example.com')
+        cls.bob = User.objects.create(username='bob', email='bob@example.com')
+
+    def setUp(self):
+        cache.clear()
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.alice).access_token}'}
+
+    def create(self, user, status=Task.NEW):
+        response = self.client.post(
+            reverse('create_task'), {'name': 'counted', 'description': 'counted', 'status': status, 'assigned_user': user.id},
+            content_type='application/json', **self.auth,
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def assert_counters(self, expected):
+        self.assertEqual(counters.current(), expected)
+        self.assertEqual(counters.diff(), {})
+
+    def test_create_edit_delete(self):
+        task = self.create(self.alice)
+        self.create(self.alice)
+        self.assert_counters({(self.alice.id, Task.NEW): 2})
+        response = self.client.put(
+            reverse('edit_task', args=[task['id']]), {**task, 'status': Task.SOLVED, 'assigned_user': self.bob.id},
+            content_type='application/json', **self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_counters({(self.alice.id, Task.NEW): 1, (self.bob.id, Task.SOLVED): 1})
+        self.assertEqual(self.client.delete(reverse('delete_task', args=[task['id']]), **self.auth).status_code, 204)
+        self.assert_counters({(self.alice.id, Task.NEW): 1})
+
+    def test_user_delete_moves_counts_to_unassigned(self):
+        self.create(self.bob, Task.IN_PROGRESS)
+        self.create(self.alice)
+        self.bob.delete()
+        self.assert_counters({(None, Task.IN_PROGRESS): 1, (self.alice.id, Task.NEW): 1})
+        stats = self.client.get(reverse('task_stats')).json()
+        self.assertEqual(stats['users'][-1]['assigned_user'], None)
+        self.assertEqual(stats['totals'], {Task.NEW: 1, Task.IN_PROGRESS: 1, Task.SOLVED: 0})
+
+    def test_stats_follow_username_change(self):
+        self.create(self.alice)
+        response = self.client.get(reverse('task_stats'))
+        self.alice.username = 'alicja'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.save()
+        changed = self.client.get(reverse('task_stats'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['users'][0]['username'], 'alicja')
+
+    def test_check_task_counters(self):
+        self.create(self.alice)
+        # zapis z pominięciem API nie zmienia liczników
+        Task.objects.create(name='raw', description='raw', status=Task.SOLVED, assigned_user=self.bob)
+        with self.assertRaisesMessage(CommandError, '1 task counters differ'):
+            call_command('check_task_counters', stdout=StringIO())
+        out = StringIO()
+        call_command('check_task_counters', fix=True, stdout=out)
+        self.assertIn('Rebuilt task counters (1 fixed)', out.getvalue())
+        self.assert_counters({(self.alice.id, Task.NEW): 1, (self.bob.id, Task.SOLVED): 1})
+
+
+class TaskConditionalGetTests(TestCase):
+    """
+    Lista i szczegóły zadania: 304 dla aktualnego If-None-Match,
+    nowy ETag i pełna odpowiedź po edycji zadania.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='etag_user', email='etag_user@example.com')
+        cls.task = Task.objects.create(name='etag', description='etag', status=Task.NEW, assigned_user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    def edit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                reverse('edit_task', args=[self.task.id]),
+                {'name': 'etag', 'description': 'edited', 'status': Task.IN_PROGRESS, 'assigned_user': self.user.id},
+                content_type='application/json', **self.auth,
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def assert_revalidation(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        self.edit()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertIn(b'edited', changed.content)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=changed['ETag']).status_code, 304)
+
+    def test_list(self):
+        self.assert_revalidation(reverse('get_all_tasks'))
+
+    def test_detail(self):
+        self.assert_revalidation(reverse('get_task', args=[self.task.id]))
+
+    async def test_async_list(self):
+        etag = (await AsyncTaskListView.as_view()(AsyncRequestFactory().get('/')))['ETag']
+        response = await AsyncTaskListView.as_view()(AsyncRequestFactory().get('/', headers={'If-None-Match': etag}))
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_task_has_no_etag(self):
+        response = self.client.get(reverse('get_task', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_default_validators_disable_conditional_get(self):
+        self.assertEqual(ConditionalGetMixin().get_validators(), (None, None))
+
+
+class TaskProjectionTests(TestCase):
+    """
+    ?fields= na listach zadań: wybrane pola w kolejności TASK_FIELDS, tylko ich
+    kolumny w SQL, 400 dla nieznanych pól i ścieżek do pól powiązanych.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='projection_user', email='projection_user@example.com')
+        cls.user.set_password('projection-Password-1')
+        cls.user.save()
+        cls.task = Task.objects.create(name='projected', description='hidden text', status=Task.NEW, assigned_user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def results(self, url, fields):
+        response = self.client.get(url, {'fields': fields})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_subset(self):
+        with CaptureQueriesContext(connection) as ctx:
+            rows = self.results(reverse('get_all_tasks'), ' name , id')
+        self.assertEqual(rows, [{'id': self.task.id, 'name': 'projected'}])
+        self.assertEqual(list(rows[0]), ['id', 'name'])
+        # kolumny pominiętych pól nie są pobierane z bazy
+        self.assertFalse(any('"description"' in query['sql'] for query in ctx.captured_queries))
+
+    def test_subset_on_every_list(self):
+        expected = [{'status': Task.NEW, 'assigned_user': self.user.id}]
+        for url in (reverse('filter_tasks'), reverse('get_user_tasks', args=[self.user.id])):
+            self.assertEqual(self.results(url, 'assigned_user,status'), expected)
+
+    def test_all_fields_by_default(self):
+        row = self.client.get(reverse('get_all_tasks')).json()['results'][0]
+        detail = self.client.get(reverse('get_task', args=[self.task.id])).json()
+        self.assertEqual(row, detail)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('get_all_tasks'), {'fields': 'id,owner'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'fields': ['Unknown field: owner']})
+        response = self.client.get(reverse('get_all_tasks'), {'fields': ','})
+        self.assertEqual(response.json(), {'fields': ['No fields selected']})
+
+    def test_nested_fields_are_rejected(self):
+        # ścieżki do pól powiązanych nie trafiają do values() (np. hasło użytkownika)
+        for fields in ('assigned_user__password', 'assigned_user.username', 'assigned_user__username,id'):
+            response = self.client.get(reverse('filter_tasks'), {'fields': fields})
+            self.assertEqual(response.status_code, 400, fields)
+            self.assertNotIn(self.user.password.encode(), response.content)
+
+    async def test_async_subset(self):
+        request = AsyncRequestFactory().get('/', {'fields': 'name'})
+        response = await AsyncTaskListView.as_view()(request)
+        self.assertEqual(json.loads(response.content)['results'], [{'name': 'projected'}])
+        response = await AsyncTaskListView.as_view()(AsyncRequestFactory().get('/', {'fields': 'nope'}))
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'ścieżka FTS5 (SQLite)')
+class SQLiteSearchTests(TestCase):
+    """
+    keyword na SQLite: indeks FTS5 z tokenizerem trigram - ranking bm25,
+    podciągi i polskie znaki bez względu na wielkość liter, ILIKE dla fraz < 3 znaków.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # zadania bez szukanych słów - bm25 premiuje rzadkie trigramy
+        Task.objects.bulk_create(
+            Task(name=f'zadanie {i}', description='opis bez słów kluczowych', status=Task.NEW) for i in range(20)
+        )
+        cls.once = Task.objects.create(name='raport', description='długi opis ' * 40 + 'faktura', status=Task.NEW)
+        cls.often = Task.objects.create(name='Faktura VAT', description='faktura, faktura i korekta faktury', status=Task.NEW)
+        cls.polish = Task.objects.create(name='ZAŻÓŁĆ GĘŚLĄ JAŹŃ', description='zapłacić fakturę za prąd', status=Task.NEW)
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, keyword):
+        response = self.client.get(reverse('filter_tasks'), {'keyword': keyword, 'fields': 'name'})
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.json()['results']]
+
+    def test_backend(self):
+        self.assertIsInstance(get_search_backend(), SQLiteSearch)
+
+    def test_ranking_order(self):
+        self.assertEqual(self.names('faktur'), ['Faktura VAT', 'ZAŻÓŁĆ GĘŚLĄ JAŹŃ', 'raport'])
+
+    def test_polish_case_insensitive(self):
+        self.assertEqual(self.names('zażółć'), ['ZAŻÓŁĆ GĘŚLĄ JAŹŃ'])
+        self.assertEqual(self.names('ŚLĄ'), ['ZAŻÓŁĆ GĘŚLĄ JAŹŃ'])
+        self.assertEqual(self.names('Fakturę'), ['ZAŻÓŁĆ GĘŚLĄ JAŹŃ'])
+
+    def test_trigram_substring(self):
+        self.assertEqual(self.names('prąd'), ['ZAŻÓŁĆ GĘŚLĄ JAŹŃ'])
+        self.assertEqual(self.names('orekt'), ['Faktura VAT'])
+        self.assertEqual(self.names('nieistniejące'), [])
+
+    def test_short_keyword_falls_back_to_icontains(self):
+        self.assertEqual(self.names('va'), ['Faktura VAT'])
+
+    def test_index_follows_edits(self):
+        Task.objects.filter(id=self.often.id).update(name='Rachunek', description='rachunek')
+        self.assertEqual(self.names('faktur'), ['ZAŻÓŁĆ GĘŚLĄ JAŹŃ', 'raport'])
+        self.assertEqual(self.names('rachun'), ['Rachunek'])
+        Task.objects.filter(id=self.polish.id).delete()
+        self.assertEqual(self.names('faktur'), ['raport'])
+
+
+class TaskBulkTests(TestCase):
+    """
+    /api/task/bulk/: błędy zgłaszane per element, wszystko albo nic,
+    stała liczba zapytań niezależnie od liczby elementów.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='bulk_user', email='bulk_user@example.com')
+
+    def setUp(self):
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    def send(self, method, items):
+        return getattr(self.client, method)(reverse('bulk_tasks'), items, content_type='application/json', **self.auth)
+
+    def items(self, count, **fields):
+        return [{'name': f'bulk {i}', 'description': 'bulk', 'status': Task.NEW, 'assigned_user': self.user.id, **fields} for i in range(count)]
+
+    def test_invalid_row_rejects_whole_batch(self):
+        items = self.items(3)
+        items[1]['status'] = 'DONE'
+        items[2]['assigned_user'] = 999999
+        response = self.send('post', items)
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(errors[0], {})
+        self.assertIn('status', errors[1])
+        self.assertEqual(errors[2], {'assigned_user': ['Invalid pk "999999" - object does not exist.']})
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(TaskEvent.objects.exists())
+
+    def test_create_update_delete(self):
+        response = self.send('post', self.items(3))
+        self.assertEqual(response.status_code, 201)
+        ids = [result['id'] for result in response.json()['results']]
+        self.assertEqual(TaskEvent.objects.filter(kind=TaskEvent.CREATE).count(), 3)
+        response = self.send('put', [{**item, 'id': task_id, 'status': Task.SOLVED} for task_id, item in zip(ids, self.items(3))])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(Task.objects.values_list('status', flat=True)), {Task.SOLVED})
+        self.assertEqual(self.send('delete', ids).status_code, 200)
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(counters.diff(), {})
+
+    def test_missing_task_rejects_whole_batch(self):
+        ids = [result['id'] for result in self.send('post', self.items(2)).json()['results']]
+        items = [{**item, 'id': task_id, 'status': Task.SOLVED} for task_id, item in zip([ids[0], 0, ids[1]], self.items(3))]
+        response = self.send('put', items)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['errors'], [{}, {'id': ['Task not found']}, {}])
+        self.assertEqual(set(Task.objects.values_list('status', flat=True)), {Task.NEW})
+        response = self.send('delete', [ids[0], 0])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        # pierwsze żądanie zakłada wiersze liczników
+        self.send('post', self.items(1))
+        counts = []
+        for size in (2, 50):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.send('post', self.items(size)).status_code, 201)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+REPLICA = 'replica_0'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], DB_REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(TestCase):
+    """
+    Odczyty widoków tylko do odczytu trafiają do repliki (tu druga baza SQLite
+    z innymi danymi), zapisy i odczyty klienta tuż po zapisie - do bazy
+    głównej, a przy braku repliki odczyty wracają do bazy głównej.
+    """
+    # replika dodawana w setUpClass, więc nie może być wymieniona z nazwy (runner sprawdza aliasy wcześniej)
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.settings[REPLICA] = connections.configure_settings({
+            'default': {},
+            REPLICA: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(Path(cls.directory.name) / 'replica.sqlite3')},
+        })[REPLICA]
+        # schemat repliki (ReadReplicaRouter migruje tylko bazę główną)
+        with override_settings(DATABASE_ROUTERS=[]):
+            call_command('migrate', database=REPLICA, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        cls.directory.cleanup()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='replica_user', email='replica_user@example.com')
+        Task.objects.create(name='primary', description='primary')
+        Task.objects.using(REPLICA).create(name='replica', description='replica')
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [task['name'] for task in json.loads(response.content)['results']]
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.names(self.client.get(reverse('get_all_tasks'))), ['replica'])
+
+    async def test_async_reads_go_to_replica(self):
+        response = await AsyncTaskListView.as_view()(AsyncRequestFactory().get('/'))
+        self.assertEqual(self.names(response), ['replica'])
+
+    def test_writes_and_reads_after_write_go_to_primary(self):
+        token = RefreshToken.for_user(self.user).access_token
+        response = self.client.post(
+            reverse('create_task'), {'name': 'written', 'description': 'written', 'status': Task.NEW},
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(Task.objects.using(REPLICA).filter(name='written').exists())
+        self.assertEqual(self.names(self.client.get(reverse('get_all_tasks'))), ['primary', 'written'])
+        # inny klient nadal czyta z repliki (inny adres - bez odpowiedzi z cache, wspólnej dla klientów)
+        response = self.client.get(reverse('get_all_tasks'), {'fields': 'name'}, REMOTE_ADDR='203.0.113.5')
+        self.assertEqual(self.names(response), ['replica'])
+
+    @override_settings(DATABASE_REPLICAS=['replica_missing'])
+    def test_missing_replica_falls_back_to_primary(self):
+        with self.assertLogs('api.routers', 'WARNING'):
+            self.assertEqual(self.names(self.client.get(reverse('get_all_tasks'))), ['primary'])
+        # znacznik niedostępnej repliki - bez ponownej próby
+        with self.assertNoLogs('api.routers', 'WARNING'):
+            self.assertEqual(self.names(self.client.get(reverse('get_all_tasks'))), ['primary'])
+
+
+class AuthUserCacheTests(TestCase):
+    """
+    Użytkownicy z tokenów w cache procesu i lista unieważnionych tokenów
+    (api.authentication): zmiany użytkownika i unieważnienia z innych workerów
+    działają najpóźniej po AUTH_DENYLIST_REFRESH_SECONDS.
+    """
+
+    def setUp(self):
+        user_cache.clear()
+        # następne sprawdzenie wczyta listę z bazy od nowa
+        denylist.checked = denylist.state = None
+        self.user = User.objects.create(username='auth_user', email='auth_user@example.com')
+
+    def token(self):
+        token = RefreshToken.for_user(self.user).access_token
+        # iat ma rozdzielczość sekund - token wystawiony przed zmianą
+        token['iat'] -= 10
+        return str(token)
+
+    def authenticate(self, token):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_revocation_from_other_worker_applies_after_refresh(self):
+        token = self.token()
+        self.assertEqual(self.authenticate(token).pk, self.user.pk)
+        # wpis innego workera - bez sygnałów i bez denylist.add
+        RevokedToken.objects.create(user_id=self.user.pk, expires_at=timezone.now() + timedelta(days=1))
+        self.assertEqual(self.authenticate(token).pk, self.user.pk)
+        with mock.patch('api.authentication.time.monotonic', return_value=time.monotonic() + settings.AUTH_DENYLIST_REFRESH_SECONDS + 1):
+            with self.assertRaises(InvalidToken):
+                self.authenticate(token)
+
+    def test_deactivation_revokes_once(self):
+        token = self.token()
+        self.authenticate(token)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(InvalidToken):
+            self.authenticate(token)
+        self.user.first_name = 'Inactive'
+        self.user.save()
+        self.assertEqual(RevokedToken.objects.filter(user_id=self.user.pk).count(), 1)
+
+    def test_password_change_invalidates_cached_user(self):
+        token = self.token()
+        cached = self.authenticate(token).password
+        self.user.set_password('new password 123')
+        self.user.save()
+        with self.assertRaises(InvalidToken):
+            self.authenticate(token)
+        fresh = RefreshToken.for_user(self.user).access_token
+        self.assertNotEqual(self.authenticate(str(fresh)).password, cached)
+
+    def test_profile_change_refreshes_cache_without_revoking(self):
+        token = self.token()
+        self.authenticate(token)
+        self.user.email = 'changed@example.com'
+        self.user.save()
+        self.assertEqual(self.authenticate(token).email, 'changed@example.com')
+        self.assertFalse(RevokedToken.objects.exists())
+
+
+class HistoryReplayTests(TestCase):
+    """
+    Odtworzenie wersji zadania ze snapshotu i kolejnych zmian (api.history)
+    daje stany zapisane w zadaniu po każdej zmianie, także po migracji
+    dotychczasowej historii (TaskHistory, migracja 0005).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(username='replay_alice', email='replay_alice@example.com')
+        cls.bob = User.objects.create(username='replay_bob', email='replay_bob@example.com')
+
+    @override_settings(TASK_HISTORY_SNAPSHOT_INTERVAL=3)
+    def test_replay_matches_stored_states(self):
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.alice).access_token}'}
+        data = {'name': 'replayed', 'description': 'v1', 'status': Task.NEW, 'assigned_user': self.alice.id}
+        task_id = self.client.post(reverse('create_task'), data, content_type='application/json', **auth).json()['id']
+        states = {1: TaskEvent.state(Task.objects.get(id=task_id))}
+        changes = [
+            {'status': Task.IN_PROGRESS}, {'assigned_user': self.bob.id}, {'description': 'v2'},
+            {'name': 'renamed', 'status': Task.SOLVED}, {'assigned_user': None}, {'description': 'v3'},
+            {'status': Task.NEW, 'assigned_user': self.alice.id},
+        ]
+        for change in changes:
+            data = {**data, **change}
+            response = self.client.put(reverse('edit_task', args=[task_id]), data, content_type='application/json', **auth)
+            self.assertEqual(response.status_code, 200)
+            task = Task.objects.get(id=task_id)
+            states[task.history_version] = TaskEvent.state(task)
+        self.assertEqual(len(states), len(changes) + 1)
+        self.assertEqual(list(TaskEvent.objects.filter(task_id=task_id, snapshot=True).values_list('version', flat=True)), [1, 4, 7])
+        for version, state in states.items():
+            self.assertEqual(task_at(task_id, version), state)
+
+    def test_migration_replays_legacy_history(self):
+        migration = importlib.import_module('api.migrations.0005_task_events')
+        created = timezone.now() - timedelta(days=10)
+        task = Task.objects.create(name='current', description='c', status=Task.SOLVED, assigned_user=self.bob)
+        Task.objects.filter(id=task.id).update(created_at=created)
+        task.refresh_from_db()
+        legacy = [('first', 'a', self.alice), ('second', 'b', None)]
+        for day, (name, description, user) in enumerate(legacy, start=1):
+            TaskHistory.objects.create(
+                task_id=task.id, name=name, description=description, assigned_user=user,
+                created_at=created, updated_at=created + timedelta(days=day),
+            )
+        # historia zadania usuniętego - bez wiersza Task
+        deleted_id = task.id + 1000
+        for day, name in enumerate(['gone', 'gone again'], start=1):
+            TaskHistory.objects.create(
+                task_id=deleted_id, name=name, description='d', created_at=created, updated_at=created + timedelta(days=day),
+            )
+
+        migration.migrate_history(django_apps, None)
+
+        task.refresh_from_db()
+        self.assertEqual(task.history_version, 3)
+        self.assertEqual(task_at(task.id, 3), TaskEvent.state(task))
+        self.assertEqual(
+            [(state['name'], state['assigned_user']) for state in (task_at(task.id, 1), task_at(task.id, 2))],
+            [('first', self.alice.id), ('second', None)],
+        )
+        events = list(TaskEvent.objects.filter(task_id=deleted_id).order_by('version'))
+        self.assertEqual([event.kind for event in events], ['create', 'update', 'delete'])
+        self.assertEqual(task_at(deleted_id, 2)['name'], 'gone again')
+        self.assertEqual(events[-1].created_at, created + timedelta(days=2))
+
+
+class SyncFeedTests(TestCase):
+    """
+    Widok synchroniczny strumienia zmian nie zajmuje workera: long-poll
+    odpowiada od razu, a Server-Sent Events są odrzucane.
+    """
+
+    def test_long_poll_does_not_wait(self):
+        seq = self.client.get(reverse('task_feed')).json()['seq']
+        started = time.monotonic()
+        response = self.client.get(reverse('task_feed'), {'after': seq, 'timeout': 25})
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.json(), {'events': [], 'seq': seq})
+
+    def test_event_stream_is_refused(self):
+        self.assertEqual(self.client.get(reverse('task_feed'), HTTP_ACCEPT='text/event-stream').status_code, 406)
+        self.assertEqual(self.client.get(reverse('task_feed'), {'format': 'sse'}).status_code, 406)
+
+
+class HistoryWriterRecoveryTests(TestCase):
+    """
+    Odtwarzanie WAL zapisu historii w tle (api.history_writer) po awariach.
+    """
+
+    def event(self, version):
+        return TaskEvent(task_id=1, version=version, kind=TaskEvent.UPDATE, changes={'status': Task.SOLVED}, created_at=timezone.now())
+
+    def test_recover_skips_torn_line_and_resumes_interrupted_recovery(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(TASK_HISTORY_WAL_DIR=directory):
+            dead_pid = 2 ** 22 + 1
+            # awaria w trakcie dopisywania: ostatni wiersz urwany
+            Path(directory, f'history-{dead_pid}-1.wal').write_text(dump(self.event(1)) + '\n' + dump(self.event(2))[:20])
+            # awaria w trakcie odtwarzania przez inny (martwy) proces
+            Path(directory, f'history-{dead_pid}-2.recovering-{dead_pid + 1}').write_text(dump(self.event(3)) + '\n')
+            recovery = HistoryWriter()
+            recovery.pid = 0
+            with self.assertLogs('api.history', 'WARNING') as logs:
+                recovery.recover()
+            self.assertIn('Skipped 1 torn lines', logs.output[0])
+            self.assertEqual(sorted(TaskEvent.objects.values_list('version', flat=True)), [1, 3])
+            self.assertEqual(list(Path(directory).iterdir()), [])
+
+    @override_settings(TASK_HISTORY_WRITER='async')
+    def test_failed_wal_append_does_not_fail_committed_request(self):
+        user = User.objects.create(username='wal_user', email='wal_user@example.com')
+        token = RefreshToken.for_user(user).access_token
+        with mock.patch.object(writer, 'enqueue', side_effect=OSError(28, 'No space left on device')), self.assertLogs('api.history', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse('create_task'), {'name': 'wal', 'description': 'wal', 'status': Task.NEW},
+                    content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}',
+                )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(TaskEvent.objects.filter(task_id=response.json()['id'], kind=TaskEvent.CREATE).exists())
+
+
+class CompressionTests(TestCase):
+    """
+    Kompresowane są tylko odpowiedzi API (JSON, MessagePack), nie strony HTML
+    z tokenem CSRF (BREACH).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_tasks(50)
+
+    def test_only_api_media_types_are_compressed(self):
+        url = reverse('get_all_tasks')
+        response = self.client.get(url, HTTP_ACCEPT='application/json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        response = self.client.get(url, HTTP_ACCEPT='text/html', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class UiBundleTests(TestCase):
+    """
+    Lista zadań w danych ekranu jest ograniczona do pierwszej strony,
+    reszta pod adresem tasks_next (/api/task/all/).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # seed_tasks tworzy partię z jednym created_at - kursor musi rozstrzygać remisy po id
+        seed_tasks(settings.TASK_PAGE_SIZE + 30)
+
+    def test_tasks_are_capped_with_next_page(self):
+        data = self.client.get(reverse('ui_bootstrap')).json()
+        self.assertEqual(len(data['tasks']), settings.TASK_PAGE_SIZE)
+        ids = [task['id'] for task in data['tasks']]
+        url = data['tasks_next']
+        while url:
+            page = self.client.get(url).json()
+            ids.extend(task['id'] for task in page['results'])
+            url = page['next']
+        self.assertEqual(ids, list(Task.objects.order_by('created_at', 'id').values_list('id', flat=True)))
+
+
+class ArchiveMonthTests(TestCase):
+    """
+    Archiwizacja miesiąca historii partiami (kursor, zapis pliku na bieżąco):
+    snapshoty dla zdarzeń pozostających w bazie i scalanie z istniejącym archiwum.
+    """
+
+    start = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+    def final_states(self, events):
+        states = {}
+        for event, state in replay(events):
+            states[event.task_id] = state
+        return states
+
+    def test_archive_streams_batches_and_merges(self):
+        seed_tasks(7)
+        tasks = list(Task.objects.order_by('id'))
+        seed_history(tasks, 2)
+        # wersje 1-2 w archiwizowanym miesiącu, wersja 3 zostaje w bazie
+        TaskEvent.objects.filter(version__lte=2).update(created_at=self.start + timedelta(days=5))
+        expected = {task.id: self.final_states(TaskEvent.objects.filter(task_id=task.id).order_by('version')) for task in tasks}
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(TASK_HISTORY_ARCHIVE_DIR=directory), \
+                mock.patch.object(archive, 'ARCHIVE_CHUNK_SIZE', 3), mock.patch.object(archive, 'REBASE_BATCH_SIZE', 2), \
+                mock.patch.object(archive, 'ARCHIVE_BLOCK_SIZE', 1000):
+            # część miesiąca zarchiwizowana wcześniej - nowy plik musi ją zachować
+            self.assertEqual(archive.write_archive(self.start, TaskEvent.objects.filter(task_id=tasks[0].id, version=1)), 1)
+            self.assertEqual(archive.archive_month(self.start), 14)
+
+            self.assertEqual(list(TaskEvent.objects.values_list('version', 'snapshot').distinct()), [(3, True)])
+            # historia zadania z archiwum rozpakowuje tylko jego blok
+            with mock.patch.object(archive, 'read_archive', side_effect=AssertionError('whole archive read')):
+                for task in tasks:
+                    self.assertEqual(self.final_states(TaskEvent.objects.filter(task_id=task.id)), expected[task.id])
+                    self.assertEqual([event.version for event in archive.full_history(task.id)], [1, 2, 3])
+            self.assertEqual(sum(1 for _ in archive.read_archive(archive.archive_path(self.start))), 14)
+            manifest = json.loads(archive.manifest_path(self.start).read_text())
+            self.assertGreater(len({tuple(entry[2:]) for entry in manifest.values()}), 1)
+
+
+@override_settings(PASSWORD_RATE_LIMIT='2/min')
+class PasswordRateLimitTests(TestCase):
+    """
+    Limit logowań liczony na adres klienta (opcjonalnie także na nazwę
+    użytkownika); X-Real-IP tylko od zaufanych pośredników (API_TRUSTED_PROXIES).
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, name, **extra):
+        return self.client.post(
+            reverse('login_user'), {'name': name, 'password': 'wrong'}, content_type='application/json', **extra,
+        ).status_code
+
+    def test_limit_is_per_address(self):
+        self.assertNotEqual(self.login('alice'), 429)
+        self.assertNotEqual(self.login('bob'), 429)
+        # zmiana nazwy użytkownika nie daje nowej puli haszowań
+        self.assertEqual(self.login('carol'), 429)
+        self.assertNotEqual(self.login('carol', REMOTE_ADDR='203.0.113.5'), 429)
+
+    @override_settings(PASSWORD_RATE_LIMIT='', PASSWORD_USER_RATE_LIMIT='2/min')
+    def test_optional_limit_per_user(self):
+        self.assertNotEqual(self.login('alice', REMOTE_ADDR='203.0.113.5'), 429)
+        self.assertNotEqual(self.login('Alice', REMOTE_ADDR='203.0.113.6'), 429)
+        self.assertEqual(self.login('alice', REMOTE_ADDR='203.0.113.7'), 429)
+        self.assertNotEqual(self.login('bob', REMOTE_ADDR='203.0.113.7'), 429)
+
+    def test_real_ip_only_from_trusted_proxy(self):
+        for _ in range(2):
+            self.login('alice', REMOTE_ADDR='203.0.113.5', HTTP_X_REAL_IP='198.51.100.1')
+        # nagłówek od niezaufanego klienta nie zmienia adresu
+        self.assertEqual(self.login('alice', REMOTE_ADDR='203.0.113.5', HTTP_X_REAL_IP='198.51.100.2'), 429)
+        # pośrednik z API_TRUSTED_PROXIES (127.0.0.1) przekazuje adresy klientów
+        for _ in range(2):
+            self.login('alice', HTTP_X_REAL_IP='198.51.100.1')
+        self.assertEqual(self.login('alice', HTTP_X_REAL_IP='198.51.100.1'), 429)
+        self.assertNotEqual(self.login('alice', HTTP_X_REAL_IP='198.51.100.2'), 429)
+
+
+class MetricsTests(TestCase):
+    """
+    /api/metrics/: zapytania SQL liczone także dla żądań ASGI, stan martwych
+    workerów zachowany w retired.json, dostęp tylko z zaufanych adresów lub z tokenem.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_tasks(3, users=seed_users(1))
+
+    def setUp(self):
+        cache.clear()
+
+    def db_queries(self):
+        histogram = registry.snapshot()['series'].get('get_all_tasks|GET')
+        if histogram is None:
+            return 0, 0
+        return histogram['api_request_db_queries']['count'], histogram['api_request_db_queries']['sum']
+
+    def test_sync_request_records_queries(self):
+        count, total = self.db_queries()
+        self.assertEqual(self.client.get(reverse('get_all_tasks')).status_code, 200)
+        self.assertEqual(self.db_queries()[0], count + 1)
+        self.assertGreater(self.db_queries()[1], total)
+
+    async def test_async_request_records_queries(self):
+        count, total = self.db_queries()
+        response = await self.async_client.get(reverse('get_all_tasks'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.db_queries()[0], count + 1)
+        self.assertGreater(self.db_queries()[1], total)
+
+    def write_worker(self, directory, pid, started, requests):
+        snapshot = {'series': {}, 'requests': {'get_all_tasks|GET|200': requests}}
+        (Path(directory) / f'{pid}-{started}.json').write_text(json.dumps(snapshot))
+
+    def test_dead_workers_are_retired(self):
+        process = subprocess.Popen(['true'])
+        process.wait()
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            self.write_worker(directory, process.pid, 1, 5)
+            # PID ponownie użyty przez żywy proces - starszy plik należy do martwego workera
+            self.write_worker(directory, os.getppid(), 1, 7)
+            self.write_worker(directory, os.getppid(), 2, 11)
+            for _ in range(2):
+                _, requests = merge(Registry().collect())
+                self.assertEqual(requests['get_all_tasks|GET|200'], 23)
+            names = sorted(path.name for path in Path(directory).glob('*.json'))
+            self.assertIn('retired.json', names)
+            self.assertIn(f'{os.getppid()}-2.json', names)
+            self.assertNotIn(f'{process.pid}-1.json', names)
+            self.assertNotIn(f'{os.getppid()}-1.json', names)
+
+    def test_endpoint_is_restricted(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.5').status_code, 403)
+        # X-Real-IP od niezaufanego klienta nie otwiera dostępu
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.5', HTTP_X_REAL_IP='127.0.0.1')
+        self.assertEqual(response.status_code, 403)
+        with override_settings(METRICS_TOKEN='secret'):
+            response = self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.5', HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.5', HTTP_AUTHORIZATION='Bearer wrong')
+            self.assertEqual(response.status_code, 403)
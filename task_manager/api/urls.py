@@ -1,31 +1,65 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     UserTaskListView,
     TaskCreateView,
     TaskHistoryView,
     TaskFilterView,
+    TaskExportView,
+    TaskHistoryExportView,
     TaskEditView,
     TaskDeleteView,
+    TaskBulkView,
     TaskListView,
     TaskDetailView,
+    TaskStatsView,
+    TaskFeedView,
+    UiBundleView,
     UserListView,
     LoginUserView,
+    TokenRevokeView,
     RegisterUserView
 )
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .metrics import metrics_view
+from .passwords import PASSWORD_THROTTLES
+from .async_views import (
+    AsyncTaskListView,
+    AsyncTaskDetailView,
+    AsyncTaskExportView,
+    AsyncTaskFeedView,
+    AsyncTaskFilterView,
+    AsyncTaskHistoryExportView,
+    AsyncTaskHistoryView,
+)
+
+
+def read_view(sync_view, async_view):
+    # W trybie ASGI endpointy odczytu zadań obsługują widoki asynchroniczne (api.async_views)
+    return (async_view if settings.API_ASYNC_VIEWS else sync_view).as_view()
+
 
 urlpatterns = [
     path('user/tasks/<int:user_id>/', UserTaskListView.as_view(), name='get_user_tasks'),
     path('task/create/', TaskCreateView.as_view(), name='create_task'),
     path('task/edit/<int:task_id>/', TaskEditView.as_view(), name='edit_task'),
     path('task/delete/<int:task_id>/', TaskDeleteView.as_view(), name='delete_task'),
+    path('task/bulk/', TaskBulkView.as_view(), name='bulk_tasks'),
     path('user/login/', LoginUserView.as_view(), name='login_user'),
     path('user/register/', RegisterUserView.as_view(), name='register_user'),
     path('user/all/', UserListView.as_view(), name='get_all_users'),
-    path('task/all/', TaskListView.as_view(), name='get_all_tasks'),
-    path('task/<int:task_id>/', TaskDetailView.as_view(), name='get_task'),
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('task/all/', read_view(TaskListView, AsyncTaskListView), name='get_all_tasks'),
+    path('task/stats/', TaskStatsView.as_view(), name='task_stats'),
+    path('task/feed/', read_view(TaskFeedView, AsyncTaskFeedView), name='task_feed'),
+    path('task/<int:task_id>/', read_view(TaskDetailView, AsyncTaskDetailView), name='get_task'),
+    path('token/', TokenObtainPairView.as_view(throttle_classes=PASSWORD_THROTTLES), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('task/filter/', TaskFilterView.as_view(), name='filter_tasks'),
-    path('task/history/<int:task_id>/', TaskHistoryView.as_view(), name='get_task_history'),
+    path('token/revoke/', TokenRevokeView.as_view(), name='token_revoke'),
+    path('task/filter/', read_view(TaskFilterView, AsyncTaskFilterView), name='filter_tasks'),
+    path('task/history/<int:task_id>/', read_view(TaskHistoryView, AsyncTaskHistoryView), name='get_task_history'),
+    path('task/export/', read_view(TaskExportView, AsyncTaskExportView), name='export_tasks'),
+    path('task/history/export/', read_view(TaskHistoryExportView, AsyncTaskHistoryExportView), name='export_task_history'),
+    path('ui/bootstrap/', UiBundleView.as_view(bundle='bootstrap'), name='ui_bootstrap'),
+    path('ui/<slug:tab>/', UiBundleView.as_view(), name='ui_tab'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
@@ -5,24 +5,41 @@ from rest_framework.generics import (
     RetrieveAPIView
 )
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework import status
-from django.contrib.auth.hashers import check_password
+from rest_framework.exceptions import NotFound
 from django.utils import timezone
+from django.db import transaction
+from django.conf import settings
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.db.models import Q
 from django.core.exceptions import ObjectDoesNotExist
-from .models import Task, User, TaskHistory
-from .serializer import TaskSerializer, UserSerializer
+from .models import Task, User, TaskEvent, TaskCounter, TableVersion
+from .serializer import BulkTaskSerializer, TaskSerializer, TaskHistorySerializer, UserSerializer
+from .pagination import TaskCursorPagination, TaskHistoryCursorPagination
+from .filters import filter_task_events, filter_tasks
+from .export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, HISTORY_EXPORT_FIELDS, TASK_EXPORT_FIELDS, stream_export, stream_rows
+from .history import export_rows, record, task_history
+from .passwords import PASSWORD_THROTTLES
+from . import authentication, bundles, counters, feed
+from .archive import archived_task_history
+from .cache import CachedResponseMixin, invalidate_tasks
+from .conditional import TableVersionMixin, TaskVersionMixin
+from .projection import TaskProjectionMixin
+from .renderers import EventStreamRenderer
+from .routers import ReplicaReadMixin
 
 # ===== TASK VIEWS =====
 
-class UserTaskListView(ListAPIView):
+class UserTaskListView(ReplicaReadMixin, CachedResponseMixin, TaskProjectionMixin, ListAPIView):
     """
-    Zwraca listę zadań przypisanych do konkretnego użytkownika.
+    Zwraca listę zadań przypisanych do konkretnego użytkownika (opcjonalnie tylko pola z ?fields=).
     """
     permission_classes = [AllowAny]
     serializer_class = TaskSerializer
+    pagination_class = TaskCursorPagination
+    cache_namespaces = ('user_tasks:{user_id}',)
 
     def get_queryset(self):
         user_id = self.kwargs.get('user_id')
@@ -38,104 +55,140 @@ class TaskCreateView(CreateAPIView):
     serializer_class = TaskSerializer
 
     def perform_create(self, serializer):
-        serializer.save(created_at=timezone.now())
+        now = timezone.now()
+        with transaction.atomic():
+            task = serializer.save(created_at=now, history_version=1)
+            record([TaskEvent.created(task, now)])
+            counters.created([task])
+            invalidate_tasks([task.id], [task.assigned_user_id])
 
 
-class TaskHistoryView(APIView):
+class TaskHistoryView(ReplicaReadMixin, ListAPIView):
     """
-    Zwraca historię zmian danego zadania.
+    Zwraca historię zmian danego zadania odtworzoną z logu zdarzeń (api.history):
+    dla każdej zmiany stan zadania sprzed niej. Strona wymaga stałej liczby
+    zapytań niezależnie od jej rozmiaru i długości historii. ?archived=1 zwraca
+    całą historię łącznie z zarchiwizowaną (archive_task_history), bez stronicowania.
     """
     permission_classes = [AllowAny]
+    serializer_class = TaskHistorySerializer
+    pagination_class = TaskHistoryCursorPagination
 
-    def get(self, request, task_id):
-        task_history = TaskHistory.objects.filter(task_id=task_id).order_by('-updated_at')
-        if not task_history.exists():
+    def get_queryset(self):
+        # zdarzenie tworzące nie ma stanu poprzedniego
+        return TaskEvent.objects.filter(task_id=self.kwargs.get('task_id'), version__gt=1)
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('archived'):
+            entries = archived_task_history(self.kwargs.get('task_id'))
+            if not entries:
+                return Response({"message": "No history found for this task"}, status=status.HTTP_404_NOT_FOUND)
+            serializer = self.get_serializer(entries, many=True)
+            return Response({'next': None, 'previous': None, 'results': serializer.data})
+        page = self.paginate_queryset(self.get_queryset())
+        if not page and not request.query_params.get(self.paginator.cursor_query_param):
             return Response({"message": "No history found for this task"}, status=status.HTTP_404_NOT_FOUND)
-        history_data = []
-        for entry in task_history:
-            history_data.append({
-                "name": entry.name,
-                "description": entry.description,
-                "assigned_user": entry.assigned_user.username if entry.assigned_user else "Unassigned",
-                "created_at": entry.created_at,
-                "updated_at": entry.updated_at,
-                "deleted_at": entry.deleted_at
-            })
-        return Response(history_data, status=status.HTTP_200_OK)
+        serializer = self.get_serializer(task_history(self.kwargs.get('task_id'), page), many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class TaskFilterView(ListAPIView):
+class TaskFilterView(ReplicaReadMixin, TableVersionMixin, TaskProjectionMixin, ListAPIView):
     """
     Zwraca listę zadań z możliwością filtrowania według statusu, słowa kluczowego lub przypisanego użytkownika.
     """
     permission_classes = [AllowAny]
     serializer_class = TaskSerializer
+    pagination_class = TaskCursorPagination
+    version_tables = (TableVersion.TASKS,)
 
     def get_queryset(self):
-        qs = Task.objects.all()
-        status_param = self.request.query_params.get('status')
-        keyword = self.request.query_params.get('keyword')
-        assigned_user = self.request.query_params.get('assigned_user')
-        if status_param:
-            qs = qs.filter(status=status_param.upper())
-        if keyword:
-            qs = qs.filter(Q(description__icontains=keyword) | Q(name__icontains=keyword))
-        if assigned_user:
-            qs = qs.filter(assigned_user=assigned_user)
-        return qs
+        return filter_tasks(Task.objects.all(), self.request.query_params)
+
+
+class TaskExportView(APIView):
+    """
+    Strumieniowy eksport zadań (NDJSON lub CSV, parametr export_format)
+    z tymi samymi filtrami co TaskFilterView.
+    """
+    permission_classes = [AllowAny]
+    fields = TASK_EXPORT_FIELDS
+
+    def get(self, request):
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': 'Unsupported export format'}, status=status.HTTP_400_BAD_REQUEST)
+        qs = filter_tasks(Task.objects.all(), request.query_params).order_by('id')
+        return stream_export(qs, self.fields, export_format, 'tasks')
+
+
+class TaskHistoryExportView(APIView):
+    """
+    Strumieniowy eksport historii zadań wybranych filtrami TaskFilterView
+    (opcjonalnie jednego zadania - parametr task_id): stan zadania po każdym
+    zdarzeniu, odtwarzany w locie z logu TaskEvent.
+    """
+    permission_classes = [AllowAny]
+    fields = HISTORY_EXPORT_FIELDS
+
+    def get(self, request):
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': 'Unsupported export format'}, status=status.HTTP_400_BAD_REQUEST)
+        qs = filter_task_events(TaskEvent.objects.all(), request.query_params)
+        events = qs.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return stream_rows(export_rows(events), self.fields, export_format, 'task_history')
 
 
 class TaskEditView(APIView):
     """
     Pozwala na aktualizację (PUT/POST) oraz usunięcie (DELETE) zadania.
-    Przed aktualizacją/usunięciem dodaje wpis do historii.
+    Każda zmiana dopisuje zdarzenie do historii (TaskEvent) w tej samej transakcji.
     """
     permission_classes = [IsAuthenticated]
 
     def put(self, request, task_id):
-        try:
-            task = Task.objects.get(id=task_id)
-        except Task.DoesNotExist:
-            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Dodajemy wpis do historii przed aktualizacją
-        TaskHistory.objects.create(
-            task_id=task.id,
-            name=task.name,
-            description=task.description,
-            assigned_user=task.assigned_user,
-            created_at=task.created_at,
-            updated_at=timezone.now()
-        )
-        serializer = TaskSerializer(task, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            try:
+                task = Task.objects.select_for_update().get(id=task_id)
+            except Task.DoesNotExist:
+                return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+
+            previous_user_id, previous = task.assigned_user_id, counters.key(task)
+            serializer = TaskSerializer(task, data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            # Dodajemy zdarzenie do historii (tylko zmienione pola)
+            event = TaskEvent.updated(task, serializer.validated_data, timezone.now())
+            serializer.save(history_version=event.version if event else task.history_version)
+            record([event])
+            counters.changed([previous], [counters.key(task)])
+            invalidate_tasks([task.id], [previous_user_id, task.assigned_user_id])
+        return Response(serializer.data)
     
     def delete(self, request, task_id):
-        try:
-            task = Task.objects.get(id=task_id)
-        except Task.DoesNotExist:
-            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Dodajemy wpis do historii przed usunięciem
-        TaskHistory.objects.create(
-            task_id=task.id,
-            name=task.name,
-            description=task.description,
-            assigned_user=task.assigned_user,
-            created_at=task.created_at,
-            updated_at=timezone.now()
-        )
-        task.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return delete_task(task_id)
     
     def post(self, request, task_id):
         # Jeśli metoda POST ma działać jak aktualizacja, przekierowujemy do PUT
         return self.put(request, task_id)
 
 
+def delete_task(task_id):
+    with transaction.atomic():
+        try:
+            task = Task.objects.select_for_update().get(id=task_id)
+        except Task.DoesNotExist:
+            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Dodajemy zdarzenie usunięcia do historii
+        record([TaskEvent.deleted(task, timezone.now())])
+        counters.deleted([task])
+        task_id, user_id = task.id, task.assigned_user_id
+        task.delete()
+        invalidate_tasks([task_id], [user_id])
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class TaskDeleteView(APIView):
     """
     Alternatywny widok do usuwania zadania (może być użyty zamiast metody DELETE w TaskEditView).
@@ -143,33 +196,143 @@ class TaskDeleteView(APIView):
     permission_classes = [IsAuthenticated]
 
     def delete(self, request, task_id):
-        try:
-            task = Task.objects.get(id=task_id)
-        except Task.DoesNotExist:
-            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        TaskHistory.objects.create(
-            task_id=task.id,
-            name=task.name,
-            description=task.description,
-            assigned_user=task.assigned_user,
-            created_at=task.created_at,
-            updated_at=timezone.now()
-        )
-        task.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return delete_task(task_id)
 
 
-class TaskListView(ListAPIView):
+class TaskBulkView(APIView):
     """
-    Zwraca wszystkie zadania.
+    Masowe operacje na zadaniach: POST tworzy, PUT aktualizuje, DELETE usuwa.
+    Cała lista jest walidowana przez BulkTaskSerializer(many=True) i zapisywana
+    w jednej transakcji (bulk_create/bulk_update i jeden INSERT zdarzeń historii).
+    Jeśli którykolwiek element jest błędny, nic nie zostaje zapisane.
+    """
+    permission_classes = [IsAuthenticated]
+    batch_size = 1000
+
+    def validate_items(self, items):
+        if not isinstance(items, list):
+            return Response({'error': 'Expected a list of tasks'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.TASK_BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'At most {settings.TASK_BULK_MAX_ITEMS} items per request'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return None
+
+    def get_ids(self, items):
+        ids = []
+        for item in items:
+            task_id = item.get('id') if isinstance(item, dict) else item
+            try:
+                ids.append(int(task_id))
+            except (TypeError, ValueError):
+                ids.append(None)
+        return ids
+
+    def get_tasks(self, ids):
+        # Brakujące zadania zgłaszamy per element, jak błędy walidacji
+        tasks = Task.objects.select_for_update().in_bulk([i for i in ids if i is not None])
+        errors = [{} if i in tasks else {'id': ['Task not found']} for i in ids]
+        return tasks, errors
+
+    def post(self, request):
+        error = self.validate_items(request.data)
+        if error:
+            return error
+        serializer = BulkTaskSerializer.for_items(request.data)
+        if not serializer.is_valid():
+            return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        now = timezone.now()
+        tasks = [Task(created_at=now, history_version=1, **data) for data in serializer.validated_data]
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks, batch_size=self.batch_size)
+            record([TaskEvent.created(task, now) for task in tasks])
+            counters.created(tasks)
+            invalidate_tasks([task.id for task in tasks], {task.assigned_user_id for task in tasks})
+        return Response({
+            'results': [
+                {'index': index, 'id': task.id, 'status': status.HTTP_201_CREATED}
+                for index, task in enumerate(tasks)
+            ]
+        }, status=status.HTTP_201_CREATED)
+
+    def put(self, request):
+        error = self.validate_items(request.data)
+        if error:
+            return error
+        serializer = BulkTaskSerializer.for_items(request.data)
+        if not serializer.is_valid():
+            return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        ids = self.get_ids(request.data)
+        now = timezone.now()
+        with transaction.atomic():
+            tasks, errors = self.get_tasks(ids)
+            if any(errors):
+                return Response({'errors': errors}, status=status.HTTP_404_NOT_FOUND)
+            user_ids = {task.assigned_user_id for task in tasks.values()}
+            before = [counters.key(task) for task in tasks.values()]
+            # bulk_update pomija auto_now, więc updated_at ustawiamy sami
+            fields = {'updated_at', 'history_version'}
+            events = []
+            for task_id, data in zip(ids, serializer.validated_data):
+                task = tasks[task_id]
+                # zdarzenie historii liczymy przed nałożeniem zmian (to samo zadanie może wystąpić kilka razy)
+                event = TaskEvent.updated(task, data, now)
+                if event:
+                    events.append(event)
+                    task.history_version = event.version
+                for attr, value in data.items():
+                    setattr(task, attr, value)
+                task.updated_at = now
+                fields.update(data)
+            Task.objects.bulk_update(tasks.values(), fields, batch_size=self.batch_size)
+            record(events)
+            counters.changed(before, [counters.key(task) for task in tasks.values()])
+            user_ids.update(task.assigned_user_id for task in tasks.values())
+            invalidate_tasks(tasks, user_ids)
+        return Response({
+            'results': [
+                {'index': index, 'id': task_id, 'status': status.HTTP_200_OK}
+                for index, task_id in enumerate(ids)
+            ]
+        })
+
+    def delete(self, request):
+        error = self.validate_items(request.data)
+        if error:
+            return error
+        ids = self.get_ids(request.data)
+        now = timezone.now()
+        with transaction.atomic():
+            tasks, errors = self.get_tasks(ids)
+            if any(errors):
+                return Response({'errors': errors}, status=status.HTTP_404_NOT_FOUND)
+            # Dodajemy zdarzenia usunięcia do historii
+            record([TaskEvent.deleted(task, now) for task in tasks.values()])
+            counters.deleted(tasks.values())
+            Task.objects.filter(id__in=list(tasks)).delete()
+            invalidate_tasks(tasks, {task.assigned_user_id for task in tasks.values()})
+        return Response({
+            'results': [
+                {'index': index, 'id': task_id, 'status': status.HTTP_204_NO_CONTENT}
+                for index, task_id in enumerate(ids)
+            ]
+        })
+
+
+class TaskListView(ReplicaReadMixin, TableVersionMixin, CachedResponseMixin, TaskProjectionMixin, ListAPIView):
+    """
+    Zwraca wszystkie zadania (opcjonalnie tylko pola z ?fields=, np. ?fields=id,name).
     """
     permission_classes = [AllowAny]
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
+    pagination_class = TaskCursorPagination
+    cache_namespaces = ('tasks',)
+    version_tables = (TableVersion.TASKS,)
 
 
-class TaskDetailView(RetrieveAPIView):
+class TaskDetailView(ReplicaReadMixin, TaskVersionMixin, CachedResponseMixin, RetrieveAPIView):
     """
     Zwraca szczegóły konkretnego zadania.
     """
@@ -178,17 +341,76 @@ class TaskDetailView(RetrieveAPIView):
     serializer_class = TaskSerializer
     lookup_field = 'id'
     lookup_url_kwarg = 'task_id'
+    cache_namespaces = ('task:{task_id}',)
+
+
+class TaskStatsView(ReplicaReadMixin, TableVersionMixin, CachedResponseMixin, ListAPIView):
+    """
+    Zwraca liczbę zadań każdego użytkownika według statusu z liczników
+    TaskCounter (api.counters) - koszt zależy od liczby użytkowników, nie zadań.
+    """
+    permission_classes = [AllowAny]
+    # odpowiedź zawiera nazwy użytkowników
+    cache_namespaces = ('tasks', 'users')
+    version_tables = (TableVersion.TASKS, TableVersion.USERS)
+
+    def get_queryset(self):
+        return TaskCounter.objects.exclude(count=0).values_list('assigned_user_id', 'assigned_user__username', 'status', 'count')
+
+    def list(self, request, *args, **kwargs):
+        return Response(counters.stats(self.get_queryset()))
+
+
+class TaskFeedView(APIView):
+    """
+    Strumień zmian zadań (api.feed): zdarzenia od numeru sekwencyjnego z ?after=
+    lub nagłówka Last-Event-ID; bez numeru tylko bieżący numer (punkt startowy
+    synchronizacji klienta). Widok synchroniczny odpowiada od razu, bez czekania
+    na zmiany (timeout ignorowany), a Server-Sent Events odrzuca (406) - oba
+    wymagają widoku async (SERVER_MODE=asgi).
+    """
+    permission_classes = [AllowAny]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer]
+
+    def get(self, request):
+        after, limit = feed.parse_after(request), feed.parse_limit(request)
+        if request.accepted_renderer.format == 'sse':
+            raise feed.StreamUnavailable()
+        if after is None:
+            return Response({'events': [], 'seq': feed.head()})
+        events = feed.poll(after, limit)
+        return Response({'events': events, 'seq': events[-1]['seq'] if events else after})
+
+
+# ===== UI VIEWS =====
+
+class UiBundleView(ReplicaReadMixin, APIView):
+    """
+    Dane ekranów frontendu w jednej odpowiedzi zamiast kilku żądań (api.bundles):
+    /api/ui/bootstrap/ - start sesji (numer strumienia zmian, lista zadań, użytkownicy,
+    wybrane zadanie i jego historia), /api/ui/<add|edit|filter|history>/ - dane jednej zakładki.
+    """
+    permission_classes = [AllowAny]
+    bundle = None
+
+    def get(self, request, tab=None):
+        name = tab or self.bundle
+        if name not in bundles.BUNDLES:
+            raise NotFound()
+        return Response(bundles.build(name, request))
 
 
 # ===== USER VIEWS =====
 
-class UserListView(ListAPIView):
+class UserListView(ReplicaReadMixin, TableVersionMixin, CachedResponseMixin, ListAPIView):
     """
     Zwraca listę wszystkich użytkowników.
     """
     permission_classes = [AllowAny]
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    cache_namespaces = ('users',)
+    version_tables = (TableVersion.USERS,)
 
 
 class LoginUserView(APIView):
@@ -196,13 +418,14 @@ class LoginUserView(APIView):
     Logowanie użytkownika i zwrócenie tokenów.
     """
     permission_classes = [AllowAny]
+    throttle_classes = PASSWORD_THROTTLES
 
     def post(self, request):
         username = request.data.get('name')
         password = request.data.get('password')
         try:
             user = User.objects.get(username=username)
-            if not check_password(password, user.password):
+            if not user.check_password(password):
                 return Response({'error': 'Invalid password'}, status=status.HTTP_401_UNAUTHORIZED)
         except User.DoesNotExist:
             return Response({'error': 'User does not exist'}, status=status.HTTP_404_NOT_FOUND)
@@ -216,11 +439,31 @@ class LoginUserView(APIView):
         })
 
 
+class TokenRevokeView(APIView):
+    """
+    Wylogowanie: unieważnia token refresh z treści żądania oraz token access,
+    którym żądanie jest uwierzytelnione (jeśli jest), do ich wygaśnięcia
+    (api.authentication.revoke_tokens).
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        try:
+            tokens = [RefreshToken(request.data.get('refresh'))]
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        if request.auth is not None:
+            tokens.append(request.auth)
+        authentication.revoke_tokens(tokens)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class RegisterUserView(APIView):
     """
     Rejestracja nowego użytkownika.
     """
     permission_classes = [AllowAny]
+    throttle_classes = PASSWORD_THROTTLES
 
     def post(self, request):
         data = request.data.copy()
@@ -0,0 +1,18 @@
+# Konfiguracja gunicorna (czytana automatycznie z katalogu roboczego /app)
+# SERVER_MODE=wsgi - klasyczne workery sync, SERVER_MODE=asgi - UvicornWorker z widokami async
+import os
+
+bind = '0.0.0.0:8000'
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'task_manager.asgi:application'
+else:
+    wsgi_app = 'task_manager.wsgi:application'
+
+
+def worker_exit(server, worker):
+    # TASK_HISTORY_WRITER=async: zapis zdarzeń historii z kolejki workera przed jego zamknięciem
+    from api.history_writer import writer
+    writer.drain()
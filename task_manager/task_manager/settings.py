@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 from django.core.management.utils import get_random_secret_key
+import importlib.util
+import ipaddress
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -57,16 +59,128 @@ INSTALLED_APPS = [
 ]
 
 REST_FRAMEWORK = {
+    # JWT z użytkownikiem z cache procesu i listą unieważnionych tokenów w pamięci (api.authentication)
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Format odpowiedzi negocjowany nagłówkiem Accept (api.renderers); MessagePack wymaga pakietu msgpack
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        *(['api.renderers.MessagePackRenderer'] if importlib.util.find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
+# Kompresja odpowiedzi (api.compression): brotli (jeśli zainstalowany) lub gzip dla treści od API_COMPRESS_MIN_SIZE bajtów
+API_COMPRESS_MIN_SIZE = int(os.getenv('API_COMPRESS_MIN_SIZE', 1024))
+API_BROTLI_QUALITY = int(os.getenv('API_BROTLI_QUALITY', 4))
+# tylko odpowiedzi API - bez stron HTML z tokenem CSRF (BREACH)
+API_COMPRESS_MEDIA_TYPES = set(filter(None, os.getenv('API_COMPRESS_MEDIA_TYPES', 'application/json,application/msgpack').split(',')))
+
+# Tryb serwera: wsgi (gunicorn, workery sync) lub asgi (gunicorn + UvicornWorker), zob. gunicorn.conf.py
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+# Asynchroniczne widoki odczytu zadań (api.async_views); domyślnie włączone w trybie asgi
+API_ASYNC_VIEWS = os.getenv('API_ASYNC_VIEWS', str(SERVER_MODE == 'asgi')).lower() in ('1', 'true', 'yes')
+
+# Rozmiar strony dla list zadań stronicowanych kursorowo (api.pagination)
+TASK_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 100))
+
+# Silnik wyszukiwania dla parametru keyword (api.search): 'auto' dobiera go do bazy,
+# np. 'api.search.IContainsSearch' wymusza dotychczasowe ILIKE
+TASK_SEARCH_BACKEND = os.getenv('TASK_SEARCH_BACKEND', 'auto')
+
+# Maksymalna liczba elementów w jednym żądaniu /api/task/bulk/
+TASK_BULK_MAX_ITEMS = int(os.getenv('TASK_BULK_MAX_ITEMS', 10000))
+
+# Co ile wersji historia zadania (api.models.TaskEvent) zapisuje pełny stan zamiast samych zmian
+TASK_HISTORY_SNAPSHOT_INTERVAL = int(os.getenv('TASK_HISTORY_SNAPSHOT_INTERVAL', 20))
+
+# Zapis historii (api.history_writer): 'sync' - w transakcji żądania, 'async' - po zatwierdzeniu
+# transakcji do dziennika WAL i kolejki w procesie, zapisywanej w tle co TASK_HISTORY_BATCH_SIZE
+# zdarzeń lub TASK_HISTORY_FLUSH_MS ms; segmenty WAL procesów, które padły, są odtwarzane przy starcie
+TASK_HISTORY_WRITER = os.getenv('TASK_HISTORY_WRITER', 'sync')
+TASK_HISTORY_BATCH_SIZE = int(os.getenv('TASK_HISTORY_BATCH_SIZE', 500))
+TASK_HISTORY_FLUSH_MS = int(os.getenv('TASK_HISTORY_FLUSH_MS', 200))
+TASK_HISTORY_WAL_DIR = os.getenv('TASK_HISTORY_WAL_DIR', str(BASE_DIR / 'history_wal'))
+# fsync po każdym dopisaniu do WAL - wyłączenie chroni tylko przed awarią procesu, nie systemu
+TASK_HISTORY_WAL_FSYNC = os.getenv('TASK_HISTORY_WAL_FSYNC', '1').lower() in ('1', 'true', 'yes')
+
+# PostgreSQL: liczba przyszłych partycji miesięcznych historii tworzonych przez
+# create_history_partitions (i migrację), zob. api.partitions
+TASK_HISTORY_PARTITIONS_AHEAD = int(os.getenv('TASK_HISTORY_PARTITIONS_AHEAD', 3))
+# archive_task_history: miesiące starsze niż retencja trafiają do plików NDJSON (gzip) w katalogu archiwum
+TASK_HISTORY_RETENTION_MONTHS = int(os.getenv('TASK_HISTORY_RETENTION_MONTHS', 12))
+TASK_HISTORY_ARCHIVE_DIR = os.getenv('TASK_HISTORY_ARCHIVE_DIR', str(BASE_DIR / 'history_archive'))
+
+# Strumień zmian zadań (api.feed, /api/task/feed/): maksymalna liczba zdarzeń w odpowiedzi,
+# najdłuższe oczekiwanie long-poll (s), czas jednego połączenia SSE (s), co ile sekund czekający
+# sprawdzają zapisy innych workerów; czekanie i SSE obsługują tylko widoki async (tryb asgi)
+TASK_FEED_BATCH_SIZE = int(os.getenv('TASK_FEED_BATCH_SIZE', 500))
+TASK_FEED_POLL_TIMEOUT = float(os.getenv('TASK_FEED_POLL_TIMEOUT', 25))
+TASK_FEED_STREAM_SECONDS = float(os.getenv('TASK_FEED_STREAM_SECONDS', 300))
+TASK_FEED_POLL_SECONDS = float(os.getenv('TASK_FEED_POLL_SECONDS', 2))
+TASK_FEED_RETRY_MS = int(os.getenv('TASK_FEED_RETRY_MS', 1000))
+
+# Na ile wierszy rozłożony jest licznik wersji tabeli (api.models.TableVersion, walidator ETag list) -
+# zapisy z różnych wątków zwiększają różne wiersze zamiast czekać na blokadę jednego
+TABLE_VERSION_SHARDS = int(os.getenv('TABLE_VERSION_SHARDS', 8))
+
+SIMPLE_JWT = {
+    # odświeżenie odrzuca unieważnione tokeny refresh (api.authentication)
+    'TOKEN_REFRESH_SERIALIZER': 'api.authentication.TokenRefreshSerializer',
+}
+
+# Uwierzytelnianie JWT (api.authentication): użytkownicy z tokenów trzymani w cache LRU procesu
+# (AUTH_USER_CACHE_SIZE wpisów, AUTH_USER_CACHE_TTL s; 0 - odczyt z bazy przy każdym żądaniu),
+# unieważnione tokeny (RevokedToken) doczytywane z bazy co AUTH_DENYLIST_REFRESH_SECONDS s
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', 1024))
+AUTH_USER_CACHE_TTL = float(os.getenv('AUTH_USER_CACHE_TTL', 30))
+AUTH_DENYLIST_REFRESH_SECONDS = float(os.getenv('AUTH_DENYLIST_REFRESH_SECONDS', 2))
+
+# Hasher nowych haseł (PASSWORD_HASHER): argon2 (pakiet argon2-cffi), bcrypt (pakiet bcrypt), scrypt lub pbkdf2;
+# bez wymaganego pakietu - pbkdf2. Skróty zapisane innym hasherem są sprawdzane dalej i zastępowane przy logowaniu
+PASSWORD_HASHER_CLASSES = {
+    'argon2': ('django.contrib.auth.hashers.Argon2PasswordHasher', 'argon2'),
+    'bcrypt': ('django.contrib.auth.hashers.BCryptSHA256PasswordHasher', 'bcrypt'),
+    'scrypt': ('django.contrib.auth.hashers.ScryptPasswordHasher', None),
+    'pbkdf2': ('django.contrib.auth.hashers.PBKDF2PasswordHasher', None),
+}
+PASSWORD_HASHER, _hasher_module = PASSWORD_HASHER_CLASSES[os.getenv('PASSWORD_HASHER', 'argon2')]
+if _hasher_module and not importlib.util.find_spec(_hasher_module):
+    PASSWORD_HASHER = PASSWORD_HASHER_CLASSES['pbkdf2'][0]
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER,
+    *(path for path, _ in PASSWORD_HASHER_CLASSES.values() if path != PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Haszowanie haseł (api.passwords): PASSWORD_HASH_WORKERS procesów puli na worker (0 - w wątku żądania)
+# z priorytetem obniżonym o PASSWORD_HASH_NICE, najwyżej PASSWORD_HASH_CONCURRENCY haszowań naraz
+# na worker (0 - bez limitu); żądanie czekające dłużej niż PASSWORD_HASH_WAIT_SECONDS s dostaje 503.
+# PASSWORD_RATE_LIMIT: limit logowań/rejestracji na adres IP klienta (np. '20/min'; pusty wyłącza),
+# PASSWORD_USER_RATE_LIMIT: dodatkowy limit na nazwę użytkownika ze wszystkich adresów (domyślnie wyłączony)
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 1))
+PASSWORD_HASH_NICE = int(os.getenv('PASSWORD_HASH_NICE', 10))
+PASSWORD_HASH_CONCURRENCY = int(os.getenv('PASSWORD_HASH_CONCURRENCY', 4))
+PASSWORD_HASH_WAIT_SECONDS = float(os.getenv('PASSWORD_HASH_WAIT_SECONDS', 0.5))
+PASSWORD_RATE_LIMIT = os.getenv('PASSWORD_RATE_LIMIT', '20/min')
+PASSWORD_USER_RATE_LIMIT = os.getenv('PASSWORD_USER_RATE_LIMIT', '')
+
+# Adresy lub sieci (CIDR) pośredników, którym wierzymy w nagłówku X-Real-IP (nginx, frontend Streamlit);
+# od pozostałych klientów liczy się adres połączenia (api.routers.client_ip)
+API_TRUSTED_PROXIES = [
+    ipaddress.ip_network(network.strip(), strict=False)
+    for network in filter(None, os.getenv('API_TRUSTED_PROXIES', '127.0.0.1,::1').split(','))
+]
+
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.compression.CompressionMiddleware',
+    'api.routers.PrimaryPinMiddleware',
     'django.middleware.common.BrokenLinkEmailsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -115,17 +229,117 @@ CSRF_TRUSTED_ORIGINS = [
 # }
 
 
-DATABASES = {
+# DB_ENGINE=sqlite - lokalna baza w pliku DB_NAME (domyślnie db.sqlite3) zamiast PostgreSQL
+DB_ENGINE = os.getenv('DB_ENGINE', 'postgresql')
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            # WAL i BEGIN IMMEDIATE: równoległe zapisy (wielowątkowy serwer, benchmark_api)
+            # czekają na blokadę do `timeout` s zamiast kończyć się "database is locked"
+            'OPTIONS': {
+                'init_command': 'PRAGMA journal_mode=WAL;',
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': 'django_db',
+            'USER': 'djangousr',
+            'PASSWORD': 'django_password',
+            'HOST': 'postgres_db', 
+            'PORT': '5432',      
+        }
+    }
+
+# Połączenia z bazą (DB_POOL_MODE):
+# none - nowe połączenie dla każdego żądania,
+# persistent - połączenie workera utrzymywane przez DB_CONN_MAX_AGE sekund i sprawdzane przed ponownym użyciem,
+# pool - natywna pula psycopg 3 (Django 5.1), zalecana w trybie asgi; rozmiary dotyczą jednego procesu workera.
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'pool' if SERVER_MODE == 'asgi' and DB_ENGINE == 'postgresql' else 'persistent')
+
+DATABASE_POOL_MODES = {
+    'none': {'CONN_MAX_AGE': 0},
+    'persistent': {
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    },
+    'pool': {
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+                # maksymalne oczekiwanie na wolne połączenie (s)
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+                # zamykanie nieużywanych i zbyt starych połączeń (s)
+                'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 600)),
+                'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+            },
+        },
+    },
+}
+
+DATABASES['default'].update(DATABASE_POOL_MODES[DB_POOL_MODE])
+
+# Repliki tylko do odczytu (api.routers): DB_REPLICAS to lista hostów PostgreSQL (host lub host:port)
+# albo przy DB_ENGINE=sqlite ścieżek plików z kopią bazy głównej. Odczyty widoków list i szczegółów
+# trafiają do losowej repliki, zapisy i odczyty klienta tuż po jego zapisie - do bazy głównej.
+for index, location in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(','))):
+    replica = {**DATABASES['default'], 'OPTIONS': dict(DATABASES['default'].get('OPTIONS', {}))}
+    if DB_ENGINE == 'sqlite':
+        replica['NAME'] = location
+    else:
+        host, _, port = location.partition(':')
+        replica.update(HOST=host, PORT=port or replica['PORT'])
+    replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica_{index}'] = replica
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['api.routers.ReadReplicaRouter']
+# Jak długo po zapisie klient czyta z bazy głównej (górna granica opóźnienia replikacji, s)
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 5))
+
+# Cache odpowiedzi widoków tylko do odczytu (api.cache)
+# API_CACHE_BACKEND: locmem (domyślnie, w obrębie procesu), file (wspólny dla workerów
+# na jednym hoście) lub memcached (przez gniazdo/adres z API_CACHE_LOCATION)
+
+API_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'django_db',
-        'USER': 'djangousr',
-        'PASSWORD': 'django_password',
-        'HOST': 'postgres_db', 
-        'PORT': '5432',      
+        'BACKEND': API_CACHE_BACKENDS[os.getenv('API_CACHE_BACKEND', 'locmem')],
+        'LOCATION': os.getenv('API_CACHE_LOCATION', 'task-manager'),
+        'TIMEOUT': int(os.getenv('API_CACHE_TTL', 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('API_CACHE_MAX_ENTRIES', 1000)),
+        },
     }
 }
 
+# Metryki żądań (api.metrics, /api/metrics/)
+# METRICS_DIR: katalog współdzielony przez workery gunicorna; pusty - tylko bieżący proces
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1.0))
+# Żądania wolniejsze niż ten próg (ms) są logowane razem z SQL; 0 wyłącza log
+METRICS_SLOW_REQUEST_MS = int(os.getenv('METRICS_SLOW_REQUEST_MS', 0))
+# Dostęp do /api/metrics/: adresy lub sieci (CIDR) klientów albo nagłówek Authorization: Bearer METRICS_TOKEN
+METRICS_ALLOWED_NETWORKS = [
+    ipaddress.ip_network(network.strip(), strict=False)
+    for network in filter(None, os.getenv('METRICS_ALLOWED_NETWORKS', '127.0.0.1,::1').split(','))
+]
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 